@@ -0,0 +1,157 @@
+"""
+Load-tests the streamable HTTP deployment (mcp_server/http_server.py) at several worker counts.
+
+usage: python benchmarks/http_load.py [--workers 1,2,4] [--clients 16] [--duration 20] [--output FILE]
+
+For each worker count the script starts http_server.py on a free port with QUERY_MCP_WORKERS
+set, keeps --clients MCP clients calling execute_raw_query for --duration seconds, then stops
+the server with SIGTERM (the graceful drain). The index advisor is turned off, since the server
+runs a single worker while it is on, and each client sends its own X-Client-ID header, since the
+per-client admission cap would otherwise count every client on this host as one. Any failed call
+fails the run: a throughput figure that includes rejections would not be comparable. Queries go to the database the server is
+configured for (QUERY_MCP_* variables), which should already be seeded, e.g. by suite.py.
+It prints throughput and latency per worker count, plus the speedup over the first count.
+Workers only add throughput up to the number of CPU cores the server and Postgres can use.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastmcp import Client  # noqa: E402
+from fastmcp.client.transports import StreamableHttpTransport  # noqa: E402
+
+from suite import JOIN_QUERY, format_row, git_commit, summarize  # noqa: E402
+
+HTTP_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mcp_server", "http_server.py")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers, port, max_connections):
+    env = dict(os.environ, QUERY_MCP_WORKERS=str(workers), QUERY_MCP_INDEX_ADVISOR="0",
+               QUERY_MCP_HTTP_HOST="127.0.0.1", QUERY_MCP_HTTP_PORT=str(port),
+               QUERY_MCP_MAX_CONNECTIONS=str(max_connections))
+    return subprocess.Popen([sys.executable, HTTP_SERVER], env=env, stdout=subprocess.DEVNULL,
+                            start_new_session=True)
+
+
+async def wait_ready(url, process, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"http_server.py exited with status {process.returncode}")
+        try:
+            async with Client(url) as client:
+                await client.call_tool("execute_raw_query", {"query": "SELECT 1;"})
+                return
+        except Exception:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"http_server.py did not answer on {url} within {timeout:.0f}s")
+
+
+def stop_server(process, timeout=60.0):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def drive(url, clients, duration, max_package):
+    """
+    Keeps `clients` clients busy for `duration` seconds and summarizes their calls.
+    :return: (summary, first error message or None).
+    """
+    latencies, errors, first_error = [], 0, None
+    nonce = iter(range(10 ** 9))
+    deadline = time.monotonic() + duration
+
+    async def worker(number):
+        nonlocal errors, first_error
+        transport = StreamableHttpTransport(url, headers={"X-Client-ID": f"http-load-{number}"})
+        async with Client(transport) as client:
+            while time.monotonic() < deadline:
+                i = next(nonce)
+                arguments = {"query": JOIN_QUERY.format(bound=1 + i % max_package, nonce=i)}
+                call_started = time.perf_counter()
+                try:
+                    await client.call_tool("execute_raw_query", arguments)
+                except Exception as e:
+                    errors += 1
+                    first_error = first_error or str(e)
+                    continue
+                latencies.append(time.perf_counter() - call_started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(number) for number in range(clients)))
+    return summarize(latencies, time.perf_counter() - started, errors), first_error
+
+
+async def run(worker_counts, clients, duration, max_connections, max_package):
+    results = {}
+    for workers in worker_counts:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}/mcp"
+        process = start_server(workers, port, max_connections)
+        try:
+            await wait_ready(url, process)
+            summary, first_error = await drive(url, clients, duration, max_package)
+        finally:
+            stop_server(process)
+        results[str(workers)] = summary
+        print(f"  workers {workers:>2}  {format_row(summary)}")
+        if first_error is not None:
+            print(f"{summary['errors']} calls failed with {workers} worker(s), e.g.: {first_error}")
+            sys.exit(1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent MCP clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load per worker count")
+    parser.add_argument("--max-connections", type=int, default=16,
+                        help="QUERY_MCP_MAX_CONNECTIONS, split across the workers")
+    parser.add_argument("--max-package", type=int, default=50, help="upper bound of the package ids queried")
+    parser.add_argument("--output", help="JSON report path")
+    args = parser.parse_args()
+
+    worker_counts = [int(count) for count in args.workers.split(",") if count.strip()]
+    print(f"{args.clients} clients, {args.duration:.0f}s per worker count, {os.cpu_count()} CPUs")
+    results = asyncio.run(run(worker_counts, args.clients, args.duration, args.max_connections, args.max_package))
+
+    base = results[str(worker_counts[0])].get("ops_per_s")
+    if base:
+        print("\nspeedup over " + f"{worker_counts[0]} worker(s): " + "  ".join(
+            f"{workers}: {summary['ops_per_s'] / base:.2f}x"
+            for workers, summary in results.items() if summary.get("ops_per_s")
+        ))
+
+    if args.output:
+        commit, dirty = git_commit()
+        report = {
+            "meta": {"commit": commit, "dirty": dirty, "cpus": os.cpu_count(), "clients": args.clients,
+                     "duration_s": args.duration, "max_connections": args.max_connections},
+            "workers": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
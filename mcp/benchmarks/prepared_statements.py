@@ -0,0 +1,83 @@
+"""
+Compares hot CRUD lookups with and without server-side prepared statements.
+
+usage: python benchmarks/prepared_statements.py [--iterations N] [--scale S] [--db-name NAME] ...
+
+The target database is reset to seeded sample data at the given scale.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mcp_server"))
+
+from database import DatabaseManager  # noqa: E402
+
+
+def run_lookups(db_manager, iterations, cve_ids, tag_ids, package_ids):
+    """
+    Runs the hot lookup mix and returns per-call latencies in seconds.
+    """
+    lookups = [
+        lambda i: db_manager.get_vulnerability_by_cve(cve_ids[i % len(cve_ids)]),
+        lambda i: db_manager.get_tags_for_package(package_ids[i % len(package_ids)]),
+        lambda i: db_manager.get_vulnerabilities_for_tag(tag_ids[i % len(tag_ids)]),
+        lambda i: db_manager.get_commits_for_tag(tag_ids[i % len(tag_ids)]),
+    ]
+    latencies = []
+    for i in range(iterations):
+        lookup = lookups[i % len(lookups)]
+        started = time.perf_counter()
+        lookup(i)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def summarize(latencies):
+    ordered = sorted(latencies)
+    return {
+        "mean_us": statistics.fmean(ordered) * 1e6,
+        "p50_us": ordered[len(ordered) // 2] * 1e6,
+        "p95_us": ordered[int(len(ordered) * 0.95)] * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--warmup", type=int, default=1000)
+    parser.add_argument("--scale", type=int, default=100)
+    parser.add_argument("--db-name", default="postgres")
+    parser.add_argument("--user", default="postgres")
+    parser.add_argument("--password", default="postgres")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5432)
+    args = parser.parse_args()
+
+    connection = dict(db_name=args.db_name, user=args.user, password=args.password,
+                      host=args.host, port=args.port, cache_size=0)
+    seeder = DatabaseManager(**connection)
+    seeder.seed_bulk(scale=args.scale)
+    cve_ids = [row[0] for row in seeder.execute_raw_query("SELECT cve_id FROM vulnerabilities ORDER BY id LIMIT 500")]
+    tag_ids = [row[0] for row in seeder.execute_raw_query("SELECT id FROM package_tags ORDER BY id LIMIT 500")]
+    package_ids = [row[0] for row in seeder.execute_raw_query("SELECT id FROM packages ORDER BY id LIMIT 500")]
+    seeder.close_connection()
+
+    results = {}
+    for label, prepared in (("plain", False), ("prepared", True)):
+        db_manager = DatabaseManager(use_prepared_statements=prepared, **connection)
+        run_lookups(db_manager, args.warmup, cve_ids, tag_ids, package_ids)
+        results[label] = summarize(run_lookups(db_manager, args.iterations, cve_ids, tag_ids, package_ids))
+        db_manager.close_connection()
+
+    print(f"\n{args.iterations} lookups, scale={args.scale}")
+    for label, summary in results.items():
+        print(f"{label:>9}: " + "  ".join(f"{key}={value:8.1f}" for key, value in summary.items()))
+    saving = 1 - results["prepared"]["mean_us"] / results["plain"]["mean_us"]
+    print(f"prepared statements save {saving:.1%} of mean lookup latency")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+"""
+Benchmarks the DatabaseManager and the MCP tool layer at several seeded data scales.
+
+usage: python benchmarks/suite.py [--scales 1,10,100] [--iterations N] [--output FILE] [--baseline FILE]
+
+Scenarios run against the database the MCP server is configured for (QUERY_MCP_* variables,
+see settings.py), which is reseeded at every scale. Server startup is measured separately by
+spawning server.py over stdio the way the chat client does. For each scenario the suite reports p50/p95/p99 latency
+and throughput, plus the process's peak RSS, and writes everything to a JSON file tagged
+with the git commit. Pass a previous file as --baseline to print the change per scenario.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mcp_server"))
+
+from fastmcp import Client  # noqa: E402
+from fastmcp.client.transports import PythonStdioTransport  # noqa: E402
+
+import server  # noqa: E402
+from database import DatabaseManager  # noqa: E402
+from seeding import DEFAULT_SEED  # noqa: E402
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mcp_server", "server.py")
+# Metrics where a higher value is worse, for --baseline comparisons.
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms")
+
+# Queries carry the iteration number as a no-op predicate (`AND <i> >= 0`) so every call
+# misses the query result cache unless a scenario is about the cache.
+JOIN_QUERY = """
+SELECT p.name, count(DISTINCT tv.vulnerability_id)
+FROM packages p
+JOIN package_tags pt ON pt.package_id = p.id
+JOIN tag_vulnerabilities tv ON tv.package_tag_id = pt.id
+WHERE tv.severity = 'CRITICAL' AND p.id <= {bound} AND {nonce} >= 0
+GROUP BY p.name
+ORDER BY 2 DESC
+LIMIT 20;
+"""
+
+
+def git_commit():
+    """
+    Returns (short commit hash, whether the working tree has uncommitted changes).
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # bytes on macOS, KiB elsewhere
+
+
+def percentile(ordered, fraction):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed, errors=0):
+    ordered = sorted(latencies)
+    if not ordered:
+        return {"count": 0, "errors": errors}
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 4),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 4),
+        "ops_per_s": round(len(ordered) / elapsed, 1) if elapsed else None,
+    }
+
+
+def run_sync(operation, iterations, warmup):
+    """
+    Calls operation(i) warmup + iterations times and summarizes the measured calls.
+    """
+    for i in range(warmup):
+        operation(i)
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for i in range(warmup, warmup + iterations):
+        call_started = time.perf_counter()
+        try:
+            operation(i)
+        except Exception:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def run_async(operation, iterations, warmup, concurrency=1):
+    """
+    Awaits operation(i) warmup + iterations times from `concurrency` workers and summarizes the measured calls.
+    """
+    for i in range(warmup):
+        await operation(0, i)
+    latencies, errors = [], 0
+    counter = iter(range(warmup, warmup + iterations))
+
+    async def worker(slot):
+        nonlocal errors
+        for i in counter:
+            call_started = time.perf_counter()
+            try:
+                await operation(slot, i)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - call_started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(slot) for slot in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def seed(db_manager, scale, seed_value):
+    """
+    Creates the schema if needed and loads the seeded sample data at the given scale.
+    Returns rows per table.
+    """
+    if db_manager.execute_raw_query("SELECT to_regclass('base_images');")[0][0] is None:
+        db_manager.setup_database(scale=scale, seed=seed_value)
+    counts = db_manager.seed_bulk(scale=scale, seed=seed_value)
+    if counts is None:
+        raise RuntimeError("seeding failed; is the database reachable?")
+    return counts
+
+
+def sample_ids(db_manager):
+    def column(sql):
+        return [row[0] for row in db_manager.execute_raw_query(sql)]
+
+    return {
+        "cve": column("SELECT cve_id FROM vulnerabilities ORDER BY id LIMIT 500;"),
+        "tag": column("SELECT id FROM package_tags ORDER BY id LIMIT 500;"),
+        "package": column("SELECT id FROM packages ORDER BY id LIMIT 500;"),
+        "vulnerability": column("SELECT id FROM vulnerabilities ORDER BY id LIMIT 500;"),
+        "max_package": column("SELECT max(id) FROM packages;")[0],
+    }
+
+
+def manager_scenarios(db_manager, ids, scale):
+    """
+    DatabaseManager scenarios: name -> operation(i).
+    """
+    cve, tag, package, vulnerability = ids["cve"], ids["tag"], ids["package"], ids["vulnerability"]
+    max_package = ids["max_package"]
+    return {
+        "crud.get_vulnerability_by_cve": lambda i: db_manager.get_vulnerability_by_cve(cve[i % len(cve)]),
+        "crud.get_tags_for_package": lambda i: db_manager.get_tags_for_package(package[i % len(package)]),
+        "crud.get_vulnerabilities_for_tag": lambda i: db_manager.get_vulnerabilities_for_tag(tag[i % len(tag)]),
+        "crud.get_commits_for_tag": lambda i: db_manager.get_commits_for_tag(tag[i % len(tag)]),
+        "crud.create_commit": lambda i: db_manager.create_commit(
+            tag[i % len(tag)], f"bench-{scale}-{i}", "bench", "benchmark commit"
+        ),
+        "crud.add_vulnerability_to_tag": lambda i: db_manager.add_vulnerability_to_tag(
+            tag[i % len(tag)], vulnerability[(i * 7) % len(vulnerability)], "HIGH"
+        ),
+        "raw.point_select": lambda i: db_manager.execute_raw_query(
+            f"SELECT * FROM vulnerabilities WHERE cve_id = '{cve[i % len(cve)]}' AND {i} >= 0;"
+        ),
+        "raw.join_aggregate": lambda i: db_manager.execute_raw_query(
+            JOIN_QUERY.format(bound=1 + i % max_package, nonce=i)
+        ),
+    }
+
+
+def tool_scenarios(clients, ids):
+    """
+    MCP tool scenarios through the in-memory client: name -> (operation(slot, i), concurrency).
+    Concurrent scenarios use one client (MCP session) per worker so per-session admission
+    limits do not interfere.
+    """
+    cve, max_package = ids["cve"], ids["max_package"]
+
+    def call(name, arguments):
+        return lambda slot, i: clients[slot].call_tool(name, arguments(i))
+
+    concurrency = len(clients)
+    return {
+        "tool.execute_raw_query": (call("execute_raw_query", lambda i: {
+            "query": f"SELECT * FROM vulnerabilities WHERE cve_id = '{cve[i % len(cve)]}' AND {i} >= 0;"
+        }), 1),
+        "tool.execute_raw_query.cached": (call("execute_raw_query", lambda i: {
+            "query": "SELECT severity, count(*) FROM tag_vulnerabilities GROUP BY severity;"
+        }), 1),
+        "tool.execute_raw_query.join": (call("execute_raw_query", lambda i: {
+            "query": JOIN_QUERY.format(bound=1 + i % max_package, nonce=i)
+        }), 1),
+        "tool.explain_query": (call("explain_query", lambda i: {
+            "query": JOIN_QUERY.format(bound=1 + i % max_package, nonce=i)
+        }), 1),
+        "tool.execute_query_paged": (call("execute_query_paged", lambda i: {
+            "query": "SELECT * FROM package_tags ORDER BY id;", "page_size": 100
+        }), 1),
+        "tool.get_schema": (call("get_schema", lambda i: {}), 1),
+        "tool.get_vulnerability_exposure": (call("get_vulnerability_exposure", lambda i: {
+            "scope": "package", "limit": 20
+        }), 1),
+        f"tool.execute_raw_query.concurrent{concurrency}": (call("execute_raw_query", lambda i: {
+            "query": JOIN_QUERY.format(bound=1 + i % max_package, nonce=i)
+        }), concurrency),
+    }
+
+
+async def run_tools(ids, iterations, warmup, concurrency):
+    async def quiet(message):
+        pass
+
+    clients = [Client(server.mcp, log_handler=quiet) for _ in range(concurrency)]
+    results = {}
+    for client in clients:
+        await client.__aenter__()
+    try:
+        for name, (operation, workers) in tool_scenarios(clients, ids).items():
+            results[name] = await run_async(operation, iterations, warmup, workers)
+            print(f"  {name:<42} {format_row(results[name])}")
+    finally:
+        for client in clients:
+            await client.__aexit__(None, None, None)
+    return results
+
+
+async def measure_startup(runs):
+    """
+    Spawns the server over stdio `runs` times and times the MCP handshake (process start,
+    imports, initialize) and the first tool call after it (which opens the connection pool
+    unless the background warm-up already did).
+    """
+    async def quiet(message):
+        pass
+
+    handshakes, first_calls, errors = [], [], 0
+    started = time.perf_counter()
+    for _ in range(runs):
+        transport = PythonStdioTransport(SERVER_SCRIPT, env=dict(os.environ), keep_alive=False)
+        spawn_started = time.perf_counter()
+        try:
+            async with Client(transport, log_handler=quiet) as client:
+                handshake = time.perf_counter() - spawn_started
+                call_started = time.perf_counter()
+                await client.call_tool("execute_raw_query", {"query": "SELECT 1;"})
+                first_call = time.perf_counter() - call_started
+        except Exception:
+            errors += 1
+            continue
+        handshakes.append(handshake)
+        first_calls.append(first_call)
+    elapsed = time.perf_counter() - started
+    return {
+        "startup.handshake": summarize(handshakes, elapsed, errors),
+        "startup.first_tool_call": summarize(first_calls, elapsed, errors),
+    }
+
+
+def format_row(summary):
+    if not summary.get("count"):
+        return f"no successful calls ({summary.get('errors', 0)} errors)"
+    return (f"p50 {summary['p50_ms']:8.3f}ms  p95 {summary['p95_ms']:8.3f}ms  "
+            f"p99 {summary['p99_ms']:8.3f}ms  {summary['ops_per_s']:9.1f} ops/s"
+            + (f"  errors {summary['errors']}" if summary["errors"] else ""))
+
+
+def compare(report, baseline, threshold):
+    """
+    Prints the relative change of each shared scenario against a baseline report.
+    Returns the list of regressions beyond the threshold.
+    """
+    regressions = []
+    print(f"\nchange vs {baseline['meta']['commit']} (threshold {threshold:.0%}):")
+    groups = [(scale, scenarios["scenarios"], baseline["scales"].get(scale, {}).get("scenarios", {}))
+              for scale, scenarios in report["scales"].items()]
+    groups.append(("-", report.get("startup", {}), baseline.get("startup", {})))
+    for scale, current, base_scenarios in groups:
+        for name, summary in current.items():
+            base = base_scenarios.get(name)
+            if not base or not base.get("count") or not summary.get("count"):
+                continue
+            changes = []
+            for metric in LOWER_IS_BETTER + ("ops_per_s",):
+                if not base.get(metric):
+                    continue
+                change = summary[metric] / base[metric] - 1
+                worse = change > threshold if metric in LOWER_IS_BETTER else change < -threshold
+                if worse:
+                    regressions.append((scale, name, metric, change))
+                changes.append(f"{metric} {change:+.1%}{' !' if worse else ''}")
+            print(f"  scale {scale:>4} {name:<42} " + "  ".join(changes))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="1,10,100", help="comma-separated seed scales")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8, help="workers for the concurrent tool scenario")
+    parser.add_argument("--skip-tools", action="store_true", help="only benchmark the DatabaseManager")
+    parser.add_argument("--startup-runs", type=int, default=5, help="server spawns to time (0 skips)")
+    parser.add_argument("--output", help="JSON report path (default: benchmark-<commit>.json)")
+    parser.add_argument("--baseline", help="previous JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on regressions")
+    args = parser.parse_args()
+
+    commit, dirty = git_commit()
+    target = server.db_manager
+    connection = dict(db_name=target.db_name, user=target.user, password=target.password,
+                      host=target.host, port=target.port)
+    db_manager = DatabaseManager(cache_size=0, **connection)
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "postgres": db_manager.execute_raw_query("SHOW server_version;")[0][0],
+            "database": target.get_name(),
+            "seed": args.seed,
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+        },
+        "startup": {},
+        "scales": {},
+    }
+
+    if args.startup_runs:
+        print("\nstartup")
+        report["startup"] = asyncio.run(measure_startup(args.startup_runs))
+        for name, summary in report["startup"].items():
+            print(f"  {name:<42} {format_row(summary)}")
+
+    for scale in [int(value) for value in args.scales.split(",") if value.strip()]:
+        print(f"\nscale {scale}")
+        counts = seed(target, scale, args.seed)  # through the server's manager, so its caches are invalidated
+        ids = sample_ids(db_manager)
+        results = {}
+        for name, operation in manager_scenarios(db_manager, ids, scale).items():
+            results[name] = run_sync(operation, args.iterations, args.warmup)
+            print(f"  {name:<42} {format_row(results[name])}")
+        if not args.skip_tools:
+            results.update(asyncio.run(run_tools(ids, args.iterations, args.warmup, args.concurrency)))
+        report["scales"][str(scale)] = {"rows": counts, "peak_rss_mb": peak_rss_mb(), "scenarios": results}
+        print(f"  peak RSS so far: {report['scales'][str(scale)]['peak_rss_mb']} MB")
+
+    db_manager.close_connection()
+    server.db_executor.shutdown()
+    server.db_manager.close_connection()
+
+    output = args.output or f"benchmark-{commit}{'-dirty' if dirty else ''}.json"
+    with open(output, "w") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"\nwrote {output}")
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare(report, json.load(handle), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed beyond {args.threshold:.0%}")
+            if args.fail_on_regression:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,49 +2,142 @@ from fastmcp import Client
 from google import genai
 import asyncio
 from dotenv import load_dotenv
+import os
 import sys
 
+from mcp_client.conversation import ConversationManager
+from mcp_client.sql_cache import HashingEmbedder, SqlCache, answer_sql
+
 load_dotenv()
 
-try:
-    mcp_client = Client("./mcp_server/server.py")
-except Exception as e:
-    print("Handle me : ", e)
+class ChatPrinter:
+    """
+    Prints streamed reply text and, on their own lines, the progress messages
+    the server logs while tools run (e.g. "Executing query : select ...").
+    """
+
+    def __init__(self):
+        self.line_open = False
+
+    def text(self, chunk):
+        print(chunk, end="", flush=True)
+        self.line_open = not chunk.endswith("\n")
+
+    def end(self):
+        if self.line_open:
+            print()
+        self.line_open = False
+
+    def progress(self, msg):
+        # Messages such as "Executing query :\nSELECT ..." become one short line.
+        summary = " ".join(msg.split())
+        if len(summary) > 100:
+            summary = summary[:99] + "…"
+        self.end()
+        print(f"  … {summary}", flush=True)
+
+
+CACHED_RESULT_CHARS = 4000  # of a cached answer's result kept in the conversation
+ANSWER_MODEL = "gemini-2.5-pro"
+
+
+class ChatSession:
+    """
+    One chat with the MCP server: answers a question with the SQL cached for it when there is
+    some, with the model otherwise, and caches the SQL the model's answer ran.
+    """
+
+    def __init__(self, server, model_client, sql_cache, printer=None, model=ANSWER_MODEL):
+        """
+        :param server: What fastmcp.Client connects to: a server script path, URL or FastMCP instance.
+        :param model_client: google.genai Client (or any object with the same aio.models interface).
+        :param sql_cache: SqlCache of question -> SQL pairs.
+        :param printer: ChatPrinter showing replies and progress.
+        :param model: Model answering the user.
+        """
+        self.model_client = model_client
+        self.sql_cache = sql_cache
+        self.printer = printer or ChatPrinter()
+        self.model = model
+        self.mcp_client = Client(server, log_handler=self.on_server_log)
+        self.conversation = None
+
+    async def __aenter__(self):
+        await self.mcp_client.__aenter__()
+        # Recent turns are sent as structured contents; older ones are summarized.
+        self.conversation = ConversationManager(
+            self.model_client,
+            model=self.model,
+            config=genai.types.GenerateContentConfig(
+                temperature=0.7,  # Adjust temperature as needed
+                tools=[self.mcp_client.session],  # Pass the FastMCP client session
+            ),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        try:
+            await self.conversation.close()
+        finally:
+            await self.mcp_client.__aexit__(*exc_info)
+
+    async def on_server_log(self, message):
+        data = message.data
+        msg = data.get("msg", str(data)) if isinstance(data, dict) else str(data)
+        self.printer.progress(msg)
+
+    async def ask(self, question):
+        """
+        Answers one question, from the SQL cache if possible.
+        :return: "cache" or "model", whichever answered.
+        """
+        if await self.answer_from_cache(question):
+            return "cache"
+
+        # Print the model's response as it is generated
+        self.printer.text("Gemini: ")
+        async for chunk in self.conversation.stream(question):
+            self.printer.text(chunk)
+        self.printer.end()
+
+        # Remember the SQL that answered the question
+        sql = answer_sql(self.conversation.call_history)
+        if sql:
+            self.sql_cache.store(question, sql)
+        return "model"
 
-gemini_client = genai.Client()
+    async def answer_from_cache(self, question):
+        """
+        Runs the cached SQL of a previously answered question, skipping the model.
+        :return: True if the question was answered.
+        """
+        hit = self.sql_cache.lookup(question)
+        if hit is None:
+            return False
+        self.printer.text(f"Gemini (cached SQL for \"{hit['question']}\", {hit['match']}):\n{hit['sql']}\n")
+        result = await self.mcp_client.call_tool("execute_raw_query", {"query": hit["sql"]}, raise_on_error=False)
+        if result.is_error:
+            self.sql_cache.forget(hit["question"])  # e.g. the schema changed; ask the model instead
+            self.printer.text("Cached SQL failed; asking the model.\n")
+            return False
+        text = "\n".join(part.text for part in result.content if hasattr(part, "text"))
+        self.printer.text(text)
+        self.printer.end()
+        self.conversation.record(question, f"Ran:\n{hit['sql']}\nResult:\n{text[:CACHED_RESULT_CHARS]}")
+        return True
 
-async def chat_loop():
-    async with mcp_client:
-        chat_history = []  # List to keep track of chat history
 
+async def chat_loop(server="./mcp_server/server.py"):
+    # Questions answered before run their SQL directly; set QUERY_MCP_SQL_CACHE="" to disable persistence.
+    sql_cache = SqlCache(os.getenv("QUERY_MCP_SQL_CACHE", ".sql_cache.json") or None, embedder=HashingEmbedder())
+    async with ChatSession(server, genai.Client(), sql_cache) as chat:
         while True:
             # Get user input
             user_input = input("You: ")
             if user_input.lower() == "exit":
                 print("Exiting chat...")
                 break
-            
-            # Add user input to chat history
-            chat_history.append(f"You: {user_input}")
-            
-            # Combine all chat history into one string (can also format with newlines)
-            chat_context = "\n".join(chat_history)
-
-            # Send the chat history as context to the model
-            response = await gemini_client.aio.models.generate_content(
-                model="gemini-2.5-pro",
-                contents=chat_context,
-                config=genai.types.GenerateContentConfig(
-                    temperature=0.7,  # Adjust temperature as needed
-                    tools=[mcp_client.session],  # Pass the FastMCP client session
-                ),
-            )
-            
-            # Print model's response
-            print(f"Gemini: {response.text}")
-            
-            # Add the model's response to chat history
-            chat_history.append(f"Gemini: {response.text}")
+            await chat.ask(user_input)
 
 if __name__ == "__main__":
     # asyncio.run(chat_loop())
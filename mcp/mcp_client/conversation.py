@@ -0,0 +1,174 @@
+import asyncio
+
+from google.genai import types
+
+# Keeps the prompt of a chat session bounded. Recent turns are sent as structured
+# user/model contents; once they exceed a turn or token budget, the oldest turns are folded
+# into a running summary that travels in the system instruction. Folding happens in the
+# background after a reply, so it does not delay the next answer.
+
+CHARS_PER_TOKEN = 4  # rough average for English text; good enough for budgeting
+SUMMARY_PROMPT = (
+    "You maintain the running summary of a conversation between a user and an assistant that "
+    "answers questions about a PostgreSQL database of base images, packages, tags, "
+    "vulnerabilities and commits through tools. Update the summary with the new turns below. "
+    "Keep facts the user may refer back to: names, ids, CVE ids, numbers, the SQL that worked, "
+    "decisions and open questions. Drop pleasantries. Answer with the updated summary only, "
+    "at most {max_words} words.\n\nCurrent summary:\n{summary}\n\nNew turns:\n{turns}"
+)
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _chunk_text(chunk):
+    # Text parts only: chunk.text warns on chunks that carry function calls or thoughts.
+    if not chunk.candidates or chunk.candidates[0].content is None:
+        return ""
+    parts = chunk.candidates[0].content.parts or []
+    return "".join(part.text for part in parts if part.text and not part.thought)
+
+
+class ConversationManager:
+    """
+    Multi-turn chat state for generate_content: a sliding window of recent turns plus a
+    summary of everything older.
+    """
+
+    def __init__(self, client, model, config=None, max_turns=8, max_tokens=6000,
+                 summary_model="gemini-2.5-flash", summary_words=250):
+        """
+        :param client: google.genai Client.
+        :param model: Model answering the user.
+        :param config: GenerateContentConfig for the answers (tools, temperature, ...).
+        :param max_turns: Most recent user/model exchanges always sent verbatim, at most.
+        :param max_tokens: Estimated token budget for the verbatim turns; older turns are summarized
+                           once it is exceeded (the latest exchange is always kept).
+        :param summary_model: Model used to fold old turns into the summary.
+        :param summary_words: Length limit asked of the summary.
+        """
+        self.client = client
+        self.model = model
+        self.config = config or types.GenerateContentConfig()
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.summary_model = summary_model
+        self.summary_words = summary_words
+        self.summary = ""
+        self.turns = []  # [(user text, model text)], oldest first
+        self.call_history = []  # automatic function calling history of the latest exchange
+        self._compaction = None
+
+    def _turn_tokens(self, turn):
+        return estimate_tokens(turn[0]) + estimate_tokens(turn[1])
+
+    def window_tokens(self):
+        return sum(self._turn_tokens(turn) for turn in self.turns)
+
+    def contents(self, user_input):
+        """
+        Builds the request contents: the verbatim turns followed by the new user message.
+        """
+        contents = []
+        for user_text, model_text in self.turns:
+            contents.append(types.Content(role="user", parts=[types.Part.from_text(text=user_text)]))
+            contents.append(types.Content(role="model", parts=[types.Part.from_text(text=model_text)]))
+        contents.append(types.Content(role="user", parts=[types.Part.from_text(text=user_input)]))
+        return contents
+
+    def request_config(self):
+        """
+        The answer config with the running summary added to its system instruction.
+        """
+        if not self.summary:
+            return self.config
+        instruction = self.config.system_instruction
+        prefix = f"{instruction}\n\n" if isinstance(instruction, str) and instruction else ""
+        return self.config.model_copy(update={
+            "system_instruction": f"{prefix}Summary of the earlier conversation:\n{self.summary}"
+        })
+
+    async def send(self, user_input):
+        """
+        Sends one user message with the bounded history and records the exchange.
+        :param user_input: The user's message.
+        :return: The GenerateContentResponse.
+        """
+        if self._compaction is not None:
+            await self._compaction  # the summary must include every turn dropped from the window
+        response = await self.client.aio.models.generate_content(
+            model=self.model,
+            contents=self.contents(user_input),
+            config=self.request_config(),
+        )
+        self.call_history = response.automatic_function_calling_history or []
+        self.record(user_input, response.text or "")
+        return response
+
+    async def stream(self, user_input):
+        """
+        Like send, but yields the reply text as it is generated. Tool calls made through
+        automatic function calling happen between chunks and end up in call_history. The
+        exchange is recorded once the stream is complete.
+        :param user_input: The user's message.
+        """
+        if self._compaction is not None:
+            await self._compaction
+        chunks = []
+        self.call_history = []
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model,
+            contents=self.contents(user_input),
+            config=self.request_config(),
+        )
+        async for chunk in stream:
+            if chunk.automatic_function_calling_history:
+                self.call_history = chunk.automatic_function_calling_history
+            text = _chunk_text(chunk)
+            if text:
+                chunks.append(text)
+                yield text
+        self.record(user_input, "".join(chunks))
+
+    def record(self, user_input, reply):
+        """
+        Adds an exchange to the window and starts folding old turns if a budget is exceeded.
+        """
+        self.turns.append((user_input, reply))
+        evicted = []
+        while len(self.turns) > 1 and (
+            len(self.turns) > self.max_turns or self.window_tokens() > self.max_tokens
+        ):
+            evicted.append(self.turns.pop(0))
+        if evicted:
+            # Chained: each fold starts from the summary the previous one produced.
+            self._compaction = asyncio.create_task(self._fold(evicted, self._compaction))
+
+    async def _fold(self, evicted, previous=None):
+        if previous is not None:
+            await previous
+        turns = "\n".join(f"User: {user_text}\nAssistant: {model_text}" for user_text, model_text in evicted)
+        prompt = SUMMARY_PROMPT.format(
+            max_words=self.summary_words, summary=self.summary or "(empty)", turns=turns
+        )
+        try:
+            response = await self.client.aio.models.generate_content(
+                model=self.summary_model,
+                contents=prompt,
+                config=types.GenerateContentConfig(temperature=0.2),
+            )
+            if response.text:
+                self.summary = response.text.strip()
+        except Exception as e:
+            # Keep the evicted turns' user messages so the model still sees what was asked.
+            print(f"Could not update the conversation summary: {e}")
+            asked = "; ".join(user_text for user_text, _ in evicted)
+            self.summary = f"{self.summary}\nEarlier the user asked: {asked}".strip()
+        finally:
+            if self._compaction is asyncio.current_task():  # a later fold may be queued behind this one
+                self._compaction = None
+
+    async def close(self):
+        if self._compaction is not None:
+            await self._compaction
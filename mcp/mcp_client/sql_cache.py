@@ -0,0 +1,218 @@
+import hashlib
+import json
+import math
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+
+# Client-side cache of question -> SQL pairs. A repeated question runs its cached SQL directly
+# instead of going through the model. Questions match on normalized text, or optionally on
+# local embedding similarity above a threshold. Only read-only SQL is stored, and a similar
+# question must mention every value the cached SQL filters on, so "CRITICAL OpenSSL CVEs"
+# never reuses the SQL of "HIGH zlib CVEs".
+
+QUERY_TOOL = "execute_raw_query"
+READ_ONLY_KINDS = {"select", "with", "values", "table", "show"}
+
+_STOPWORDS = {
+    "a", "an", "the", "please", "me", "show", "list", "give", "tell", "can", "could", "would", "you",
+    "i", "we", "to", "of", "for", "is", "are", "do", "does", "what", "which", "all", "there", "any",
+    "about", "get", "find", "return", "display",
+}
+_WORD = re.compile(r"[a-z0-9][a-z0-9._-]*")
+_SQL_STRING = re.compile(r"'((?:[^']|'')*)'")
+_SQL_NUMBER = re.compile(r"(?<![\w.])\d+(?:\.\d+)?(?![\w.])")
+
+
+def _words(text):
+    text = unicodedata.normalize("NFKC", text).lower()
+    return [word.rstrip(".-") for word in _WORD.findall(text)]
+
+
+def normalize_question(question):
+    """
+    Lowercases the question, drops punctuation and filler words and collapses whitespace,
+    so "Which base images have CRITICAL OpenSSL CVEs?" and "which base images have critical
+    openssl cves" share a key.
+    """
+    return " ".join(word for word in _words(question) if word and word not in _STOPWORDS)
+
+
+def sql_values(sql):
+    """
+    Words of the string and number literals of a SQL statement ("%OpenSSL%" gives "openssl").
+    """
+    values = set()
+    for literal in _SQL_STRING.findall(sql):
+        values.update(word for word in _words(literal.replace("''", "'")) if word)
+    values.update(_SQL_NUMBER.findall(sql))
+    return values
+
+
+def is_read_only_sql(sql):
+    words = re.findall(r"[a-z]+", re.sub(r"--[^\n]*|/\*.*?\*/", " ", sql.lower(), flags=re.S))
+    if not words or words[0] not in READ_ONLY_KINDS:
+        return False
+    return not {"insert", "update", "delete", "merge", "truncate", "drop", "alter", "create", "into"} & set(words)
+
+
+class HashingEmbedder:
+    """
+    Local text embedding with no model download: hashed word and character-trigram counts,
+    L2-normalized. Good at near-duplicate wording, not at paraphrases.
+    """
+
+    def __init__(self, dimensions=512):
+        self.dimensions = dimensions
+
+    def _bucket(self, feature):
+        return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=4).digest(), "little") % self.dimensions
+
+    def __call__(self, text):
+        vector = [0.0] * self.dimensions
+        for word in normalize_question(text).split():
+            vector[self._bucket("w:" + word)] += 2.0
+            padded = f" {word} "
+            for index in range(len(padded) - 2):
+                vector[self._bucket("c:" + padded[index:index + 3])] += 1.0
+        norm = math.sqrt(sum(value * value for value in vector))
+        return [value / norm for value in vector] if norm else vector
+
+
+def cosine(a, b):
+    return sum(x * y for x, y in zip(a, b))  # both vectors are normalized
+
+
+class SqlCache:
+    """
+    LRU cache of question -> SQL pairs, persisted as JSON.
+    """
+
+    def __init__(self, path=None, max_entries=500, embedder=None, threshold=0.9):
+        """
+        :param path: JSON file to load from and save to (None keeps the cache in memory).
+        :param max_entries: Entries kept; the least recently used are evicted beyond this.
+        :param embedder: Optional callable mapping text to a normalized vector (e.g. HashingEmbedder())
+                         to also match differently worded questions.
+        :param threshold: Minimum cosine similarity for an embedding match.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.embedder = embedder
+        self.threshold = threshold
+        self._entries = OrderedDict()  # normalized question -> entry dict
+        self._vectors = {}
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, question):
+        """
+        Finds cached SQL for a question.
+        :return: Dict with sql, question (as originally cached), similarity and match
+                 ("exact" or "similar"), or None.
+        """
+        key = normalize_question(question)
+        entry = self._entries.get(key)
+        if entry is not None:
+            return self._hit(key, entry, 1.0, "exact")
+        if self.embedder is None or not self._entries:
+            return None
+        vector = self.embedder(question)
+        words = set(key.split())
+        best, best_score = None, self.threshold
+        for candidate, entry in self._entries.items():
+            score = cosine(vector, self._vector(candidate))
+            # Values the SQL filters on must all be in the new question.
+            if score >= best_score and sql_values(entry["sql"]) & set(candidate.split()) <= words:
+                best, best_score = candidate, score
+        if best is None:
+            return None
+        return self._hit(best, self._entries[best], best_score, "similar")
+
+    def _hit(self, key, entry, similarity, match):
+        self._entries.move_to_end(key)
+        entry["hits"] += 1
+        entry["last_used"] = time.time()
+        return {"sql": entry["sql"], "question": entry["question"], "similarity": round(similarity, 3),
+                "match": match}
+
+    def _vector(self, key):
+        vector = self._vectors.get(key)
+        if vector is None:
+            vector = self._vectors[key] = self.embedder(self._entries[key]["question"])
+        return vector
+
+    def store(self, question, sql):
+        """
+        Caches the SQL that answered a question. Writes and empty questions are ignored.
+        :return: True if stored.
+        """
+        key = normalize_question(question)
+        sql = sql.strip()
+        if not key or not sql or not is_read_only_sql(sql):
+            return False
+        now = time.time()
+        self._entries[key] = {"question": question.strip(), "sql": sql, "hits": 0, "created": now, "last_used": now}
+        self._entries.move_to_end(key)
+        self._vectors.pop(key, None)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._vectors.pop(evicted, None)
+        self.save()
+        return True
+
+    def forget(self, question):
+        """
+        Removes a question (e.g. when its cached SQL turned out wrong).
+        """
+        key = normalize_question(question)
+        self._vectors.pop(key, None)
+        if self._entries.pop(key, None) is None:
+            return False
+        self.save()
+        return True
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable SQL cache {self.path}: {e}")
+            return
+        self._entries.clear()
+        self._vectors.clear()
+        for entry in entries[-self.max_entries:]:  # saved least recently used first
+            self._entries[normalize_question(entry["question"])] = entry
+
+    def save(self):
+        if not self.path:
+            return
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(list(self._entries.values()), f, indent=1)
+        os.replace(temporary, self.path)
+
+
+def answer_sql(history):
+    """
+    The SQL of the last execute_raw_query call that succeeded during one chat turn (the one the
+    answer rests on), read from the turn's automatic function calling history: the model's
+    function calls carry the query as an argument, and failed calls get an "error" response.
+    :param history: A response's automatic_function_calling_history (list of types.Content).
+    :return: The SQL, or None if the turn ran none.
+    """
+    pending, succeeded = [], []
+    for content in history or []:
+        for part in content.parts or []:
+            if part.function_call is not None and part.function_call.name == QUERY_TOOL:
+                pending.append((part.function_call.args or {}).get("query"))
+            elif part.function_response is not None and part.function_response.name == QUERY_TOOL and pending:
+                sql = pending.pop(0)  # responses follow their calls in order
+                if sql and "error" not in (part.function_response.response or {}):
+                    succeeded.append(sql)
+    return succeeded[-1] if succeeded else None
@@ -0,0 +1,171 @@
+import asyncio
+import json
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when the admission policy refuses to run a query.
+    `code` is a stable machine-readable reason; `details` carries the numbers behind it.
+    """
+
+    def __init__(self, code, message, **details):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.details = details
+
+    def to_dict(self):
+        return {"error": self.code, "message": self.message, **self.details}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), default=str)
+
+
+class AdmissionPolicy:
+    """
+    Limits applied to agent-submitted SQL before and while it runs.
+    Any limit set to None is disabled.
+    """
+
+    def __init__(self, statement_timeout_ms=30000, max_plan_cost=None, max_concurrent_per_session=4,
+                 max_concurrent=10, max_queue=50, queue_timeout=30.0):
+        """
+        :param statement_timeout_ms: Per-statement timeout enforced by Postgres.
+        :param max_plan_cost: Reject queries whose EXPLAIN total cost estimate exceeds this.
+        :param max_concurrent_per_session: Queries one MCP session may have running or queued.
+        :param max_concurrent: Queries running at once across all sessions.
+        :param max_queue: Queries allowed to wait for a running slot; beyond this new ones are rejected.
+        :param queue_timeout: Seconds a query may wait in the queue before it is rejected.
+        """
+        self.statement_timeout_ms = statement_timeout_ms
+        self.max_plan_cost = max_plan_cost
+        self.max_concurrent_per_session = max_concurrent_per_session
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+
+class AdmissionController:
+    """
+    Enforces an AdmissionPolicy for async MCP tools: a per-session concurrency cap,
+    a global concurrency limit with a bounded wait queue (backpressure), and an optional
+    planner-cost ceiling.
+    """
+
+    def __init__(self, policy):
+        self.policy = policy
+        self._slots = asyncio.Semaphore(policy.max_concurrent) if policy.max_concurrent else None
+        self._per_session = defaultdict(int)
+        self._waiting = 0
+        self._running = 0
+        self.admitted = 0
+        self.rejected = defaultdict(int)
+        self.draining = False
+
+    def _reject(self, code, message, **details):
+        self.rejected[code] += 1
+        return AdmissionRejected(code, message, **details)
+
+    @asynccontextmanager
+    async def admit(self, session_id):
+        """
+        Holds a running slot for the duration of the block.
+        :param session_id: Key used for the per-session cap (the MCP session ID).
+        :raises AdmissionRejected: If the session is at its cap, the queue is full,
+                                   or no slot frees up within queue_timeout.
+        """
+        policy = self.policy
+        if self.draining:
+            raise self._reject("shutting_down", "The server is shutting down; retry against another instance.")
+        session_limit = policy.max_concurrent_per_session
+        if session_limit is not None and self._per_session[session_id] >= session_limit:
+            raise self._reject(
+                "session_concurrency_limit",
+                f"This session already has {session_limit} queries in flight; wait for one to finish.",
+                limit=session_limit,
+            )
+        if self._slots is not None and self._slots.locked() and policy.max_queue is not None \
+                and self._waiting >= policy.max_queue:
+            raise self._reject(
+                "queue_full",
+                "The server is at capacity and its queue is full; retry shortly.",
+                queued=self._waiting,
+                max_queue=policy.max_queue,
+            )
+
+        self._per_session[session_id] += 1
+        try:
+            if self._slots is not None:
+                self._waiting += 1
+                try:
+                    await asyncio.wait_for(self._slots.acquire(), policy.queue_timeout)
+                except asyncio.TimeoutError:
+                    raise self._reject(
+                        "queue_timeout",
+                        f"No execution slot became free within {policy.queue_timeout:.0f}s; retry shortly.",
+                        queue_timeout_seconds=policy.queue_timeout,
+                    ) from None
+                finally:
+                    self._waiting -= 1
+            self.admitted += 1
+            self._running += 1
+            try:
+                yield
+            finally:
+                self._running -= 1
+                if self._slots is not None:
+                    self._slots.release()
+        finally:
+            self._per_session[session_id] -= 1
+            if not self._per_session[session_id]:
+                del self._per_session[session_id]
+
+    async def check_cost(self, estimate):
+        """
+        Rejects the query if its estimated planner cost is above the ceiling.
+        :param estimate: Zero-argument callable returning an awaitable of the total plan cost;
+                         only called when a ceiling is configured.
+        :raises AdmissionRejected: If the estimate exceeds max_plan_cost.
+        """
+        ceiling = self.policy.max_plan_cost
+        if ceiling is None:
+            return
+        cost = await estimate()
+        if cost > ceiling:
+            raise self._reject(
+                "cost_ceiling",
+                "The planner estimates this query is too expensive; add selective filters or a LIMIT "
+                "(see explain_query).",
+                estimated_cost=round(cost, 2),
+                max_plan_cost=ceiling,
+            )
+
+    async def drain(self, timeout=None, poll=0.05):
+        """
+        Stops admitting queries and waits for the running and queued ones to finish.
+        :param timeout: Seconds to wait at most (None waits indefinitely).
+        :return: True if nothing is left in flight.
+        """
+        self.draining = True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._running or self._waiting:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(poll)
+        return True
+
+    def stats(self):
+        """
+        Returns current queue depth, running queries and rejection counters.
+        """
+        return {
+            "draining": self.draining,
+            "running": self._running,
+            "queued": self._waiting,
+            "sessions": len(self._per_session),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+        }
@@ -0,0 +1,48 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from database import QueryHandle
+
+
+class AsyncQueryExecutor:
+    """
+    Runs blocking DatabaseManager calls on a bounded thread pool so that async
+    MCP tools never block the event loop. Size it to the connection pool so that
+    each worker thread can hold its own PostgreSQL backend.
+    """
+
+    def __init__(self, max_workers=10):
+        """
+        Initializes the executor.
+        :param max_workers: Maximum number of queries running at the same time.
+        """
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-query")
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Runs fn(*args, **kwargs) on a worker thread and awaits the result.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def run_cancellable(self, fn, *args, **kwargs):
+        """
+        Like run(), but passes a QueryHandle to fn as `handle`.
+        If the awaiting task is cancelled (e.g. the MCP request was cancelled),
+        the query is cancelled on the PostgreSQL backend as well.
+        """
+        handle = QueryHandle()
+        try:
+            return await self.run(fn, *args, handle=handle, **kwargs)
+        except asyncio.CancelledError:
+            handle.cancel()
+            raise
+
+    def shutdown(self, wait=True):
+        """
+        Stops the worker threads.
+        :param wait: Block until running queries have finished.
+        """
+        self._executor.shutdown(wait=wait)
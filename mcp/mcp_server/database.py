@@ -1,7 +1,170 @@
 import psycopg2
-from psycopg2 import OperationalError, DatabaseError
+from psycopg2 import OperationalError, DatabaseError, ProgrammingError
+from psycopg2.extensions import QueryCanceledError
+from psycopg2.extras import execute_values
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
 from datetime import date
-import random
+import re
+import secrets
+import threading
+import time
+
+from db_pool import ConnectError, ConnectionPool, PoolTimeoutError
+from query_cache import QueryResultCache
+from query_metrics import QueryMetrics, instrumented
+from query_plan import plan_relations, summarize_plan
+from replicas import ReplicaSet
+from result_shaping import SUMMARY_MAX_ROWS, ResultBudget, ResultShaper
+from retry import RetryPolicy, is_connect_error, is_disconnect
+from rollups import (
+    EXPOSURE_TABLE, SOURCE_TABLES, exposure_state, mark_exposure_stale, read_exposure, rebuild_exposure,
+    refresh_exposure,
+)
+from schema_introspection import build_schema_description
+from index_advisor import read_index_statistics
+from seeding import DEFAULT_SEED, CopyStream, SeedGenerator
+from sql_analysis import (
+    changes_session_settings, is_cacheable, is_read_only, is_replica_safe, may_write_tables, normalize_sql,
+    referenced_tables, resets_session_state, split_sql, split_statements, statement_kind, writes_no_tables,
+    written_tables,
+)
+
+
+COPY_BUFFER_SIZE = 1 << 16
+
+# Row count and newest row version (xmin) of the catalog rows describing a schema: DDL inserts,
+# updates or deletes some of them, so the fingerprint changes; plain DML and ANALYZE do not.
+SCHEMA_FINGERPRINT_SQL = """
+WITH ns AS (SELECT oid FROM pg_namespace WHERE nspname = %(schema)s)
+SELECT concat_ws('/',
+    (SELECT count(*) || ':' || coalesce(max(c.xmin::text::bigint), 0)
+     FROM pg_class c WHERE c.relnamespace = (SELECT oid FROM ns)),
+    (SELECT count(*) || ':' || coalesce(max(a.xmin::text::bigint), 0)
+     FROM pg_attribute a JOIN pg_class c ON c.oid = a.attrelid
+     WHERE c.relnamespace = (SELECT oid FROM ns) AND a.attnum > 0),
+    (SELECT count(*) || ':' || coalesce(max(k.xmin::text::bigint), 0)
+     FROM pg_constraint k WHERE k.connamespace = (SELECT oid FROM ns))
+);
+"""
+BATCH_PAGE_SIZE = 1000
+
+# Parameter types of the fixed CRUD statements that run as server-side prepared statements.
+# Keys are the DatabaseManager method names, which double as the prepared statement names.
+PREPARED_STATEMENT_TYPES = {
+    "create_base_image": ("varchar", "varchar", "date"),
+    "create_package": ("varchar", "int"),
+    "get_packages_for_base_image": ("int",),
+    "create_package_tag": ("int", "varchar"),
+    "get_tags_for_package": ("int",),
+    "create_vulnerability": ("varchar", "text", "date"),
+    "get_vulnerability_by_cve": ("varchar",),
+    "add_vulnerability_to_tag": ("int", "int", "varchar"),
+    "get_vulnerabilities_for_tag": ("int",),
+    "create_commit": ("int", "varchar", "varchar", "text"),
+    "get_commits_for_tag": ("int",),
+}
+
+
+def _positional(sql):
+    """
+    Rewrites psycopg2 %s placeholders as $1, $2, ... for use in PREPARE.
+    """
+    counter = iter(range(1, sql.count("%s") + 1))
+    return re.sub(r"%s", lambda _: f"${next(counter)}", sql).strip().rstrip(";")
+
+
+@dataclass
+class BatchResult:
+    """
+    Outcome of a batch write.
+    ids has one entry per input row, in input order: the new row's ID (or key), or None if the row was rejected.
+    conflicts lists (row_index, reason) for every rejected row.
+    """
+    ids: list
+    conflicts: list = field(default_factory=list)
+
+
+class QueryHandle:
+    """
+    Tracks the connection a running query is using so that another thread
+    (typically the event loop of an async MCP tool) can cancel it on the backend.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conn = None
+        self.cancelled = False
+
+    def attach(self, conn):
+        """
+        Binds the handle to the connection about to run the query.
+        :param conn: The checked-out psycopg2 connection.
+        """
+        with self._lock:
+            if self.cancelled:
+                raise QueryCanceledError("query cancelled before it started")
+            self._conn = conn
+
+    def detach(self):
+        """
+        Releases the connection once the query has finished.
+        """
+        with self._lock:
+            self._conn = None
+
+    def cancel(self):
+        """
+        Cancels the running query, or prevents it from starting if it has not yet.
+        """
+        with self._lock:
+            self.cancelled = True
+            if self._conn is not None and not self._conn.closed:
+                self._conn.cancel()
+
+
+class _OpenCursor:
+    """
+    A named server-side cursor kept open between result pages.
+    It owns the pooled connection it was declared on until it is closed.
+    """
+
+    def __init__(self, pool, conn, cursor, columns):
+        self.pool = pool
+        self.conn = conn
+        self.cursor = cursor
+        self.columns = columns
+        self.pending = []  # rows fetched ahead to know whether another page exists
+        self.rows_sent = 0
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.cursor.close()
+            self.conn.rollback()
+        except DatabaseError:
+            pass
+        self.pool.putconn(self.conn)
+
+
+class ExportedSnapshot:
+    """
+    A REPEATABLE READ, READ ONLY transaction kept open so that other connections can import
+    its snapshot and see exactly the same data. It owns its pooled connection until closed;
+    the snapshot can only be imported while it is open.
+    """
+
+    def __init__(self, pool, conn, snapshot_id):
+        self.pool = pool
+        self.conn = conn
+        self.snapshot_id = snapshot_id
+
+    def close(self):
+        try:
+            self.conn.rollback()
+        except DatabaseError:
+            pass
+        self.pool.putconn(self.conn)
 
 
 class DatabaseManager:
@@ -10,7 +173,16 @@ class DatabaseManager:
     Handles base images, packages, tags, vulnerabilities, and their relationships.
     """
 
-    def __init__(self, db_name, user, password, host="localhost", port=5432):
+    READ_AFTER_WRITE_WINDOW = 1.0  # seconds after a write during which reads skip the replicas
+    MAX_PAGE_SIZE = 10000  # rows per execute_query_page call
+    CURSOR_IDLE_TIMEOUT = 300.0  # seconds before an unused paged-query cursor is closed
+    SHAPE_FETCH_SIZE = 2000  # rows fetched per round trip while shaping large results
+
+    def __init__(self, db_name, user, password, host="localhost", port=5432,
+                 min_connections=1, max_connections=10, pool_timeout=30.0,
+                 cache_size=256, cache_ttl=60.0, use_prepared_statements=True, statement_timeout_ms=None,
+                 workload_recorder=None, collect_metrics=True, lazy=False, connect_timeout=10,
+                 retry_policy=None, replicas=None, max_replica_lag=None):
         """
         Initializes the DatabaseManager for package vulnerability tracking.
         :param db_name: The name of the PostgreSQL database.
@@ -18,46 +190,420 @@ class DatabaseManager:
         :param password: The PostgreSQL password.
         :param host: The database host address (defaults to localhost).
         :param port: The connection port number (defaults to 5432).
+        :param min_connections: Connections opened eagerly and kept in the pool (defaults to 1).
+        :param max_connections: Upper bound on pooled connections; values above 1 let
+                                concurrent callers run on separate backends (defaults to 10,
+                                like the server's settings). Open page cursors each hold one,
+                                so with 1 a paged query blocks every other call until it ends.
+        :param pool_timeout: Seconds to wait for a free pooled connection (defaults to 30).
+        :param cache_size: Maximum number of cached execute_raw_query results; 0 disables the cache.
+        :param cache_ttl: Seconds a cached result stays valid (defaults to 60).
+        :param use_prepared_statements: Run the fixed CRUD queries as prepared statements (defaults to True).
+        :param statement_timeout_ms: Per-statement timeout for raw, paged and explained queries
+                                     (defaults to None, i.e. no timeout).
+        :param workload_recorder: Optional index_advisor.WorkloadRecorder that is told about
+                                  every query execute_raw_query sends to the database.
+        :param collect_metrics: Record per-method latency, rows, result size, errors and pool
+                                wait time in self.metrics (defaults to True).
+        :param lazy: Open the connection pool on first use (or warm_up()) instead of here,
+                     so constructing the manager never blocks on, or fails with, the database.
+        :param connect_timeout: Seconds to wait for a new connection before giving up (defaults to 10).
+        :param retry_policy: retry.RetryPolicy for reconnecting and for re-running reads whose
+                             connection broke; defaults to RetryPolicy().
+        :param replicas: Optional read replica DSNs / URIs (or connect-kwargs dicts). Read-only
+                         raw and paged queries go to the replica with the fewest outstanding
+                         requests; database, user and password default to the primary's.
+        :param max_replica_lag: Skip replicas whose replay lag exceeds this many seconds
+                                (None: any lag is accepted).
         """
         self.db_name = db_name
         self.user = user
         self.password = password
         self.host = host
         self.port = port
-        self.conn = None
-        self.cursor = None
-        self._connect()
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.pool_timeout = pool_timeout
+        self.use_prepared_statements = use_prepared_statements
+        self.statement_timeout_ms = statement_timeout_ms
+        self.workload_recorder = workload_recorder
+        self.metrics = QueryMetrics() if collect_metrics else None
+        self.connect_timeout = connect_timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+        self._health = {"up": None, "since": None, "consecutive_failures": 0, "last_error": None}
+        self._probe_stop = None
+        self._last_write = float("-inf")
+        self.replicas = ReplicaSet(
+            replicas or [], self._connect_kwargs(), max_size=max_connections, pool_timeout=pool_timeout,
+            max_lag=max_replica_lag, on_checkout=self.metrics.observe_pool_wait if self.metrics else None,
+        )
+        self.pool = None
+        self._pool_lock = threading.Lock()
+        self._open_cursors = {}
+        self._open_cursors_lock = threading.Lock()
+        self.query_cache = QueryResultCache(max_entries=cache_size, ttl=cache_ttl) if cache_size else None
+        self.schema_version = 0  # bumped whenever this manager sees the schema (or bulk data) change
+        self._exposure_ready = None  # whether the exposure rollup table exists (None: not checked yet)
+        self._exposure_stale = False  # set by raw writes the rollups could not follow, if flagging them failed
+        if not lazy:
+            self._connect()
     
     def get_name(self):
         return f"{self.db_name} {self.host} {self.port}"
 
-    def _connect(self):
+    def _connect(self, force=True):
+        """
+        Establishes the connection pool for the PostgreSQL database.
+        Any previous pool is closed first.
+        :param force: Replace a pool that is still open; with False an open pool (for example
+                      one another thread just created) is kept.
+        """
+        with self._pool_lock:
+            if not force and self.pool is not None and not self.pool.closed:
+                return
+            if self.pool is not None:
+                self.pool.closeall()
+                self.pool = None
+            try:
+                self.pool = ConnectionPool(
+                    self._connect_kwargs(),
+                    min_size=self.min_connections,
+                    max_size=self.max_connections,
+                    timeout=self.pool_timeout,
+                    on_checkout=self.metrics.observe_pool_wait if self.metrics else None,
+                )
+                print(f"Connected to PostgreSQL database: {self.db_name}")
+            except OperationalError as e:
+                print(f"Error connecting to PostgreSQL database: {e}")
+
+    def _connect_kwargs(self):
+        return dict(
+            dbname=self.db_name,
+            user=self.user,
+            password=self.password,
+            host=self.host,
+            port=self.port,
+            connect_timeout=self.connect_timeout,
+        )
+
+    def _get_pool(self):
+        """
+        Returns the current connection pool, (re)creating it if needed.
+        """
+        pool = self.pool
+        if pool is None or pool.closed:
+            self._connect(force=False)
+            pool = self.pool
+        if pool is None:
+            raise ConnectError(f"Not connected to PostgreSQL database: {self.db_name}")
+        return pool
+
+    def _checkout(self, read=False):
         """
-        Establishes a connection to the PostgreSQL database.
+        Returns (pool, connection), retrying with jittered exponential backoff while no
+        connection can be opened. Nothing has been sent yet, so this is safe for any operation.
+        :param read: The connection only runs replica-safe reads; use a replica if one is available.
+        """
+        # Right after a write, reads stay on the primary so they see it despite replication lag.
+        if read and self.replicas and time.monotonic() - self._last_write > self.READ_AFTER_WRITE_WINDOW:
+            replica = self.replicas.choose()
+            if replica is not None:
+                try:
+                    pool = replica.get_pool()
+                    return pool, pool.getconn()
+                except ConnectError as e:
+                    print(f"Read replica {replica.name} unavailable, using the primary: {e}")
+                    replica.mark_down(e, self.replicas.cooldown)
+                except PoolTimeoutError as e:
+                    # The replica is up but busy: read from the primary this time without benching it.
+                    print(f"Read replica {replica.name} busy, using the primary: {e}")
+
+        def checkout():
+            pool = self._get_pool()
+            return pool, pool.getconn()
+
+        return self.retry_policy.call(checkout, is_connect_error)
+
+    def _read_attempts(self):
+        """
+        Attempts for an idempotent read, re-run when its connection broke mid-statement:
+
+            for attempt in self._read_attempts():
+                with attempt, self._cursor() as cursor:
+                    ...
+        """
+        return self.retry_policy.attempts_for(
+            lambda error: is_disconnect(error) and not is_connect_error(error),  # _checkout retried those
+            on_retry=self._on_disconnect,
+        )
+
+    def _on_disconnect(self, error):
+        print(f"Database connection lost ({str(error).strip()}); retrying")
+
+    def warm_up(self):
+        """
+        Opens the connection pool if needed and checks a connection with a trivial query.
+        :return: True if the database answered.
         """
         try:
-            self.conn = psycopg2.connect(
-                dbname=self.db_name,
-                user=self.user,
-                password=self.password,
-                host=self.host,
-                port=self.port
-            )
-            self.cursor = self.conn.cursor()
-            print(f"Connected to PostgreSQL database: {self.db_name}")
-        except OperationalError as e:
-            print(f"Error connecting to PostgreSQL database: {e}")
+            with self._cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            return True
+        except DatabaseError as e:
+            print(f"Database warm-up failed: {e}")
+            return False
+
+    def check_health(self):
+        """
+        Pings the pooled idle connections, replacing broken ones, or reconnects if there is no
+        pool. Records the outcome in health(); replicas are checked too (see replica_stats()).
+        Paged queries left unread for CURSOR_IDLE_TIMEOUT seconds are closed first, so their
+        connections and open transactions are released even if no further paged call comes in.
+        :return: True if the database is reachable.
+        """
+        self._expire_query_pages()
+        self.replicas.check()
+        try:
+            self._get_pool().check_idle()
+        except DatabaseError as e:
+            self._set_health(False, str(e).strip())
+            return False
+        self._set_health(True)
+        return True
+
+    def _set_health(self, up, error=None):
+        health = self._health
+        if up != health["up"]:
+            if up and health["up"] is False:
+                print(f"Connection to PostgreSQL database {self.db_name} restored")
+            elif not up:
+                print(f"PostgreSQL database {self.db_name} is unreachable: {error}")
+            health["since"] = time.time()
+        health["up"] = up
+        health["consecutive_failures"] = 0 if up else health["consecutive_failures"] + 1
+        health["last_error"] = error if not up else health["last_error"]
+
+    def health(self):
+        """
+        Returns the liveness probe's view of the database: up (None before the first check),
+        since (epoch seconds of the last change), consecutive_failures and last_error.
+        """
+        return dict(self._health)
+
+    def start_liveness_probe(self, interval=15.0):
+        """
+        Runs check_health() (which also expires idle paged queries) every `interval` seconds on a
+        daemon thread. While the database is unreachable it checks again after jittered
+        exponential backoff, so the pool is refilled soon after the database returns rather than
+        by the next tool call.
+        :param interval: Seconds between checks while the database is up.
+        """
+        if self._probe_stop is not None:
+            return
+        stop = self._probe_stop = threading.Event()
+
+        def probe():
+            while not stop.is_set():
+                if self.check_health():
+                    wait = interval
+                else:
+                    failures = self._health["consecutive_failures"]
+                    wait = min(interval, max(self.retry_policy.base_delay, self.retry_policy.delay(failures)))
+                stop.wait(wait)
+
+        threading.Thread(target=probe, name="db-liveness", daemon=True).start()
+
+    def stop_liveness_probe(self):
+        if self._probe_stop is not None:
+            self._probe_stop.set()
+            self._probe_stop = None
+
+    def _set_statement_timeout(self, cursor):
+        """
+        Applies statement_timeout_ms to the current transaction only.
+        """
+        if self.statement_timeout_ms:
+            cursor.execute("SET LOCAL statement_timeout = %s;", (int(self.statement_timeout_ms),))
+
+    @contextmanager
+    def _cursor(self, handle=None, limited=False, read=False):
+        """
+        Checks a connection out of the pool and yields a cursor on it.
+        The transaction is committed when the block succeeds and rolled back otherwise;
+        the connection always goes back to the pool.
+        :param handle: Optional QueryHandle bound to the connection while the block runs.
+        :param limited: Apply statement_timeout_ms to the transaction.
+        :param read: The block only runs replica-safe reads (see _checkout).
+        """
+        try:
+            pool, conn = self._checkout(read)
+        except BaseException:
+            self._note_error()
+            raise
+        try:
+            if handle is not None:
+                handle.attach(conn)
+            with conn.cursor() as cursor:
+                if limited:
+                    self._set_statement_timeout(cursor)
+                yield cursor
+            conn.commit()
+        except BaseException as e:
+            self._note_error()
+            if is_disconnect(e):
+                pool.revalidate_idle()  # connections opened alongside the broken one are suspect too
+                replica = self.replicas.owner(pool)
+                if replica is not None:
+                    replica.mark_down(e, self.replicas.cooldown)  # the retry goes elsewhere
+            elif not conn.closed:
+                try:
+                    conn.rollback()
+                except DatabaseError:
+                    pass
+            raise
+        finally:
+            if handle is not None:
+                handle.detach()
+            pool.putconn(conn)
+
+    def _note_error(self):
+        """
+        Counts a failure against the instrumented method running on this thread,
+        even if the method catches the error and returns a fallback value.
+        """
+        if self.metrics is not None:
+            self.metrics.note_error()
+
+    def _execute_prepared(self, cursor, name, sql, params):
+        """
+        Runs one of the fixed CRUD statements. The statement is PREPAREd the first time it is
+        used on a pooled connection and EXECUTEd from then on, so Postgres skips parsing and
+        planning on hot paths. New connections (e.g. after a reconnect) prepare it again.
+        :param cursor: Cursor on a pooled connection.
+        :param name: Key of PREPARED_STATEMENT_TYPES.
+        :param sql: The statement with %s placeholders, used as-is when preparation is off.
+        :param params: Statement parameters.
+        """
+        prepared = getattr(cursor.connection, "prepared_statements", None)
+        if not self.use_prepared_statements or prepared is None:
+            cursor.execute(sql, params)
+            return
+        if name not in prepared:
+            types = ", ".join(PREPARED_STATEMENT_TYPES[name])
+            cursor.execute(f"PREPARE {name} ({types}) AS {_positional(sql)};")
+            prepared.add(name)
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))});", params)
+
+    def _invalidate_cache(self, tables=None):
+        """
+        Drops cached results that read from the given tables (all results if tables is None).
+        Called after every write, so it also starts the read-your-writes window (see _checkout).
+        """
+        self._last_write = time.monotonic()
+        if self.query_cache is not None:
+            self.query_cache.invalidate_tables(tables)
+
+    def _schema_changed(self):
+        """
+        Records a schema change: bumps schema_version and drops every cached result.
+        """
+        self.schema_version += 1
+        self._exposure_ready = None
+        self._invalidate_cache()
+
+    @instrumented
+    def describe_schema(self, schema="public"):
+        """
+        Builds a description of the live schema from the catalog, with row estimates,
+        constraints, indexes and column cardinality hints.
+        :param schema: Schema to describe (defaults to public).
+        """
+        for attempt in self._read_attempts():
+            with attempt, self._cursor() as cursor:
+                return build_schema_description(cursor, schema)
+
+    def schema_fingerprint(self, schema="public"):
+        """
+        Returns a cheap fingerprint of the schema's tables, columns and constraints that changes
+        with any DDL on them, whoever runs it (another client, a migration, another server process).
+        :param schema: Schema to fingerprint (defaults to public).
+        """
+        for attempt in self._read_attempts():
+            with attempt, self._cursor() as cursor:
+                cursor.execute(SCHEMA_FINGERPRINT_SQL, {"schema": schema})
+                return cursor.fetchone()[0]
+
+    @instrumented
+    def index_statistics(self, schema="public"):
+        """
+        Reads the catalog and statistics views used by the index advisor
+        (see index_advisor.read_index_statistics).
+        :param schema: Schema whose tables are considered.
+        """
+        with self._cursor() as cursor:
+            return read_index_statistics(cursor, schema)
+
+    @instrumented
+    def execute_autocommit(self, statement, raise_errors=True):
+        """
+        Runs a statement outside a transaction block, as CREATE INDEX CONCURRENTLY requires.
+        No statement timeout applies, so long index builds are not cut short.
+        :param statement: The SQL statement to run.
+        :param raise_errors: Re-raise database errors instead of returning False.
+        :return: True on success.
+        """
+        try:
+            # Checked out inside the try: a pool timeout or refused connection honours raise_errors
+            # too, so a best-effort cleanup (IndexAdvisor.apply) cannot mask the original error.
+            pool, conn = self._checkout()
+            try:
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(statement)
+            finally:
+                if not conn.closed:
+                    conn.autocommit = False
+                pool.putconn(conn)
+        except DatabaseError as e:
+            self._note_error()
+            print(f"Error running statement outside a transaction: {e}")
+            if raise_errors:
+                raise
+            return False
+        self._schema_changed()
+        return True
+
+    def cache_stats(self):
+        """
+        Returns query result cache counters (hits, misses, evictions, ...).
+        """
+        return self.query_cache.stats() if self.query_cache else {}
+
+    def pool_stats(self):
+        """
+        Returns connection pool usage and checkout wait-time metrics.
+        """
+        return self.pool.stats() if self.pool else {}
+
+    def replica_stats(self):
+        """
+        Returns per-replica health, replay lag and pool usage.
+        """
+        return self.replicas.stats()
 
     def close_connection(self):
         """
-        Closes the database connection.
-        Commits any pending changes before closing.
+        Closes all pooled database connections.
         """
-        if self.conn:
-            self.conn.commit()
-            self.conn.close()
+        self.stop_liveness_probe()
+        self.close_all_query_pages()
+        self.replicas.close()
+        if self.pool:
+            self.pool.closeall()
+            self.pool = None
             print("PostgreSQL database connection closed.")
 
+    @instrumented
     def reset_database(self):
         """
         Resets the database by dropping and recreating it.
@@ -86,17 +632,22 @@ class DatabaseManager:
             print(f"Database '{self.db_name}' created.")
 
         except (OperationalError, DatabaseError) as e:
+            self._note_error()
             print(f"Error during database reset: {e}")
         finally:
             if temp_conn:
                 temp_cursor.close()
                 temp_conn.close()
 
+        self._schema_changed()
         self._connect()  # Reconnect to the newly created database
 
-    def setup_database(self):
+    @instrumented
+    def setup_database(self, scale=1, seed=DEFAULT_SEED):
         """
-        Sets up the package vulnerability tracking database schema.
+        Sets up the package vulnerability tracking database schema and seeds it.
+        :param scale: Row-count multiplier for the seed data (defaults to 1).
+        :param seed: RNG seed for the seed data.
         """
         schema_sql = """
         -- 1. Base Images
@@ -161,16 +712,16 @@ class DatabaseManager:
         """
         
         try:
-            if self.cursor:
-                self.cursor.execute(schema_sql)
-                self.conn.commit()
-                print("Package vulnerability tracking schema created successfully.")
+            with self._cursor() as cursor:
+                cursor.execute(schema_sql)
+            self._schema_changed()
+            print("Package vulnerability tracking schema created successfully.")
         except DatabaseError as e:
             print(f"Error setting up database schema: {e}")
-            self.conn.rollback()
-        return self._seed_db()
+        return self._seed_db(scale=scale, seed=seed)
 
     # CRUD operations for base_images
+    @instrumented
     def create_base_image(self, name, version, release_date=None):
         """
         Creates a new base image entry.
@@ -180,16 +731,17 @@ class DatabaseManager:
         """
         sql = "INSERT INTO base_images (name, version, release_date) VALUES (%s, %s, %s) RETURNING id;"
         try:
-            self.cursor.execute(sql, (name, version, release_date))
-            new_id = self.cursor.fetchone()[0]
-            self.conn.commit()
+            with self._cursor() as cursor:
+                self._execute_prepared(cursor, "create_base_image", sql, (name, version, release_date))
+                new_id = cursor.fetchone()[0]
+            self._invalidate_cache(("base_images",))
             print(f"Created base image {name}:{version} with ID {new_id}")
             return new_id
         except DatabaseError as e:
             print(f"Error creating base image: {e}")
-            self.conn.rollback()
             return None
 
+    @instrumented
     def get_base_images(self, name_filter=None, version_filter=None):
         """
         Retrieves base images, optionally filtered by name or version.
@@ -207,13 +759,16 @@ class DatabaseManager:
             params.append(f"%{version_filter}%")
             
         try:
-            self.cursor.execute(sql, params)
-            return self.cursor.fetchall()
+            for attempt in self._read_attempts():
+                with attempt, self._cursor() as cursor:
+                    cursor.execute(sql, params)
+                    return cursor.fetchall()
         except DatabaseError as e:
             print(f"Error retrieving base images: {e}")
             return []
 
     # CRUD operations for packages
+    @instrumented
     def create_package(self, name, base_image_id):
         """
         Creates a new package associated with a base image.
@@ -222,16 +777,17 @@ class DatabaseManager:
         """
         sql = "INSERT INTO packages (name, base_image_id) VALUES (%s, %s) RETURNING id;"
         try:
-            self.cursor.execute(sql, (name, base_image_id))
-            new_id = self.cursor.fetchone()[0]
-            self.conn.commit()
+            with self._cursor() as cursor:
+                self._execute_prepared(cursor, "create_package", sql, (name, base_image_id))
+                new_id = cursor.fetchone()[0]
+            self._invalidate_cache(("packages",))
             print(f"Created package {name} with ID {new_id}")
             return new_id
         except DatabaseError as e:
             print(f"Error creating package: {e}")
-            self.conn.rollback()
             return None
 
+    @instrumented
     def get_packages_for_base_image(self, base_image_id):
         """
         Retrieves all packages for a specific base image.
@@ -239,13 +795,16 @@ class DatabaseManager:
         """
         sql = "SELECT * FROM packages WHERE base_image_id = %s;"
         try:
-            self.cursor.execute(sql, (base_image_id,))
-            return self.cursor.fetchall()
+            for attempt in self._read_attempts():
+                with attempt, self._cursor() as cursor:
+                    self._execute_prepared(cursor, "get_packages_for_base_image", sql, (base_image_id,))
+                    return cursor.fetchall()
         except DatabaseError as e:
             print(f"Error retrieving packages: {e}")
             return []
 
     # CRUD operations for package_tags
+    @instrumented
     def create_package_tag(self, package_id, tag):
         """
         Creates a new tag for a package.
@@ -254,16 +813,17 @@ class DatabaseManager:
         """
         sql = "INSERT INTO package_tags (package_id, tag) VALUES (%s, %s) RETURNING id;"
         try:
-            self.cursor.execute(sql, (package_id, tag))
-            new_id = self.cursor.fetchone()[0]
-            self.conn.commit()
+            with self._cursor() as cursor:
+                self._execute_prepared(cursor, "create_package_tag", sql, (package_id, tag))
+                new_id = cursor.fetchone()[0]
+            self._invalidate_cache(("package_tags",))
             print(f"Created tag {tag} for package ID {package_id}")
             return new_id
         except DatabaseError as e:
             print(f"Error creating package tag: {e}")
-            self.conn.rollback()
             return None
 
+    @instrumented
     def get_tags_for_package(self, package_id):
         """
         Retrieves all tags for a specific package.
@@ -271,13 +831,16 @@ class DatabaseManager:
         """
         sql = "SELECT * FROM package_tags WHERE package_id = %s;"
         try:
-            self.cursor.execute(sql, (package_id,))
-            return self.cursor.fetchall()
+            for attempt in self._read_attempts():
+                with attempt, self._cursor() as cursor:
+                    self._execute_prepared(cursor, "get_tags_for_package", sql, (package_id,))
+                    return cursor.fetchall()
         except DatabaseError as e:
             print(f"Error retrieving package tags: {e}")
             return []
 
     # CRUD operations for vulnerabilities
+    @instrumented
     def create_vulnerability(self, cve_id, description=None, discovered_at=None):
         """
         Creates a new vulnerability record.
@@ -287,16 +850,17 @@ class DatabaseManager:
         """
         sql = "INSERT INTO vulnerabilities (cve_id, description, discovered_at) VALUES (%s, %s, %s) RETURNING id;"
         try:
-            self.cursor.execute(sql, (cve_id, description, discovered_at))
-            new_id = self.cursor.fetchone()[0]
-            self.conn.commit()
+            with self._cursor() as cursor:
+                self._execute_prepared(cursor, "create_vulnerability", sql, (cve_id, description, discovered_at))
+                new_id = cursor.fetchone()[0]
+            self._invalidate_cache(("vulnerabilities",))
             print(f"Created vulnerability {cve_id} with ID {new_id}")
             return new_id
         except DatabaseError as e:
             print(f"Error creating vulnerability: {e}")
-            self.conn.rollback()
             return None
 
+    @instrumented
     def get_vulnerability_by_cve(self, cve_id):
         """
         Retrieves a vulnerability by its CVE ID.
@@ -304,13 +868,16 @@ class DatabaseManager:
         """
         sql = "SELECT * FROM vulnerabilities WHERE cve_id = %s;"
         try:
-            self.cursor.execute(sql, (cve_id,))
-            return self.cursor.fetchone()
+            for attempt in self._read_attempts():
+                with attempt, self._cursor() as cursor:
+                    self._execute_prepared(cursor, "get_vulnerability_by_cve", sql, (cve_id,))
+                    return cursor.fetchone()
         except DatabaseError as e:
             print(f"Error retrieving vulnerability: {e}")
             return None
 
     # Operations for tag_vulnerabilities (many-to-many relationship)
+    @instrumented
     def add_vulnerability_to_tag(self, package_tag_id, vulnerability_id, severity=None):
         """
         Associates a vulnerability with a package tag.
@@ -325,15 +892,17 @@ class DatabaseManager:
         DO UPDATE SET severity = EXCLUDED.severity;
         """
         try:
-            self.cursor.execute(sql, (package_tag_id, vulnerability_id, severity))
-            self.conn.commit()
+            with self._cursor() as cursor:
+                self._execute_prepared(cursor, "add_vulnerability_to_tag", sql, (package_tag_id, vulnerability_id, severity))
+                self._refresh_exposure(cursor, [package_tag_id])
+            self._invalidate_cache(("tag_vulnerabilities", EXPOSURE_TABLE))
             print(f"Associated vulnerability {vulnerability_id} with tag {package_tag_id}")
             return True
         except DatabaseError as e:
             print(f"Error adding vulnerability to tag: {e}")
-            self.conn.rollback()
             return False
 
+    @instrumented
     def get_vulnerabilities_for_tag(self, package_tag_id):
         """
         Retrieves all vulnerabilities associated with a package tag.
@@ -346,13 +915,16 @@ class DatabaseManager:
         WHERE tv.package_tag_id = %s;
         """
         try:
-            self.cursor.execute(sql, (package_tag_id,))
-            return self.cursor.fetchall()
+            for attempt in self._read_attempts():
+                with attempt, self._cursor() as cursor:
+                    self._execute_prepared(cursor, "get_vulnerabilities_for_tag", sql, (package_tag_id,))
+                    return cursor.fetchall()
         except DatabaseError as e:
             print(f"Error retrieving tag vulnerabilities: {e}")
             return []
 
     # CRUD operations for commits
+    @instrumented
     def create_commit(self, package_tag_id, commit_hash, author=None, message=None):
         """
         Creates a new commit record associated with a package tag.
@@ -366,16 +938,17 @@ class DatabaseManager:
         VALUES (%s, %s, %s, %s) RETURNING id;
         """
         try:
-            self.cursor.execute(sql, (package_tag_id, commit_hash, author, message))
-            new_id = self.cursor.fetchone()[0]
-            self.conn.commit()
+            with self._cursor() as cursor:
+                self._execute_prepared(cursor, "create_commit", sql, (package_tag_id, commit_hash, author, message))
+                new_id = cursor.fetchone()[0]
+            self._invalidate_cache(("commits",))
             print(f"Created commit {commit_hash} for tag ID {package_tag_id}")
             return new_id
         except DatabaseError as e:
             print(f"Error creating commit: {e}")
-            self.conn.rollback()
             return None
 
+    @instrumented
     def get_commits_for_tag(self, package_tag_id):
         """
         Retrieves all commits associated with a package tag.
@@ -383,140 +956,704 @@ class DatabaseManager:
         """
         sql = "SELECT * FROM commits WHERE package_tag_id = %s ORDER BY committed_at DESC;"
         try:
-            self.cursor.execute(sql, (package_tag_id,))
-            return self.cursor.fetchall()
+            for attempt in self._read_attempts():
+                with attempt, self._cursor() as cursor:
+                    self._execute_prepared(cursor, "get_commits_for_tag", sql, (package_tag_id,))
+                    return cursor.fetchall()
         except DatabaseError as e:
             print(f"Error retrieving commits: {e}")
             return []
     
-    def _seed_db(self):
-        """Seed all database tables with sample data."""
-        try:
-            # 1. Seed base_images (10+ entries)
-            base_images = [
-                ("ubuntu", "20.04", date(2020, 4, 23)),
-                ("ubuntu", "22.04", date(2022, 4, 21)),
-                ("debian", "10", date(2019, 7, 6)),
-                ("debian", "11", date(2021, 8, 14)),
-                ("alpine", "3.16", date(2022, 5, 23)),
-                ("alpine", "3.18", date(2023, 5, 9)),
-                ("centos", "7", date(2014, 7, 7)),
-                ("centos", "8", date(2019, 9, 24)),
-                ("amazonlinux", "2", date(2018, 6, 26)),
-                ("amazonlinux", "2023", date(2023, 3, 15)),
-                ("redhat", "8", date(2019, 5, 7)),
-                ("redhat", "9", date(2022, 5, 17)),
-            ]
-            base_image_ids = [self.create_base_image(*img) for img in base_images]
-            
-            # 2. Seed packages (15 entries, multiple per base image)
-            packages = []
-            for base_id in base_image_ids[:6]:  # Distribute packages across base images
-                packages.extend([
-                    (f"openssl-{random.randint(1,3)}.{random.randint(0,1)}.{random.randint(0,20)}", base_id),
-                    (f"nginx-1.{random.randint(10,25)}", base_id),
-                    (f"python3.{random.randint(7,11)}", base_id),
-                    (f"postgresql-{random.randint(12,15)}", base_id),
-                    (f"nodejs-{random.randint(16,20)}", base_id),
-                ])
-            random.shuffle(packages)
-            package_ids = [self.create_package(*pkg) for pkg in packages[:15]]  # Take 15
-            
-            # 3. Seed package_tags (15+ entries, multiple versions per package)
-            tags = []
-            for pkg_id in package_ids[:10]:  # Give most packages multiple tags
-                tags.extend([
-                    (pkg_id, f"1.{random.randint(0,2)}.{random.randint(0,20)}"),
-                    (pkg_id, f"2.{random.randint(0,1)}.{random.randint(0,15)}"),
-                ])
-            tag_ids = [self.create_package_tag(*tag) for tag in tags]
-            
-            # 4. Seed vulnerabilities (15 entries)
-            vulnerabilities = [
-                ("CVE-2023-1234", "OpenSSL buffer overflow in TLS implementation", date(2023, 1, 15)),
-                ("CVE-2022-4304", "DNS query vulnerability in Python", date(2022, 12, 4)),
-                ("CVE-2023-0286", "X.509 certificate validation flaw", date(2023, 2, 7)),
-                ("CVE-2022-3996", "NGINX HTTP/2 memory exhaustion", date(2022, 11, 8)),
-                ("CVE-2022-3116", "PostgreSQL privilege escalation", date(2022, 10, 12)),
-                ("CVE-2023-25690", "HTTP request smuggling in Node.js", date(2023, 3, 22)),
-                ("CVE-2022-42010", "XML external entity vulnerability in libxml2", date(2022, 9, 30)),
-                ("CVE-2023-2650", "Remote code execution in OpenSSL ASN.1", date(2023, 4, 18)),
-                ("CVE-2022-37434", "Zlib buffer overflow", date(2022, 8, 5)),
-                ("CVE-2023-0464", "Bypass of certificate verification", date(2023, 2, 28)),
-                ("CVE-2023-0466", "Denial of service in OpenSSL", date(2023, 5, 3)),
-                ("CVE-2022-4450", "Python zipfile directory traversal", date(2022, 12, 21)),
-                ("CVE-2023-27522", "NGINX buffer overflow", date(2023, 4, 11)),
-                ("CVE-2023-2455", "PostgreSQL memory leak", date(2023, 5, 15)),
-                ("CVE-2023-23919", "Node.js HTTP header injection", date(2023, 3, 7)),
-            ]
-            vuln_ids = [self.create_vulnerability(*vuln) for vuln in vulnerabilities]
-            
-            # 5. Seed tag_vulnerabilities (associate some vulnerabilities with tags)
-            severities = ["CRITICAL", "HIGH", "MEDIUM", "LOW"]
-            for tag_id in tag_ids[:25]:  # Associate vulnerabilities with first 25 tags
-                num_vulns = random.randint(0, 3)  # 0-3 vulnerabilities per tag
-                for _ in range(num_vulns):
-                    vuln_id = random.choice(vuln_ids)
-                    severity = random.choice(severities)
-                    self.add_vulnerability_to_tag(tag_id, vuln_id, severity)
-            
-            # 6. Seed commits (15+ entries)
-            authors = ["Alice Smith", "Bob Johnson", "Charlie Brown", "David Wilson", "Eve Davis"]
-            messages = [
-                "Update security patches",
-                "Fix memory leak",
-                "Upgrade dependencies",
-                "Address CVE vulnerability",
-                "Improve performance",
-                "Refactor core components",
-                "Add new features",
-                "Update documentation",
-                "Fix regression bug",
-                "Enhance logging",
-            ]
-            for tag_id in tag_ids[:15]:  # Add commits to first 15 tags
-                for _ in range(random.randint(1, 2)):  # 1-2 commits per tag
-                    commit_hash = f"{random.getrandbits(128):032x}"
-                    author = random.choice(authors)
-                    message = random.choice(messages)
-                    if "CVE" in message and len(vuln_ids) > 0:
-                        message += f" {random.choice(vuln_ids)}"
-                    self.create_commit(
-                        tag_id,
-                        commit_hash,
-                        author,
-                        message
+    # Batch ingestion: one transaction per call, rows written with multi-row VALUES.
+    # Rows that conflict (duplicate unique key, missing parent) are skipped and reported
+    # instead of aborting the whole batch.
+    _BATCH_TABLES = {
+        "base_images": {
+            "columns": ("name", "version", "release_date"),
+            "types": ("varchar", "varchar", "date"),
+            "parents": {},
+            "unique": None,
+        },
+        "packages": {
+            "columns": ("name", "base_image_id"),
+            "types": ("varchar", "int"),
+            "parents": {"base_image_id": "base_images"},
+            "unique": None,
+        },
+        "package_tags": {
+            "columns": ("package_id", "tag"),
+            "types": ("int", "varchar"),
+            "parents": {"package_id": "packages"},
+            "unique": None,
+        },
+        "vulnerabilities": {
+            "columns": ("cve_id", "description", "discovered_at"),
+            "types": ("varchar", "text", "date"),
+            "parents": {},
+            "unique": "cve_id",
+        },
+        "commits": {
+            "columns": ("package_tag_id", "commit_hash", "author", "message"),
+            "types": ("int", "varchar", "varchar", "text"),
+            "parents": {"package_tag_id": "package_tags"},
+            "unique": "commit_hash",
+        },
+    }
+
+    def _missing_parents(self, cursor, rows, columns, parents):
+        """
+        Returns {row_index: reason} for rows whose foreign keys point at missing parents.
+        Existing parents are locked FOR KEY SHARE so they cannot vanish before the insert.
+        """
+        missing = {}
+        for column, parent in parents.items():
+            position = columns.index(column)
+            wanted = sorted({row[position] for row in rows if row[position] is not None})
+            cursor.execute(
+                f"SELECT id FROM {parent} WHERE id = ANY(%s) FOR KEY SHARE;", (wanted,)
+            )
+            existing = {found for (found,) in cursor.fetchall()}
+            for index, row in enumerate(rows):
+                if index not in missing and row[position] not in existing:
+                    missing[index] = f"{column} {row[position]} does not exist in {parent}"
+        return missing
+
+    def _insert_batch(self, table, rows):
+        """
+        Inserts rows into a table with an identity ID and returns a BatchResult.
+        IDs are drawn from the table's sequence up front, so each input row knows its ID
+        and rows skipped by ON CONFLICT DO NOTHING are identified exactly.
+        """
+        spec = self._BATCH_TABLES[table]
+        columns = spec["columns"]
+        rows = [tuple(row) for row in rows]
+        for row in rows:
+            if len(row) != len(columns):
+                raise ValueError(f"{table} rows must have {len(columns)} values: {', '.join(columns)}")
+        if not rows:
+            return BatchResult([])
+
+        template = "(" + ", ".join(f"%s::{kind}" for kind in ("int",) + spec["types"]) + ")"
+        sql = f"""
+        INSERT INTO {table} (id, {', '.join(columns)})
+        VALUES %s
+        ON CONFLICT DO NOTHING
+        RETURNING id;
+        """
+        with self._cursor() as cursor:
+            conflicts = self._missing_parents(cursor, rows, columns, spec["parents"])
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s);",
+                (table, len(rows) - len(conflicts)),
+            )
+            new_ids = iter(sorted(value for (value,) in cursor.fetchall()))
+            ids = [None if index in conflicts else next(new_ids) for index in range(len(rows))]
+            values = [(row_id,) + row for row_id, row in zip(ids, rows) if row_id is not None]
+            inserted = set()
+            if values:
+                returned = execute_values(cursor, sql, values, template=template,
+                                          page_size=BATCH_PAGE_SIZE, fetch=True)
+                inserted = {row_id for (row_id,) in returned}
+
+        unique = spec["unique"]
+        for index, row_id in enumerate(ids):
+            if row_id is not None and row_id not in inserted:
+                value = rows[index][columns.index(unique)] if unique else row_id
+                conflicts[index] = f"duplicate {unique or 'id'} {value}"
+                ids[index] = None
+        self._invalidate_cache((table,))
+        print(f"Inserted {len(rows) - len(conflicts)} of {len(rows)} rows into {table}")
+        return BatchResult(ids, sorted(conflicts.items()))
+
+    @instrumented
+    def create_base_images(self, rows):
+        """
+        Creates many base images in one transaction.
+        :param rows: Iterable of (name, version, release_date) tuples
+        :return: BatchResult with the new IDs in input order, or None if the batch failed.
+        """
+        try:
+            return self._insert_batch("base_images", rows)
+        except DatabaseError as e:
+            print(f"Error creating base images: {e}")
+            return None
+
+    @instrumented
+    def create_packages(self, rows):
+        """
+        Creates many packages in one transaction.
+        :param rows: Iterable of (name, base_image_id) tuples
+        :return: BatchResult with the new IDs in input order, or None if the batch failed.
+        """
+        try:
+            return self._insert_batch("packages", rows)
+        except DatabaseError as e:
+            print(f"Error creating packages: {e}")
+            return None
+
+    @instrumented
+    def create_package_tags(self, rows):
+        """
+        Creates many package tags in one transaction.
+        :param rows: Iterable of (package_id, tag) tuples
+        :return: BatchResult with the new IDs in input order, or None if the batch failed.
+        """
+        try:
+            return self._insert_batch("package_tags", rows)
+        except DatabaseError as e:
+            print(f"Error creating package tags: {e}")
+            return None
+
+    @instrumented
+    def create_vulnerabilities(self, rows):
+        """
+        Creates many vulnerabilities in one transaction.
+        Rows whose cve_id already exists (or repeats within the batch) are reported as conflicts.
+        :param rows: Iterable of (cve_id, description, discovered_at) tuples
+        :return: BatchResult with the new IDs in input order, or None if the batch failed.
+        """
+        try:
+            return self._insert_batch("vulnerabilities", rows)
+        except DatabaseError as e:
+            print(f"Error creating vulnerabilities: {e}")
+            return None
+
+    @instrumented
+    def create_commits(self, rows):
+        """
+        Creates many commits in one transaction.
+        Rows whose commit_hash already exists (or repeats within the batch) are reported as conflicts.
+        :param rows: Iterable of (package_tag_id, commit_hash, author, message) tuples
+        :return: BatchResult with the new IDs in input order, or None if the batch failed.
+        """
+        try:
+            return self._insert_batch("commits", rows)
+        except DatabaseError as e:
+            print(f"Error creating commits: {e}")
+            return None
+
+    @instrumented
+    def add_vulnerabilities_to_tags(self, rows):
+        """
+        Associates many vulnerabilities with package tags in one transaction.
+        Existing associations get their severity updated, as in add_vulnerability_to_tag.
+        If a pair appears more than once, the last occurrence wins and earlier ones are reported.
+        :param rows: Iterable of (package_tag_id, vulnerability_id, severity) tuples
+        :return: BatchResult whose ids are (package_tag_id, vulnerability_id) keys, or None if the batch failed.
+        """
+        columns = ("package_tag_id", "vulnerability_id", "severity")
+        rows = [tuple(row) for row in rows]
+        for row in rows:
+            if len(row) != len(columns):
+                raise ValueError("tag_vulnerabilities rows must have 3 values: " + ", ".join(columns))
+
+        sql = """
+        INSERT INTO tag_vulnerabilities (package_tag_id, vulnerability_id, severity)
+        VALUES %s
+        ON CONFLICT (package_tag_id, vulnerability_id)
+        DO UPDATE SET severity = EXCLUDED.severity
+        RETURNING package_tag_id, vulnerability_id;
+        """
+        try:
+            with self._cursor() as cursor:
+                conflicts = self._missing_parents(
+                    cursor, rows, columns,
+                    {"package_tag_id": "package_tags", "vulnerability_id": "vulnerabilities"},
+                )
+                last_index = {}
+                for index, row in enumerate(rows):
+                    if index not in conflicts:
+                        last_index[row[:2]] = index
+                for index, row in enumerate(rows):
+                    if index not in conflicts and last_index[row[:2]] != index:
+                        conflicts[index] = f"duplicate in batch, superseded by row {last_index[row[:2]]}"
+                values = [rows[index] for index in sorted(last_index.values())]
+                written = set()
+                if values:
+                    returned = execute_values(cursor, sql, values, template="(%s::int, %s::int, %s::varchar)",
+                                              page_size=BATCH_PAGE_SIZE, fetch=True)
+                    written = {tuple(key) for key in returned}
+                    self._refresh_exposure(cursor, [package_tag_id for package_tag_id, _ in written])
+        except DatabaseError as e:
+            print(f"Error adding vulnerabilities to tags: {e}")
+            return None
+
+        ids = [row[:2] if index not in conflicts and row[:2] in written else None
+               for index, row in enumerate(rows)]
+        self._invalidate_cache(("tag_vulnerabilities", EXPOSURE_TABLE))
+        print(f"Associated {len(written)} vulnerabilities with tags")
+        return BatchResult(ids, sorted(conflicts.items()))
+
+    # Exposure rollups (see rollups.py): vulnerability counts by severity per base image,
+    # package and tag, refreshed incrementally by the tag_vulnerabilities write methods.
+    def _refresh_exposure(self, cursor, package_tag_ids):
+        """
+        Brings the rollup rows of the given tags (and their packages and base images) up to date
+        inside the caller's transaction. Does nothing if the rollup table has not been created.
+        """
+        if package_tag_ids and self._has_exposure_table(cursor):
+            refresh_exposure(cursor, package_tag_ids)
+
+    def _has_exposure_table(self, cursor):
+        if not self._exposure_ready:  # another process may have created it since
+            cursor.execute("SELECT to_regclass(%s) IS NOT NULL;", (EXPOSURE_TABLE,))
+            self._exposure_ready = cursor.fetchone()[0]
+        return self._exposure_ready
+
+    def _mark_exposure_stale(self):
+        """
+        Flags the exposure rollups for a rebuild in the database, where every server process sees it.
+        """
+        try:
+            with self._cursor() as cursor:
+                mark_exposure_stale(cursor)
+        except DatabaseError as e:
+            print(f"Error flagging exposure rollups as stale: {e}")
+            self._exposure_stale = True  # this process rebuilds them at least
+
+    @instrumented
+    def rebuild_exposure_rollups(self):
+        """
+        Creates the exposure rollup table if needed and recomputes it from scratch.
+        :return: True on success, False on error.
+        """
+        try:
+            with self._cursor() as cursor:
+                rebuild_exposure(cursor)
+            self._exposure_ready = True
+            self._exposure_stale = False
+            self._invalidate_cache((EXPOSURE_TABLE,))
+            print("Vulnerability exposure rollups rebuilt.")
+            return True
+        except DatabaseError as e:
+            print(f"Error rebuilding exposure rollups: {e}")
+            return False
+
+    @instrumented
+    def get_vulnerability_exposure(self, scope="base_image", severities=("CRITICAL", "HIGH"), limit=50):
+        """
+        Returns the most exposed base images, packages or tags from the maintained rollups.
+        The rollups are rebuilt first if they do not exist yet or a raw write may have changed
+        the underlying tables.
+        :param scope: "base_image", "package" or "tag".
+        :param severities: Severities to count and rank by, most important first; None counts all.
+        :param limit: Maximum number of entities to return.
+        :return: List of dicts with id, name, vulnerabilities per severity and findings, worst first.
+        """
+        try:
+            with self._cursor() as cursor:
+                if not self._exposure_stale and exposure_state(cursor) == "current":
+                    return read_exposure(cursor, scope, severities, limit)
+            if not self.rebuild_exposure_rollups():
+                return []
+            with self._cursor() as cursor:
+                return read_exposure(cursor, scope, severities, limit)
+        except DatabaseError as e:
+            print(f"Error reading exposure rollups: {e}")
+            return []
+
+    def _seed_db(self, scale=1, seed=DEFAULT_SEED):
+        """Seed all database tables with deterministic sample data."""
+        counts = self.seed_bulk(scale=scale, seed=seed)
+        if counts is None:
+            return "Error seeding database"
+        print("Database seeded successfully!")
+        return "Database seeded successfully!"
+
+    @instrumented
+    def seed_bulk(self, scale=1, seed=DEFAULT_SEED, truncate=True):
+        """
+        Streams generated sample data into every table with COPY FROM STDIN in a single transaction.
+        :param scale: Row-count multiplier (1 matches the original sample dataset).
+        :param seed: RNG seed; the same scale and seed always produce the same data.
+        :param truncate: Empty all tables (and restart identities) before loading.
+        :return: Dict of rows loaded per table, or None if seeding failed.
+        """
+        generator = SeedGenerator(scale=scale, seed=seed)
+        counts = {}
+        started = time.perf_counter()
+        try:
+            with self._cursor() as cursor:
+                if truncate:
+                    cursor.execute(
+                        "TRUNCATE base_images, packages, package_tags, vulnerabilities, "
+                        "tag_vulnerabilities, commits RESTART IDENTITY CASCADE;"
                     )
-            
-            print("Database seeded successfully!")
-            return "Database seeded successfully!"
-            
-        except Exception as e:
+                for table, columns, rows in generator.tables():
+                    cursor.copy_expert(
+                        f"COPY {table} ({', '.join(columns)}) FROM STDIN",
+                        CopyStream(rows),
+                        size=COPY_BUFFER_SIZE,
+                    )
+                    counts[table] = cursor.rowcount
+                    if "id" in columns:
+                        # Explicit IDs bypass the identity sequence; move it past the loaded rows.
+                        cursor.execute(
+                            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                            f"COALESCE(MAX(id), 0) + 1, false) FROM {table};"
+                        )
+                rebuild_exposure(cursor)
+                # Fresh statistics for the planner and describe_schema.
+                cursor.execute(f"ANALYZE {', '.join(counts)}, {EXPOSURE_TABLE};")
+            self._exposure_stale = False
+            self._schema_changed()
+        except DatabaseError as e:
             print(f"Error seeding database: {e}")
-            return f"Error seeding database: {e}"
-    
-    def execute_raw_query(self, query: str):
+            return None
+        print(f"Seeded {sum(counts.values())} rows (scale={scale}, seed={seed}) "
+              f"in {time.perf_counter() - started:.2f}s")
+        return counts
+
+    SNAPSHOT_ISOLATION = "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY;"
+
+    def export_snapshot(self):
+        """
+        Opens a read-only REPEATABLE READ transaction on the primary and exports its snapshot,
+        for execute_raw_query(snapshot=...) calls that must all see the same data.
+        :return: ExportedSnapshot; close it once the queries using it have finished.
+        """
+        pool, conn = self._checkout()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(self.SNAPSHOT_ISOLATION)
+                cursor.execute("SELECT pg_export_snapshot();")
+                snapshot_id = cursor.fetchone()[0]
+        except BaseException:
+            self._note_error()
+            pool.putconn(conn, close=conn.closed)
+            raise
+        return ExportedSnapshot(pool, conn, snapshot_id)
+
+    @instrumented
+    def execute_raw_query(self, query: str, handle=None, raise_errors=False, include_columns=False, snapshot=None):
         """
         Executes a raw SQL query and returns the results.
 
         :param query: The SQL query to be executed.
-        :return: Query results as a list of tuples.
+        :param handle: Optional QueryHandle that lets another thread cancel the query.
+        :param raise_errors: Re-raise database errors (e.g. statement timeouts) instead of returning None.
+        :param include_columns: Return {"columns": [...], "rows": [...]} instead of just the rows.
+        :param snapshot: Snapshot ID of an open ExportedSnapshot. The query then runs read-only on the
+                         primary in that snapshot, bypassing the result cache.
+        :return: Query results as a list of tuples (None for statements that return no rows).
         """
-        if not self.conn or self.conn.closed:
-            self._connect()
+        cache_key = None
+        if snapshot is None and self.query_cache is not None and is_cacheable(query):
+            cache_key = normalize_sql(query)
+            cached = self.query_cache.get(cache_key, with_columns=True)
+            if cached is not None:
+                rows, columns = cached
+                return {"columns": columns, "rows": list(rows)} if include_columns else list(rows)
+            cache_epoch = self.query_cache.epoch
 
+        # Reads are re-run if their connection drops; a write may have committed, so it is not.
+        attempts = self._read_attempts() if is_read_only(query) else [nullcontext()]
         try:
-            self.cursor.execute(query)
-            if self.cursor.description:  # Ensures the query returns data (e.g., SELECT)
-                return self.cursor.fetchall()
+            for attempt in attempts:
+                read = snapshot is None and is_replica_safe(query)  # snapshots only exist on the primary
+                with attempt, self._cursor(handle, limited=True, read=read) as cursor:
+                    if snapshot is not None:
+                        cursor.execute(self.SNAPSHOT_ISOLATION)
+                        cursor.execute("SET TRANSACTION SNAPSHOT %s;", (snapshot,))
+                    if changes_session_settings(query):
+                        cursor.connection.session_dirty = True  # reset before the connection is reused
+                    started = time.perf_counter()
+                    cursor.execute(query)
+                    rows = cursor.fetchall() if cursor.description else None  # Ensures the query returns data (e.g., SELECT)
+                    columns = [column.name for column in cursor.description] if cursor.description else None
+                    if resets_session_state(query):
+                        getattr(cursor.connection, "prepared_statements", set()).clear()
+        except DatabaseError as e:
+            print(f"Database error during query execution: {e}")
+            if raise_errors:
+                raise
+            return None
+        if self.workload_recorder is not None:
+            self.workload_recorder.record(query, time.perf_counter() - started)
+
+        if cache_key is not None and rows is not None:
+            self.query_cache.put(cache_key, referenced_tables(query), rows, cache_epoch, columns)
+            rows = list(rows)
+        elif not is_read_only(query) and not writes_no_tables(query):
+            tables = written_tables(query)
+            if may_write_tables(query, SOURCE_TABLES):
+                self._mark_exposure_stale()  # rebuilt on the next get_vulnerability_exposure
+            if tables is None:
+                self._schema_changed()  # DDL, or a block that may have run DDL
             else:
-                self.conn.commit()
+                self._invalidate_cache(tables)
+        if include_columns and rows is not None:
+            return {"columns": columns, "rows": rows}
+        return rows
+
+
+    @instrumented
+    def explain_query(self, query, analyze=False, buffers=False, handle=None):
+        """
+        Returns a condensed EXPLAIN (FORMAT JSON) summary for a single SQL statement.
+        With analyze=True the statement really runs, inside a transaction that is always
+        rolled back, so writes leave no trace.
+
+        :param query: The SQL statement to explain.
+        :param analyze: Execute the statement to collect actual row counts and timings.
+        :param buffers: Include buffer usage (only with analyze).
+        :param handle: Optional QueryHandle that lets another thread cancel the statement.
+        :return: Plan summary dict (see query_plan.summarize_plan).
+        :raises ValueError: If the query contains more than one statement.
+        :raises DatabaseError: If Postgres rejects the statement.
+        """
+        if len(split_statements(query)) != 1:
+            raise ValueError("explain_query takes exactly one SQL statement.")
+        options = ["FORMAT JSON"]
+        if analyze:
+            options.append("ANALYZE")
+            if buffers:
+                options.append("BUFFERS")
+
+        with self._cursor(handle, limited=analyze) as cursor:
+            try:
+                cursor.execute(f"EXPLAIN ({', '.join(options)}) {query.strip().rstrip(';')}")
+                plan = cursor.fetchone()[0]
+                cursor.execute(
+                    "SELECT relname, reltuples FROM pg_class "
+                    "WHERE relname = ANY(%s) AND relkind IN ('r', 'p', 'm');",
+                    (sorted(plan_relations(plan)),),
+                )
+                table_rows = {name: max(rows, 0) for name, rows in cursor.fetchall()}
+            finally:
+                cursor.connection.rollback()
+        return summarize_plan(plan, table_rows)
+
+    @instrumented
+    def estimate_cost(self, query, handle=None):
+        """
+        Returns the planner's total estimated cost of a query, summed over its statements.
+        Nothing is executed. Statements EXPLAIN cannot plan (DDL, SET, ...) count as zero.
+        :param query: The SQL to estimate.
+        :param handle: Optional QueryHandle that lets another thread cancel planning.
+        """
+        total = 0.0
+        with self._cursor(handle) as cursor:
+            for statement in split_sql(query):
+                try:
+                    cursor.execute(f"EXPLAIN (FORMAT JSON) {statement}")
+                    total += cursor.fetchone()[0][0]["Plan"]["Total Cost"]
+                except ProgrammingError:
+                    pass
+                cursor.connection.rollback()
+        return total
+
+    # Paged execution through named server-side cursors
+
+    def _max_open_cursors(self):
+        # Open cursors pin pooled connections, so leave at least half the pool for other work.
+        return max(1, self.max_connections // 2)
+
+    def _expire_query_pages(self):
+        """
+        Closes cursors that have not been read for CURSOR_IDLE_TIMEOUT seconds.
+        """
+        now = time.monotonic()
+        with self._open_cursors_lock:
+            expired = [token for token, entry in self._open_cursors.items()
+                       if now - entry.last_used > self.CURSOR_IDLE_TIMEOUT]
+            entries = [self._open_cursors.pop(token) for token in expired]
+        for entry in entries:
+            entry.close()
+
+    def _open_query_page(self, query, scrollable=False):
+        """
+        Declares a named cursor for the query on a dedicated pooled connection.
+        Evicts the least recently used open cursor when the limit is reached.
+        :param scrollable: Declare the cursor SCROLL so it can be repositioned after reading ahead.
+        """
+        evicted = None
+        with self._open_cursors_lock:
+            if len(self._open_cursors) >= self._max_open_cursors():
+                token = min(self._open_cursors, key=lambda t: self._open_cursors[t].last_used)
+                evicted = self._open_cursors.pop(token)
+        if evicted is not None:
+            evicted.close()
+
+        pool, conn = self._checkout(read=is_replica_safe(query))
+        try:
+            with conn.cursor() as setup:
+                self._set_statement_timeout(setup)
+            cursor = conn.cursor(name=f"page_{secrets.token_hex(8)}", scrollable=scrollable)
+            cursor.execute(query)
+        except BaseException:
+            self._note_error()
+            pool.putconn(conn, close=conn.closed)
+            raise
+        return _OpenCursor(pool, conn, cursor, None)
+
+    @instrumented
+    def execute_query_page(self, query=None, page_size=500, continuation_token=None, handle=None, raise_errors=False):
+        """
+        Executes a SELECT query through a named server-side cursor and returns one page of rows.
+        Only one page is held in memory; the rest of the result stays on the server until requested.
+
+        :param query: The SQL query to start paging through (omit when continuing).
+        :param page_size: Number of rows per page (capped at MAX_PAGE_SIZE).
+        :param continuation_token: Token returned by a previous call, to fetch the next page.
+        :param handle: Optional QueryHandle that lets another thread cancel the fetch.
+        :param raise_errors: Re-raise database errors (e.g. statement timeouts) instead of returning None.
+        :return: Dict with columns, rows, offset and continuation_token (None on the last page),
+                 or None if the query failed.
+        :raises ValueError: If both or neither of query and continuation_token are given, or the
+                            token is unknown or expired.
+        """
+        if (query is None) == (continuation_token is None):
+            raise ValueError("Pass either a query or a continuation_token.")
+        page_size = max(1, min(int(page_size), self.MAX_PAGE_SIZE))
+        self._expire_query_pages()
+
+        if continuation_token is not None:
+            with self._open_cursors_lock:
+                entry = self._open_cursors.pop(continuation_token, None)
+            if entry is None:
+                raise ValueError("Unknown or expired continuation token; re-run the query.")
+        else:
+            try:
+                entry = self._open_query_page(query)
+            except DatabaseError as e:
+                print(f"Database error during paged query execution: {e}")
+                if raise_errors:
+                    raise
                 return None
+            continuation_token = secrets.token_urlsafe(12)
+
+        try:
+            if handle is not None:
+                handle.attach(entry.conn)
+            try:
+                rows = entry.pending + entry.cursor.fetchmany(page_size + 1 - len(entry.pending))
+            finally:
+                if handle is not None:
+                    handle.detach()
         except DatabaseError as e:
-            print(f"Database error during query execution: {e}")
-            self.conn.rollback()
+            self._note_error()
+            print(f"Database error during paged query execution: {e}")
+            entry.close()
+            if raise_errors:
+                raise
             return None
 
+        if entry.columns is None:
+            entry.columns = [column.name for column in entry.cursor.description]
+        offset = entry.rows_sent
+        entry.pending = rows[page_size:]
+        rows = rows[:page_size]
+        entry.rows_sent += len(rows)
+
+        if entry.pending:
+            entry.last_used = time.monotonic()
+            with self._open_cursors_lock:
+                self._open_cursors[continuation_token] = entry
+        else:
+            entry.close()
+            continuation_token = None
+
+        return {
+            "columns": entry.columns,
+            "rows": rows,
+            "offset": offset,
+            "continuation_token": continuation_token,
+        }
+
+    @instrumented
+    def execute_shaped_query(self, query, max_rows=None, max_bytes=None, max_tokens=None, handle=None):
+        """
+        Executes a query and fits its result into a row / byte / token budget.
+        A result over budget is cut to the head that fits and returned with the exact row count,
+        a per-column summary of all rows and a continuation token for execute_query_page.
+        Single read-only statements are read through a scrollable server-side cursor, so only the
+        head is held in memory and the token continues right after it; other statements run as
+        execute_raw_query and their results get no token.
+
+        :param query: The SQL query to be executed.
+        :param max_rows: Maximum rows returned.
+        :param max_bytes: Maximum compact-JSON bytes of the returned rows.
+        :param max_tokens: Maximum estimated tokens of the returned rows.
+        :param handle: Optional QueryHandle that lets another thread cancel the query.
+        :return: Dict built by ResultShaper.result(), or None for statements that return no rows.
+        :raises ValueError: If a limit is negative.
+        :raises DatabaseError: If Postgres rejects the query.
+        """
+        budget = ResultBudget(max_rows, max_bytes, max_tokens)
+        cursor_kinds = ("select", "with", "values", "table")  # statements DECLARE ... CURSOR accepts
+        if len(split_statements(query)) != 1 or not is_read_only(query) or statement_kind(query) not in cursor_kinds:
+            result = self.execute_raw_query(query, handle=handle, raise_errors=True, include_columns=True)
+            if result is None:
+                return None
+            shaper = ResultShaper(result["columns"], budget)
+            shaper.add(result["rows"])
+            return shaper.result()
+
+        self._expire_query_pages()
+        entry = self._open_query_page(query, scrollable=True)
+        try:
+            if handle is not None:
+                handle.attach(entry.conn)
+            try:
+                rows = entry.cursor.fetchmany(self.SHAPE_FETCH_SIZE)
+                # A named cursor only has a description once something was fetched.
+                shaper = ResultShaper([column.name for column in entry.cursor.description], budget)
+                shaper.add(rows)
+                while len(rows) == self.SHAPE_FETCH_SIZE and shaper.row_count < SUMMARY_MAX_ROWS:
+                    rows = entry.cursor.fetchmany(self.SHAPE_FETCH_SIZE)
+                    shaper.add(rows)
+                total_rows = None
+                if shaper.row_count >= SUMMARY_MAX_ROWS:
+                    # Count the remainder on the server instead of transferring it.
+                    with entry.conn.cursor() as mover:
+                        mover.execute(f'MOVE FORWARD ALL IN "{entry.cursor.name}";')
+                        total_rows = shaper.row_count + mover.rowcount
+                    if total_rows > shaper.row_count:
+                        shaper.stop()  # the rows past the read limit were counted, not returned
+                if shaper.truncated:
+                    entry.cursor.scroll(len(shaper.head), mode="absolute")
+            finally:
+                if handle is not None:
+                    handle.detach()
+        except BaseException:
+            self._note_error()
+            entry.close()
+            raise
+
+        if not shaper.truncated:
+            entry.close()
+            return shaper.result(total_rows=total_rows)
+        entry.columns = shaper.columns
+        entry.rows_sent = len(shaper.head)
+        entry.last_used = time.monotonic()
+        continuation_token = secrets.token_urlsafe(12)
+        with self._open_cursors_lock:
+            self._open_cursors[continuation_token] = entry
+        return shaper.result(continuation_token, total_rows)
+
+    def close_query_page(self, continuation_token):
+        """
+        Releases a paged query before its last page has been read.
+        :param continuation_token: Token returned by execute_query_page.
+        :return: True if an open cursor was closed.
+        """
+        with self._open_cursors_lock:
+            entry = self._open_cursors.pop(continuation_token, None)
+        if entry is None:
+            return False
+        entry.close()
+        return True
+
+    def close_all_query_pages(self):
+        """
+        Closes every open paged query.
+        """
+        with self._open_cursors_lock:
+            entries = list(self._open_cursors.values())
+            self._open_cursors.clear()
+        for entry in entries:
+            entry.close()
 
 
 # Example Usage
@@ -0,0 +1,311 @@
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import OperationalError
+from psycopg2 import extensions
+
+
+class PoolTimeoutError(OperationalError):
+    """
+    Raised when no pooled connection becomes available within the checkout timeout.
+    """
+
+
+class ConnectError(OperationalError):
+    """
+    Raised when a new connection cannot be opened (server down, restarting or unreachable).
+    No statement was sent, so the operation that needed the connection can always be retried.
+    """
+
+
+# Puts session settings back to the server defaults; RESET ALL leaves the role alone.
+SESSION_RESET_SQL = "RESET ALL; RESET SESSION AUTHORIZATION; RESET ROLE;"
+
+
+class PooledConnection(extensions.connection):
+    """
+    A psycopg2 connection that remembers which statements have been PREPAREd on it,
+    and whether its session settings need resetting before the next checkout.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+        self.session_dirty = False  # set by callers that ran SET, set_config() and the like
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of PostgreSQL connections.
+    Callers check a connection out with getconn() and hand it back with putconn().
+    When every connection is busy and the pool is at max_size, getconn() blocks
+    until one is returned or the timeout expires.
+    """
+
+    def __init__(self, connect_kwargs, min_size=1, max_size=1, timeout=30.0, health_check_interval=30.0,
+                 on_checkout=None):
+        """
+        Initializes the pool and opens min_size connections up front.
+        :param connect_kwargs: Keyword arguments passed to psycopg2.connect.
+        :param min_size: Number of connections opened eagerly and kept around.
+        :param max_size: Upper bound on open connections.
+        :param timeout: Seconds getconn() waits for a free connection before raising PoolTimeoutError.
+        :param health_check_interval: Idle seconds after which a connection is pinged on checkout.
+        :param on_checkout: Optional callable receiving each checkout's wait time in seconds.
+        """
+        self.connect_kwargs = dict(connect_kwargs)
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size, 1)
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.on_checkout = on_checkout
+        self.closed = False
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, last_used) pairs, most recently used on the right
+        self._in_use = set()
+        self._size = 0  # idle + in use + connections being opened
+
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+
+        for _ in range(self.min_size):
+            self._size += 1
+            try:
+                conn = self._new_connection()
+            except Exception:
+                self._size -= 1
+                self.closeall()
+                raise
+            self._idle.append((conn, time.monotonic()))
+
+    def _new_connection(self):
+        try:
+            conn = psycopg2.connect(connection_factory=PooledConnection, **self.connect_kwargs)
+        except OperationalError as e:
+            raise ConnectError(str(e).strip()) from e
+        with self._cond:
+            self._created += 1
+        return conn
+
+    def _is_healthy(self, conn, last_used):
+        """
+        Checks a connection before handing it out.
+        Connections idle for longer than health_check_interval are pinged with SELECT 1.
+        """
+        if conn.closed:
+            return False
+        if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        return self._ping(conn)
+
+    def _ping(self, conn):
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _reset_session(self, conn):
+        """
+        Resets session settings (search_path, role, timeouts, ...) changed by the last user.
+        Prepared statements are kept. Returns False if the connection could not be reset.
+        """
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(SESSION_RESET_SQL)
+            conn.commit()
+        except psycopg2.Error:
+            return False
+        conn.session_dirty = False
+        return True
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self, timeout=None):
+        """
+        Checks a healthy connection out of the pool, opening a new one if allowed.
+        :param timeout: Optional override of the pool's checkout timeout in seconds.
+        :return: An open psycopg2 connection that must be handed back with putconn().
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.perf_counter()
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            while True:
+                if self.closed:
+                    raise OperationalError("connection pool is closed")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn, last_used = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"no connection available after {timeout:.1f}s "
+                        f"(max_size={self.max_size})"
+                    )
+                self._cond.wait(remaining)
+
+        if conn is not None and not self._is_healthy(conn, last_used):
+            self._close_quietly(conn)
+            with self._cond:
+                self._discarded += 1
+            conn = None  # keep the slot and open a replacement below
+
+        if conn is None:
+            try:
+                conn = self._new_connection()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+
+        waited = time.perf_counter() - started
+        with self._cond:
+            if self.closed:
+                self._size -= 1
+                self._close_quietly(conn)
+                raise OperationalError("connection pool is closed")
+            self._in_use.add(conn)
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        if self.on_checkout is not None:
+            self.on_checkout(waited)
+        return conn
+
+    def putconn(self, conn, close=False):
+        """
+        Returns a connection to the pool.
+        Broken connections, or any connection when close is True, are closed instead of reused.
+        Connections flagged session_dirty have their session settings reset first.
+        :param conn: A connection previously obtained from getconn().
+        :param close: Discard the connection rather than keeping it idle.
+        """
+        if not close and not conn.closed:
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+        if not close and not conn.closed and getattr(conn, "session_dirty", False):
+            close = not self._reset_session(conn)
+
+        with self._cond:
+            self._in_use.discard(conn)
+            if close or conn.closed or self.closed:
+                self._size -= 1
+                self._discarded += 1
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def revalidate_idle(self):
+        """
+        Makes every idle connection be pinged on its next checkout, for when one connection
+        turned out broken and the others (opened to the same server) probably are too.
+        """
+        with self._cond:
+            self._idle = deque((conn, float("-inf")) for conn, _ in self._idle)
+
+    def check_idle(self):
+        """
+        Pings the idle connections now, closes the broken ones and reopens connections up to
+        min_size. Meant for a background liveness probe, so request paths find healthy connections.
+        :return: Number of connections discarded.
+        :raises ConnectError: If a replacement connection cannot be opened.
+        """
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+        healthy, broken = [], []
+        for conn, last_used in idle:
+            if not conn.closed and self._ping(conn):
+                healthy.append((conn, last_used))
+            else:
+                self._close_quietly(conn)
+                broken.append(conn)
+        with self._cond:
+            if self.closed:
+                for conn, _ in healthy:
+                    self._close_quietly(conn)
+                self._size -= len(healthy)
+            else:
+                self._idle.extendleft(reversed(healthy))  # behind connections returned in the meantime
+            self._size -= len(broken)
+            self._discarded += len(broken)
+            self._cond.notify_all()
+
+        while True:
+            with self._cond:
+                if self.closed or self._size >= self.min_size:
+                    break
+                self._size += 1
+            try:
+                conn = self._new_connection()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.appendleft((conn, time.monotonic()))
+                self._cond.notify()
+        return len(broken)
+
+    def closeall(self):
+        """
+        Closes the pool. Idle connections are closed immediately,
+        checked-out ones as soon as they are returned.
+        """
+        with self._cond:
+            self.closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._size -= 1
+                self._close_quietly(conn)
+            self._cond.notify_all()
+
+    def stats(self):
+        """
+        Returns a snapshot of pool usage, including checkout wait-time metrics.
+        """
+        with self._cond:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "checkouts": self._checkouts,
+                "wait_avg_ms": (self._wait_total / self._checkouts * 1000) if self._checkouts else 0.0,
+                "wait_max_ms": self._wait_max * 1000,
+                "wait_total_ms": self._wait_total * 1000,
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "discarded": self._discarded,
+            }
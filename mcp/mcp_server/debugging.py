@@ -1,3 +1,5 @@
+import sys
+
 from database import DatabaseManager
 
 postgres = "postgres"
@@ -10,4 +12,7 @@ db_manager = DatabaseManager(
 )
 
 # db_manager.reset_database()
-db_manager.setup_database()
+# usage: python debugging.py [scale] [seed]
+scale = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+seed = int(sys.argv[2]) if len(sys.argv) > 2 else 42
+db_manager.setup_database(scale=scale, seed=seed)
@@ -0,0 +1,84 @@
+"""
+Serves the MCP server over streamable HTTP from several worker processes.
+
+usage: python http_server.py    (configured by QUERY_MCP_* variables, see settings.py)
+
+Clients connect to http://QUERY_MCP_HTTP_HOST:QUERY_MCP_HTTP_PORT/mcp instead of spawning a
+server process each. The transport is stateless, so any worker can answer any request, and
+answers with plain JSON: log and progress notifications are not streamed back. Each
+worker is a separate process with its own connection pools, sized to its share of
+QUERY_MCP_MAX_CONNECTIONS. Continuation tokens of paged queries stay with the worker that
+opened the cursor: clients keeping their HTTP connection alive reach the same worker again,
+others may have to re-run the query. /metrics reports the worker that answers the scrape.
+
+Every request is a new MCP session, so the per-session admission cap applies per client:
+clients sharing an address (e.g. behind a proxy) should send an X-Client-ID header. State a
+worker keeps for itself is handled as follows when there are several:
+- the index advisor records each worker's queries apart, so while it is enabled
+  (QUERY_MCP_INDEX_ADVISOR) the server runs a single worker;
+- the query result cache is off, since a write would only invalidate its own worker's cache;
+- cached schema descriptions are checked against the catalog, and writes that leave the
+  exposure rollups stale flag them in the database, so every worker sees both;
+- with read replicas, only the worker that made a write keeps its next second of reads on the
+  primary (DatabaseManager.READ_AFTER_WRITE_WINDOW). Another worker may send a read issued right
+  after that write to a lagging replica, so a client may not see its own write yet. Bound the
+  lag with QUERY_MCP_MAX_REPLICA_LAG, or leave out the replicas where that matters.
+
+On SIGTERM or SIGINT a worker stops accepting connections and lets in-flight requests finish
+(up to QUERY_MCP_SHUTDOWN_TIMEOUT seconds). It then rejects new queries, waits for the
+queries it admitted, and closes the database connections.
+"""
+import os
+from contextlib import asynccontextmanager
+
+import uvicorn
+
+import server
+
+
+def create_app():
+    """
+    Builds the ASGI app of one worker: FastMCP's streamable HTTP app whose lifespan also starts
+    the background database tasks and drains and closes the databases on shutdown.
+    """
+    # JSON rather than SSE responses: sse_starlette cuts SSE streams as soon as uvicorn starts
+    # shutting down, which would abort in-flight tool calls instead of draining them.
+    app = server.mcp.http_app(path=server.settings.http_path, stateless_http=True, json_response=True)
+    mcp_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app):
+        server.start_background_tasks()
+        try:
+            async with mcp_lifespan(app):
+                yield
+        finally:
+            drained = await server.admission.drain(server.settings.shutdown_timeout)
+            if not drained:
+                print(f"Shutdown timeout reached with {server.admission.stats()['running']} queries still running.")
+            server.close(wait=drained)
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
+app = create_app()
+
+
+def main():
+    settings = server.settings
+    print(f"Serving MCP on http://{settings.http_host}:{settings.http_port}{settings.http_path} "
+          f"with {settings.workers} worker(s)")
+    uvicorn.run(
+        "http_server:app",  # an import string, so each worker process builds its own app and pools
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        host=settings.http_host,
+        port=settings.http_port,
+        workers=settings.workers,
+        timeout_graceful_shutdown=settings.shutdown_timeout,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from psycopg2 import DatabaseError
+
+from sql_analysis import fingerprint, is_ddl, predicate_columns, referenced_tables
+
+# Workload-driven index advice: remembers the shapes of queries run through
+# execute_raw_query (and reads pg_stat_statements when the extension is installed),
+# finds the columns they filter and join on, and proposes single-column
+# CREATE INDEX CONCURRENTLY statements ranked by the sequential-scan work they would save.
+
+MIN_TABLE_ROWS = 1000  # smaller tables are cheap to scan; indexing them rarely pays off
+MAX_SELECTIVITY = 0.3  # skip columns whose typical predicate matches more than this fraction of rows
+RANGE_SELECTIVITY = 1 / 3  # Postgres' default guess for an inequality
+MAX_STATEMENTS = 200  # pg_stat_statements entries read, by total execution time
+MAX_INDEX_NAME = 63
+
+_COLUMNS_SQL = """
+SELECT c.relname, a.attname
+FROM pg_attribute a
+JOIN pg_class c ON c.oid = a.attrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = %s AND c.relkind IN ('r', 'p') AND a.attnum > 0 AND NOT a.attisdropped;
+"""
+
+# Columns that already lead a valid index; a second index on them would not help.
+_INDEXED_SQL = """
+SELECT c.relname, a.attname
+FROM pg_index i
+JOIN pg_class c ON c.oid = i.indrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = i.indkey[0]
+WHERE n.nspname = %s AND i.indisvalid;
+"""
+
+_TABLE_STATS_SQL = """
+SELECT c.relname,
+       CASE WHEN c.reltuples >= 0 THEN c.reltuples::bigint ELSE coalesce(s.n_live_tup, 0) END,
+       coalesce(s.seq_scan, 0), coalesce(s.seq_tup_read, 0), coalesce(s.idx_scan, 0)
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+WHERE n.nspname = %s AND c.relkind IN ('r', 'p');
+"""
+
+_DISTINCT_SQL = """
+SELECT tablename, attname, n_distinct
+FROM pg_stats
+WHERE schemaname = %s;
+"""
+
+_STATEMENTS_SQL = """
+SELECT query, calls, mean_exec_time
+FROM pg_stat_statements
+WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+ORDER BY total_exec_time DESC
+LIMIT %s;
+"""
+
+
+def read_index_statistics(cursor, schema="public"):
+    """
+    Reads what the advisor needs from the catalog and statistics views.
+    pg_stat_statements is optional: when it is not installed (or not preloaded)
+    `statements` is None.
+    :param cursor: Open cursor on the target database (inside a transaction).
+    :param schema: Schema whose tables are considered.
+    """
+    cursor.execute(_COLUMNS_SQL, (schema,))
+    columns = set(cursor.fetchall())
+    cursor.execute(_INDEXED_SQL, (schema,))
+    indexed = set(cursor.fetchall())
+    cursor.execute(_TABLE_STATS_SQL, (schema,))
+    tables = {
+        name: {"rows": rows, "seq_scan": seq_scan, "seq_tup_read": seq_tup_read, "idx_scan": idx_scan}
+        for name, rows, seq_scan, seq_tup_read, idx_scan in cursor.fetchall()
+    }
+    cursor.execute(_DISTINCT_SQL, (schema,))
+    n_distinct = {(table, column): value for table, column, value in cursor.fetchall()}
+
+    statements = None
+    cursor.execute("SELECT to_regclass('pg_stat_statements') IS NOT NULL;")
+    if cursor.fetchone()[0]:
+        cursor.execute("SAVEPOINT index_advisor;")
+        try:
+            cursor.execute(_STATEMENTS_SQL, (MAX_STATEMENTS,))
+            statements = cursor.fetchall()
+            cursor.execute("RELEASE SAVEPOINT index_advisor;")
+        except DatabaseError:  # extension created but not in shared_preload_libraries, or pre-13 columns
+            cursor.execute("ROLLBACK TO SAVEPOINT index_advisor;")
+    return {
+        "columns": columns,
+        "indexed": indexed,
+        "tables": tables,
+        "n_distinct": n_distinct,
+        "statements": statements,
+    }
+
+
+def _quote_ident(name):
+    if re.fullmatch(r"[a-z_][a-z0-9_]*", name):
+        return name
+    return '"' + name.replace('"', '""') + '"'
+
+
+class WorkloadRecorder:
+    """
+    Counts executions and time per query shape (see sql_analysis.fingerprint).
+    Keeps at most max_shapes shapes, dropping the least recently seen.
+    """
+
+    def __init__(self, max_shapes=1000):
+        self.max_shapes = max_shapes
+        self._lock = threading.Lock()
+        self._shapes = OrderedDict()  # fingerprint -> [example query, calls, total seconds]
+
+    def record(self, query, seconds):
+        """
+        Records one execution of a query.
+        :param query: The SQL text that ran.
+        :param seconds: How long it took.
+        """
+        if is_ddl(query):
+            return
+        key = fingerprint(query)
+        with self._lock:
+            entry = self._shapes.get(key)
+            if entry is None:
+                if len(self._shapes) >= self.max_shapes:
+                    self._shapes.popitem(last=False)
+                entry = self._shapes[key] = [query, 0, 0.0]
+            else:
+                self._shapes.move_to_end(key)
+            entry[1] += 1
+            entry[2] += seconds
+
+    def shapes(self):
+        """
+        Returns the recorded shapes as (example query, calls, mean milliseconds), busiest first.
+        """
+        with self._lock:
+            entries = [(query, calls, total / calls * 1000) for query, calls, total in self._shapes.values()]
+        return sorted(entries, key=lambda entry: entry[1] * entry[2], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._shapes.clear()
+
+
+class IndexAdvisor:
+    """
+    Proposes and applies indexes for the workload seen by a DatabaseManager.
+    """
+
+    def __init__(self, db_manager, recorder, schema="public", min_table_rows=MIN_TABLE_ROWS,
+                 max_selectivity=MAX_SELECTIVITY):
+        """
+        :param db_manager: The DatabaseManager whose database is advised on.
+        :param recorder: WorkloadRecorder fed by db_manager.execute_raw_query.
+        :param schema: Schema whose tables are considered.
+        :param min_table_rows: Tables with fewer estimated rows are never indexed.
+        :param max_selectivity: Columns whose predicates match a larger fraction of rows are skipped.
+        """
+        self.db_manager = db_manager
+        self.recorder = recorder
+        self.schema = schema
+        self.min_table_rows = min_table_rows
+        self.max_selectivity = max_selectivity
+        self._lock = threading.Lock()
+        self._recommendations = {}  # index name -> last recommendation
+
+    def _candidates(self, workload, columns):
+        """
+        Aggregates the workload into {(table, column): calls, time and predicate kinds}.
+        """
+        candidates = {}
+        for query, calls, mean_ms in workload:
+            tables = referenced_tables(query)
+            for table, column, kind in predicate_columns(query):
+                if table is None:
+                    owners = [name for name in tables if (name, column) in columns]
+                    table = owners[0] if len(owners) == 1 else None
+                if (table, column) not in columns:
+                    continue
+                entry = candidates.setdefault((table, column), {"calls": 0, "time_ms": 0.0, "kinds": set(), "examples": []})
+                entry["calls"] += calls
+                entry["time_ms"] += calls * (mean_ms or 0.0)
+                entry["kinds"].add(kind)
+                if len(entry["examples"]) < 2:
+                    entry["examples"].append(fingerprint(query))
+        return candidates
+
+    def _selectivity(self, kinds, n_distinct, rows):
+        if n_distinct is None:
+            distinct = None
+        elif n_distinct < 0:
+            distinct = -n_distinct * rows
+        else:
+            distinct = n_distinct
+        if kinds & {"equality", "join"} and distinct:
+            return 1 / max(distinct, 1)
+        if "range" in kinds:
+            return RANGE_SELECTIVITY
+        return None  # never ANALYZEd: no basis for an estimate
+
+    def recommend(self, limit=10):
+        """
+        Ranks index candidates for the recorded workload (merged with pg_stat_statements when available).
+        :param limit: Maximum number of recommendations.
+        :return: Dict with the recommendations, workload sources and skipped candidates with reasons.
+        """
+        stats = self.db_manager.index_statistics(self.schema)
+        recorded = self.recorder.shapes()
+        columns = stats["columns"]
+
+        # Both sources usually see the same traffic, so take the busier one per column rather than summing.
+        candidates = self._candidates(recorded, columns)
+        if stats["statements"]:
+            for key, entry in self._candidates(stats["statements"], columns).items():
+                if key not in candidates or entry["calls"] > candidates[key]["calls"]:
+                    candidates[key] = entry
+
+        recommendations, skipped = [], []
+        for (table, column), entry in candidates.items():
+            table_stats = stats["tables"].get(table, {})
+            rows = table_stats.get("rows") or 0
+            reason = None
+            selectivity = self._selectivity(entry["kinds"], stats["n_distinct"].get((table, column)), rows)
+            if (table, column) in stats["indexed"]:
+                reason = "already the leading column of an index"
+            elif rows < self.min_table_rows:
+                reason = f"table has ~{rows} rows (< {self.min_table_rows}); a sequential scan is cheap"
+            elif selectivity is None:
+                reason = "no column statistics yet; ANALYZE the table"
+            elif selectivity > self.max_selectivity:
+                reason = f"predicates match ~{selectivity:.0%} of rows; an index would rarely be used"
+            if reason:
+                skipped.append({"table": table, "column": column, "reason": reason})
+                continue
+
+            rows_after = max(rows * selectivity, 1.0)
+            name = f"idx_{table}_{column}"[:MAX_INDEX_NAME]
+            recommendations.append({
+                "index_name": name,
+                "table": table,
+                "columns": [column],
+                "statement": (
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {_quote_ident(name)} "
+                    f"ON {_quote_ident(self.schema)}.{_quote_ident(table)} ({_quote_ident(column)});"
+                ),
+                "predicates": sorted(entry["kinds"]),
+                "calls": entry["calls"],
+                "example_shapes": entry["examples"],
+                "estimated_benefit": {
+                    "rows_read_per_call_before": rows,
+                    "rows_read_per_call_after": round(rows_after),
+                    "rows_avoided_total": round(entry["calls"] * (rows - rows_after)),
+                    "time_saved_ms_upper_bound": round(entry["time_ms"] * (1 - rows_after / rows), 2),
+                },
+                "table_scans": {
+                    "seq_scan": table_stats.get("seq_scan", 0),
+                    "seq_tup_read": table_stats.get("seq_tup_read", 0),
+                    "idx_scan": table_stats.get("idx_scan", 0),
+                },
+            })
+
+        recommendations.sort(key=lambda item: item["estimated_benefit"]["rows_avoided_total"], reverse=True)
+        recommendations = recommendations[:limit]
+        with self._lock:
+            self._recommendations = {item["index_name"]: item for item in recommendations}
+        return {
+            "recommendations": recommendations,
+            "workload": {
+                "recorded_shapes": len(recorded),
+                "pg_stat_statements": stats["statements"] is not None,
+            },
+            "skipped": skipped,
+        }
+
+    def apply(self, index_name):
+        """
+        Builds one index from the latest recommend() result with CREATE INDEX CONCURRENTLY,
+        so writes to the table are not blocked while it builds.
+        If the build fails, the invalid index it leaves behind is dropped.
+        :param index_name: The `index_name` of a recommendation.
+        :return: Dict with the index name, statement and build time.
+        :raises KeyError: If the name is not among the latest recommendations.
+        """
+        with self._lock:
+            recommendation = self._recommendations.get(index_name)
+        if recommendation is None:
+            raise KeyError(f"No pending recommendation named {index_name!r}; call recommend first.")
+
+        started = time.perf_counter()
+        try:
+            self.db_manager.execute_autocommit(recommendation["statement"])
+        except Exception:
+            self.db_manager.execute_autocommit(
+                f"DROP INDEX CONCURRENTLY IF EXISTS {_quote_ident(self.schema)}.{_quote_ident(index_name)};",
+                raise_errors=False,
+            )
+            raise
+        with self._lock:
+            self._recommendations.pop(index_name, None)
+        return {
+            "index_name": index_name,
+            "statement": recommendation["statement"],
+            "build_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryResultCache:
+    """
+    An in-process cache of query results keyed on normalized SQL.
+    Entries are evicted least-recently-used once max_entries is reached, expire after
+    ttl seconds, and are invalidated when a write touches any table they read from.
+    Writes made outside this process are only picked up when entries expire.
+    """
+
+    def __init__(self, max_entries=256, ttl=60.0, max_rows=10000):
+        """
+        Initializes the cache.
+        :param max_entries: Maximum number of cached results.
+        :param ttl: Seconds an entry stays valid.
+        :param max_rows: Results with more rows than this are not cached.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, tables, rows, columns)
+        self._keys_by_table = {}
+        self._epoch = 0  # bumped on every invalidation
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def epoch(self):
+        """
+        Invalidation counter; read it before running a query and pass it to put().
+        """
+        return self._epoch
+
+    def _drop(self, key):
+        _, tables, _, _ = self._entries.pop(key)
+        for table in tables:
+            keys = self._keys_by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_table[table]
+
+    def get(self, key, with_columns=False):
+        """
+        Returns the cached rows for key, or None on a miss.
+        :param with_columns: Return (rows, column names) instead of just the rows.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return (entry[2], entry[3]) if with_columns else entry[2]
+
+    def put(self, key, tables, rows, epoch, columns=None):
+        """
+        Stores rows for key.
+        :param key: Normalized SQL.
+        :param tables: Tables the query reads from.
+        :param rows: The result rows.
+        :param epoch: Value of `epoch` read before the query ran; the result is discarded
+                      if a write invalidated the cache in the meantime.
+        :param columns: Optional column names of the result.
+        """
+        if len(rows) > self.max_rows:
+            return
+        with self._lock:
+            if epoch != self._epoch:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, frozenset(tables), rows, columns)
+            for table in tables:
+                self._keys_by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_tables(self, tables):
+        """
+        Drops every entry that reads from one of the given tables.
+        :param tables: Iterable of table names, or None to drop everything.
+        """
+        with self._lock:
+            self._epoch += 1
+            if tables is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._keys_by_table.clear()
+                return
+            for table in tables:
+                for key in list(self._keys_by_table.get(table, ())):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        """
+        Drops every entry.
+        """
+        self.invalidate_tables(None)
+
+    def stats(self):
+        """
+        Returns hit/miss/eviction counters and the current size.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
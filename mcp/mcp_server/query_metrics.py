@@ -0,0 +1,271 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+
+# Per-method call metrics for DatabaseManager: latency histograms, rows returned,
+# approximate result bytes, error counts, and the pool's checkout wait time.
+# Recording a call is a handful of additions under a lock (a few microseconds);
+# result sizes are estimated from a small sample of rows rather than serialized.
+
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+SIZE_SAMPLE_ROWS = 8
+METRIC_PREFIX = "query_mcp"
+
+
+class _Series:
+    __slots__ = ("buckets", "count", "total", "max", "errors", "rows", "bytes")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self.rows = 0
+        self.bytes = 0
+
+    def quantile(self, fraction):
+        """
+        Estimates a latency quantile by interpolating inside the histogram bucket that holds it.
+        """
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, in_bucket in enumerate(self.buckets):
+            if in_bucket and seen + in_bucket >= rank:
+                lower = LATENCY_BUCKETS[index - 1] if index else 0.0
+                upper = LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / in_bucket, self.max)
+            seen += in_bucket
+        return self.max
+
+
+def result_size(result):
+    """
+    Returns (rows, approximate bytes) for a DatabaseManager return value.
+    Bytes are extrapolated from the text length of the first SIZE_SAMPLE_ROWS rows.
+    """
+    if result is None or isinstance(result, bool):
+        return 0, 0
+    if isinstance(result, dict):
+        rows = result.get("rows")
+        if rows is None:
+            return 1, len(str(result))
+        result = rows
+    elif hasattr(result, "ids") and hasattr(result, "conflicts"):  # BatchResult
+        return sum(1 for row_id in result.ids if row_id is not None), 0
+    if isinstance(result, list):
+        if not result:
+            return 0, 0
+        sample = result[:SIZE_SAMPLE_ROWS]
+        sampled = sum(len(str(row)) for row in sample)
+        return len(result), sampled * len(result) // len(sample)
+    return 1, len(str(result))
+
+
+class QueryMetrics:
+    """
+    Thread-safe registry of per-method call metrics and pool wait times.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._pool_wait = _Series()
+        self._local = threading.local()
+
+    def observe(self, method, seconds, rows=0, nbytes=0, error=False):
+        """
+        Records one call.
+        :param method: Name of the instrumented method.
+        :param seconds: Wall-clock duration.
+        :param rows: Rows returned.
+        :param nbytes: Approximate size of the result.
+        :param error: Whether the call failed (raised, or caught a database error).
+        """
+        index = bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            series = self._series.get(method)
+            if series is None:
+                series = self._series[method] = _Series()
+            series.buckets[index] += 1
+            series.count += 1
+            series.total += seconds
+            if seconds > series.max:
+                series.max = seconds
+            series.rows += rows
+            series.bytes += nbytes
+            if error:
+                series.errors += 1
+
+    def observe_pool_wait(self, seconds):
+        """
+        Records how long a connection checkout waited (ConnectionPool on_checkout hook).
+        """
+        index = bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            series = self._pool_wait
+            series.buckets[index] += 1
+            series.count += 1
+            series.total += seconds
+            if seconds > series.max:
+                series.max = seconds
+
+    def note_error(self):
+        """
+        Marks the instrumented call running on this thread as failed, for methods that
+        catch database errors and return a fallback value instead of raising.
+        """
+        self._local.error = True
+
+    def snapshot(self):
+        """
+        Returns per-method summaries (count, errors, mean/p50/p95/p99/max ms, rows, bytes)
+        and the pool wait summary.
+        """
+        with self._lock:
+            series = dict(self._series)
+            pool_wait = self._pool_wait
+
+            def summary(item, with_results=True):
+                entry = {
+                    "count": item.count,
+                    "mean_ms": round(item.total / item.count * 1000, 3) if item.count else 0.0,
+                    "p50_ms": round(item.quantile(0.50) * 1000, 3),
+                    "p95_ms": round(item.quantile(0.95) * 1000, 3),
+                    "p99_ms": round(item.quantile(0.99) * 1000, 3),
+                    "max_ms": round(item.max * 1000, 3),
+                }
+                if with_results:
+                    entry.update(errors=item.errors, rows=item.rows, bytes=item.bytes)
+                return entry
+
+            return {
+                "methods": {name: summary(item) for name, item in sorted(series.items())},
+                "pool_wait": summary(pool_wait, with_results=False),
+            }
+
+    def render_prometheus(self, pool_stats=None, extra_gauges=None, extra_counters=None):
+        """
+        Renders the metrics in the Prometheus text exposition format.
+        :param pool_stats: Optional ConnectionPool.stats() for connection gauges.
+        :param extra_gauges: Optional {metric name: value} published as gauges.
+        :param extra_counters: Optional {metric name: (help text, value)} published as counters;
+                               names should end in _total.
+        """
+        lines = []
+
+        def braces(labels):
+            return "{" + labels + "}" if labels else ""
+
+        def histogram(name, help_text, items):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, item in items:
+                cumulative = 0
+                for bound, in_bucket in zip(LATENCY_BUCKETS + (float("inf"),), item.buckets):
+                    cumulative += in_bucket
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    bucket_labels = (labels + "," if labels else "") + f'le="{le}"'
+                    lines.append(f"{name}_bucket{{{bucket_labels}}} {cumulative}")
+                lines.append(f"{name}_sum{braces(labels)} {item.total}")
+                lines.append(f"{name}_count{braces(labels)} {item.count}")
+
+        def counter(name, help_text, attribute, items):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, item in items:
+                lines.append(f"{name}{braces(labels)} {getattr(item, attribute)}")
+
+        with self._lock:
+            items = [(f'method="{name}"', item) for name, item in sorted(self._series.items())]
+            histogram(f"{METRIC_PREFIX}_call_duration_seconds", "DatabaseManager call latency.", items)
+            counter(f"{METRIC_PREFIX}_call_errors_total", "DatabaseManager calls that failed.", "errors", items)
+            counter(f"{METRIC_PREFIX}_rows_returned_total", "Rows returned by DatabaseManager calls.", "rows", items)
+            counter(f"{METRIC_PREFIX}_result_bytes_total", "Approximate size of returned results.", "bytes", items)
+            histogram(f"{METRIC_PREFIX}_pool_wait_seconds", "Time spent waiting for a pooled connection.",
+                      [("", self._pool_wait)])
+
+        if pool_stats:
+            lines.append(f"# HELP {METRIC_PREFIX}_pool_connections Pooled connections by state.")
+            lines.append(f"# TYPE {METRIC_PREFIX}_pool_connections gauge")
+            for state in ("idle", "in_use"):
+                lines.append(f'{METRIC_PREFIX}_pool_connections{{state="{state}"}} {pool_stats[state]}')
+            lines.append(f"# HELP {METRIC_PREFIX}_pool_timeouts_total Checkouts that gave up waiting for a connection.")
+            lines.append(f"# TYPE {METRIC_PREFIX}_pool_timeouts_total counter")
+            lines.append(f"{METRIC_PREFIX}_pool_timeouts_total {pool_stats['timeouts']}")
+        for name, value in (extra_gauges or {}).items():
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} gauge")
+            lines.append(f"{METRIC_PREFIX}_{name} {value}")
+        for name, (help_text, value) in (extra_counters or {}).items():
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} counter")
+            lines.append(f"{METRIC_PREFIX}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def instrumented(method):
+    """
+    Decorator for DatabaseManager methods: records latency, result size and errors in
+    self.metrics (a QueryMetrics, or None to disable instrumentation).
+    """
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        metrics = self.metrics
+        if metrics is None:
+            return method(self, *args, **kwargs)
+        local = metrics._local
+        outer_error = getattr(local, "error", False)
+        local.error = False
+        started = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+        except BaseException:
+            metrics.observe(name, time.perf_counter() - started, error=True)
+            local.error = outer_error
+            raise
+        elapsed = time.perf_counter() - started
+        failed = local.error
+        local.error = outer_error or failed
+        rows, nbytes = result_size(result)
+        metrics.observe(name, elapsed, rows, nbytes, failed)
+        return result
+
+    return wrapper
+
+
+def start_metrics_server(port, render, host="127.0.0.1"):
+    """
+    Serves render() as Prometheus text on http://host:port/metrics from a daemon thread,
+    for transports (such as stdio) that have no HTTP server of their own.
+    :param port: TCP port to listen on.
+    :param render: Zero-argument callable returning the exposition text.
+    :param host: Interface to bind (defaults to loopback only).
+    :return: The running ThreadingHTTPServer (call shutdown() to stop it).
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # keep scrapes out of the server's output
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=httpd.serve_forever, name="metrics-http", daemon=True).start()
+    return httpd
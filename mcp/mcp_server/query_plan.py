@@ -0,0 +1,118 @@
+# Condenses EXPLAIN (FORMAT JSON) output into a short summary an agent can act on.
+
+SEQ_SCAN_ROW_THRESHOLD = 10000  # sequential scans on tables at least this big are flagged
+MISESTIMATE_FACTOR = 10  # actual vs. estimated rows differing by more than this are flagged
+TOP_NODES = 5
+
+
+def _walk(node, depth=0):
+    yield node, depth
+    for child in node.get("Plans", ()):
+        yield from _walk(child, depth + 1)
+
+
+def plan_relations(plan_document):
+    """
+    Returns the set of relation names scanned anywhere in the plan.
+    """
+    root = plan_document[0]["Plan"]
+    return {node["Relation Name"] for node, _ in _walk(root) if "Relation Name" in node}
+
+
+def _actual_rows(node):
+    if "Actual Rows" not in node:
+        return None
+    return node["Actual Rows"] * node.get("Actual Loops", 1)
+
+
+def _describe(node):
+    label = node["Node Type"]
+    if "Index Name" in node:
+        label += f" using {node['Index Name']}"
+    if "Relation Name" in node:
+        label += f" on {node['Relation Name']}"
+    return label
+
+
+def summarize_plan(plan_document, table_rows=None, top_n=TOP_NODES):
+    """
+    Builds a compact summary of an EXPLAIN (FORMAT JSON) result.
+    :param plan_document: The parsed JSON returned by EXPLAIN (a one-element list).
+    :param table_rows: Optional {table: estimated row count} used to flag large sequential scans.
+    :param top_n: Number of most expensive nodes to report.
+    :return: Dict with total cost, row estimates, sequential scans, indexes used, top cost nodes and warnings.
+    """
+    table_rows = table_rows or {}
+    document = plan_document[0]
+    root = document["Plan"]
+    analyzed = "Actual Rows" in root
+
+    nodes = []
+    seq_scans = []
+    indexes_used = set()
+    misestimates = []
+    for node, depth in _walk(root):
+        child_cost = sum(child["Total Cost"] for child in node.get("Plans", ()))
+        estimated = node["Plan Rows"]
+        actual = _actual_rows(node)
+        entry = {
+            "node": _describe(node),
+            "depth": depth,
+            "self_cost": round(max(node["Total Cost"] - child_cost, 0.0), 2),
+            "total_cost": node["Total Cost"],
+            "estimated_rows": estimated,
+        }
+        if actual is not None:
+            entry["actual_rows"] = actual
+            entry["actual_ms"] = round(node.get("Actual Total Time", 0.0) * node.get("Actual Loops", 1), 3)
+        nodes.append(entry)
+
+        if "Index Name" in node:
+            indexes_used.add(node["Index Name"])
+        if node["Node Type"] == "Seq Scan":
+            table = node.get("Relation Name")
+            size = table_rows.get(table)
+            if (size if size is not None else estimated) >= SEQ_SCAN_ROW_THRESHOLD:
+                scan = {"table": table, "table_rows": size, "estimated_rows": estimated}
+                if "Filter" in node:
+                    scan["filter"] = node["Filter"]
+                seq_scans.append(scan)
+        if actual is not None and max(actual, estimated) > 0:
+            ratio = max(actual, 1) / max(estimated, 1)
+            if ratio > MISESTIMATE_FACTOR or ratio < 1 / MISESTIMATE_FACTOR:
+                misestimates.append({"node": entry["node"], "estimated_rows": estimated, "actual_rows": actual})
+
+    summary = {
+        "analyzed": analyzed,
+        "total_cost": root["Total Cost"],
+        "estimated_rows": root["Plan Rows"],
+        "seq_scans": seq_scans,
+        "indexes_used": sorted(indexes_used),
+        "top_nodes": sorted(nodes, key=lambda n: n["self_cost"], reverse=True)[:top_n],
+    }
+    if analyzed:
+        summary["actual_rows"] = _actual_rows(root)
+        summary["planning_ms"] = document.get("Planning Time")
+        summary["execution_ms"] = document.get("Execution Time")
+        summary["misestimates"] = misestimates
+        if "Shared Hit Blocks" in root:
+            summary["buffers"] = {
+                "shared_hit": root["Shared Hit Blocks"],
+                "shared_read": root.get("Shared Read Blocks", 0),
+                "temp_written": root.get("Temp Written Blocks", 0),
+            }
+
+    warnings = []
+    for scan in seq_scans:
+        warnings.append(
+            f"Sequential scan on {scan['table']}"
+            + (f" ({scan['table_rows']:.0f} rows)" if scan["table_rows"] is not None else "")
+            + (f" filtering {scan['filter']}; consider an index on the filtered column" if "filter" in scan else "")
+        )
+    for item in misestimates:
+        warnings.append(
+            f"{item['node']}: estimated {item['estimated_rows']} rows, got {item['actual_rows']}; "
+            "statistics may be stale (ANALYZE the table)"
+        )
+    summary["warnings"] = warnings
+    return summary
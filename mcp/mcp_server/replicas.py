@@ -0,0 +1,180 @@
+import random
+import threading
+import time
+
+from psycopg2 import DatabaseError
+from psycopg2.extensions import parse_dsn
+
+from db_pool import ConnectionPool
+
+# Read replicas for DatabaseManager. Read-only statements are sent to the replica with the
+# fewest checked-out connections (least outstanding requests); a replica that fails, or whose
+# replay lag exceeds the configured maximum, is skipped and reads fall back to the primary.
+
+LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0  -- caught up; the primary may just be idle
+    ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+END;
+"""
+
+
+def replica_connect_kwargs(replica, primary):
+    """
+    Connection arguments for a replica given as a DSN / URI string or a dict.
+    Settings it leaves out (database, user, password, timeout) are taken from the primary.
+    """
+    kwargs = parse_dsn(replica) if isinstance(replica, str) else dict(replica)
+    if "db_name" in kwargs:
+        kwargs["dbname"] = kwargs.pop("db_name")
+    for key, value in primary.items():
+        kwargs.setdefault(key, value)
+    return kwargs
+
+
+class Replica:
+    """
+    One read replica: a lazily opened connection pool plus its health and replication lag.
+    """
+
+    def __init__(self, connect_kwargs, max_size, pool_timeout, on_checkout=None):
+        self.connect_kwargs = connect_kwargs
+        self.name = f"{connect_kwargs.get('host', 'localhost')}:{connect_kwargs.get('port', 5432)}"
+        self.max_size = max_size
+        self.pool_timeout = pool_timeout
+        self.on_checkout = on_checkout
+        self.pool = None
+        self.down_until = 0.0  # monotonic time before which the replica is skipped
+        self.last_error = None
+        self.lag = None  # seconds, None until measured
+        self.lag_checked = 0.0
+        self._lock = threading.Lock()
+
+    def get_pool(self):
+        with self._lock:
+            if self.pool is None or self.pool.closed:
+                self.pool = ConnectionPool(self.connect_kwargs, min_size=0, max_size=self.max_size,
+                                           timeout=self.pool_timeout, on_checkout=self.on_checkout)
+            return self.pool
+
+    def outstanding(self):
+        pool = self.pool
+        return pool.stats()["in_use"] if pool is not None else 0
+
+    def mark_down(self, error, cooldown):
+        self.down_until = time.monotonic() + cooldown
+        self.last_error = str(error).strip()
+        pool = self.pool
+        if pool is not None:
+            pool.revalidate_idle()
+
+    def measure_lag(self):
+        pool = self.get_pool()
+        conn = pool.getconn()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(LAG_SQL)
+                self.lag = float(cursor.fetchone()[0])
+            conn.rollback()
+        finally:
+            pool.putconn(conn)
+        self.lag_checked = time.monotonic()
+        return self.lag
+
+    def close(self):
+        with self._lock:
+            if self.pool is not None:
+                self.pool.closeall()
+                self.pool = None
+
+    def stats(self):
+        pool = self.pool.stats() if self.pool is not None else {}
+        return {
+            "name": self.name,
+            "up": time.monotonic() >= self.down_until,
+            "lag_s": None if self.lag is None else round(self.lag, 3),
+            "in_use": pool.get("in_use", 0),
+            "idle": pool.get("idle", 0),
+            "checkouts": pool.get("checkouts", 0),
+            "last_error": self.last_error,
+        }
+
+
+class ReplicaSet:
+    """
+    Chooses the replica for each read.
+    """
+
+    def __init__(self, replicas, primary_kwargs, max_size=1, pool_timeout=30.0, max_lag=None,
+                 lag_check_interval=1.0, cooldown=5.0, on_checkout=None):
+        """
+        :param replicas: DSN / URI strings or connect-kwargs dicts, one per replica.
+        :param primary_kwargs: The primary's connect kwargs, supplying defaults for the replicas.
+        :param max_size: Connection pool size per replica.
+        :param pool_timeout: Seconds to wait for a free replica connection.
+        :param max_lag: Skip replicas whose replay lag exceeds this many seconds (None: no limit).
+        :param lag_check_interval: Seconds a lag measurement is reused.
+        :param cooldown: Seconds a failed replica is skipped before it is tried again.
+        :param on_checkout: Optional callable receiving each checkout's wait time.
+        """
+        self.replicas = [
+            Replica(replica_connect_kwargs(replica, primary_kwargs), max_size, pool_timeout, on_checkout)
+            for replica in replicas
+        ]
+        self.max_lag = max_lag
+        self.lag_check_interval = lag_check_interval
+        self.cooldown = cooldown
+
+    def __bool__(self):
+        return bool(self.replicas)
+
+    def _fresh_enough(self, replica):
+        if self.max_lag is None:
+            return True
+        if time.monotonic() - replica.lag_checked > self.lag_check_interval:
+            try:
+                replica.measure_lag()
+            except DatabaseError as e:
+                replica.mark_down(e, self.cooldown)
+                return False
+        return replica.lag <= self.max_lag
+
+    def choose(self):
+        """
+        Returns the available replica with the fewest outstanding requests (ties broken at
+        random), or None if every replica is down or lagging.
+        """
+        now = time.monotonic()
+        candidates = [replica for replica in self.replicas if now >= replica.down_until]
+        random.shuffle(candidates)
+        for replica in sorted(candidates, key=Replica.outstanding):
+            if self._fresh_enough(replica):
+                return replica
+        return None
+
+    def owner(self, pool):
+        for replica in self.replicas:
+            if replica.pool is pool:
+                return replica
+        return None
+
+    def check(self):
+        """
+        Liveness check: pings idle replica connections and refreshes lag measurements.
+        Failed replicas are marked down.
+        """
+        for replica in self.replicas:
+            try:
+                replica.get_pool().check_idle()
+                replica.measure_lag()
+                replica.down_until = 0.0
+            except DatabaseError as e:
+                replica.mark_down(e, self.cooldown)
+
+    def stats(self):
+        return [replica.stats() for replica in self.replicas]
+
+    def close(self):
+        for replica in self.replicas:
+            replica.close()
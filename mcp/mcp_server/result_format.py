@@ -0,0 +1,123 @@
+import csv
+import datetime
+import decimal
+import io
+import json
+import uuid
+
+# Compact encodings for query results returned to the model. The default tool output is a
+# JSON list of row arrays; the columnar and CSV modes send column names once and shorten
+# values (ISO dates without redundant parts, dictionary codes for repetitive columns).
+
+FORMATS = ("rows", "columnar", "csv")
+DICTIONARY_MAX_DISTINCT = 64  # columns with more distinct values are never dictionary-encoded
+DICTIONARY_MIN_ROWS = 8
+
+
+def compact_value(value):
+    """
+    Converts a database value to a short JSON-friendly value.
+    Timestamps drop zero microseconds and use Z for UTC; numerics become ints or floats.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, datetime.datetime):
+        if value.microsecond:
+            text = value.isoformat()
+        else:
+            text = value.replace(microsecond=0).isoformat(timespec="seconds")
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, (bytes, memoryview)):
+        return bytes(value).hex()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        return [compact_value(item) for item in value]
+    if isinstance(value, dict):
+        return value
+    return str(value)
+
+
+def json_size(payload):
+    """
+    Bytes of the payload as compact JSON.
+    """
+    return len(json.dumps(payload, separators=(",", ":"), default=str).encode())
+
+
+def _encode_column(values):
+    """
+    Dictionary-encodes a column when that is smaller: {"dictionary": [...], "codes": [...]}.
+    """
+    if len(values) < DICTIONARY_MIN_ROWS:
+        return values
+    positions = {}
+    for value in values:
+        if isinstance(value, (list, dict)):
+            return values  # unhashable
+        if value not in positions:
+            if len(positions) >= DICTIONARY_MAX_DISTINCT:
+                return values
+            positions[value] = len(positions)
+    if len(positions) * 2 > len(values):
+        return values
+    encoded = {"dictionary": list(positions), "codes": [positions[value] for value in values]}
+    return encoded if json_size(encoded) < json_size(values) else values
+
+
+def columnar(columns, rows, dictionary=True):
+    """
+    Returns the values column-major: one array per column, in column order.
+    :param dictionary: Dictionary-encode repetitive columns (such as severity or author).
+    """
+    data = [[compact_value(row[index]) for row in rows] for index in range(len(columns))]
+    if dictionary:
+        data = [_encode_column(values) for values in data]
+    return data
+
+
+def to_csv(columns, rows):
+    """
+    Renders the result as CSV text with a header line; NULL is an empty field.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(["" if value is None else compact_value(value) for value in row])
+    return buffer.getvalue()
+
+
+def format_result(columns, rows, mode="columnar"):
+    """
+    Builds a tool response for a query result in the requested format.
+    :param columns: Column names.
+    :param rows: Result rows (sequences in column order).
+    :param mode: "rows" (column names plus row arrays), "columnar" or "csv".
+    :return: Dict with format, columns, row_count, the data and a `size` entry comparing its
+             JSON size to the plain list-of-rows encoding.
+    :raises ValueError: If mode is unknown.
+    """
+    if mode not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    response = {"format": mode, "columns": list(columns), "row_count": len(rows)}
+    if mode == "rows":
+        response["rows"] = [[compact_value(value) for value in row] for row in rows]
+    elif mode == "columnar":
+        response["data"] = columnar(columns, rows)
+    else:
+        del response["columns"]  # the CSV header carries them
+        response["csv"] = to_csv(columns, rows)
+    response["size"] = {
+        "bytes": json_size(response),
+        "row_json_bytes": json_size(
+            response["rows"] if mode == "rows" else [[compact_value(value) for value in row] for row in rows]
+        ),
+    }
+    return response
@@ -0,0 +1,182 @@
+import math
+from collections import Counter
+
+from result_format import compact_value, json_size
+
+# Fits query results into a row / byte / token budget for the model. A result that fits is
+# returned whole; one that does not is cut to the head that fits, plus an exact row count and
+# a per-column summary (non-null count, distinct values, min/max, most common values) so the
+# model can reason about the rest without reading it.
+
+BYTES_PER_TOKEN = 4  # rough average for JSON-ish text; used to turn a token budget into bytes
+TOP_VALUES = 5
+MAX_TRACKED_DISTINCT = 10000  # distinct values counted per column before top values become approximate
+SUMMARY_MAX_ROWS = 200000  # rows summarized; beyond this only the count continues
+
+
+def estimate_tokens(nbytes):
+    return math.ceil(nbytes / BYTES_PER_TOKEN)
+
+
+class ResultBudget:
+    """
+    Limits on the rows returned to the model. Any limit left as None is not enforced.
+    """
+
+    def __init__(self, max_rows=None, max_bytes=None, max_tokens=None):
+        """
+        :param max_rows: Maximum rows returned.
+        :param max_bytes: Maximum compact-JSON bytes of the returned rows.
+        :param max_tokens: Maximum estimated tokens of the returned rows (BYTES_PER_TOKEN bytes each).
+        """
+        for name, value in (("max_rows", max_rows), ("max_bytes", max_bytes), ("max_tokens", max_tokens)):
+            if value is not None and value < 0:
+                raise ValueError(f"{name} must not be negative")
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_tokens = max_tokens
+        limits = [limit for limit in (max_bytes, max_tokens * BYTES_PER_TOKEN if max_tokens is not None else None)
+                  if limit is not None]
+        self._byte_limit = min(limits) if limits else None
+
+    @property
+    def enabled(self):
+        return any(limit is not None for limit in (self.max_rows, self.max_bytes, self.max_tokens))
+
+    def allows(self, rows, nbytes):
+        if self.max_rows is not None and rows > self.max_rows:
+            return False
+        return self._byte_limit is None or nbytes <= self._byte_limit
+
+    def to_dict(self):
+        return {key: value for key, value in (("max_rows", self.max_rows), ("max_bytes", self.max_bytes),
+                                               ("max_tokens", self.max_tokens)) if value is not None}
+
+
+class _ColumnStats:
+    __slots__ = ("non_null", "nulls", "min", "max", "comparable", "values", "overflow")
+
+    def __init__(self):
+        self.non_null = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self.comparable = True
+        self.values = Counter()
+        self.overflow = False  # more distinct values than MAX_TRACKED_DISTINCT
+
+    def add(self, value):
+        if value is None:
+            self.nulls += 1
+            return
+        self.non_null += 1
+        if self.comparable:
+            try:
+                if self.min is None or value < self.min:
+                    self.min = value
+                if self.max is None or value > self.max:
+                    self.max = value
+            except TypeError:
+                self.comparable = False
+        try:
+            if value in self.values or len(self.values) < MAX_TRACKED_DISTINCT:
+                self.values[value] += 1
+            else:
+                self.overflow = True
+        except TypeError:  # unhashable (json/array columns)
+            self.overflow = True
+
+    def summary(self, column):
+        entry = {"column": column, "non_null": self.non_null, "nulls": self.nulls}
+        if self.values:
+            entry["distinct"] = f">={len(self.values)}" if self.overflow else len(self.values)
+        if self.comparable and self.min is not None:
+            entry["min"] = compact_value(self.min)
+            entry["max"] = compact_value(self.max)
+        top = [[compact_value(value), count] for value, count in self.values.most_common(TOP_VALUES) if count > 1]
+        if top:
+            entry["top_values"] = top
+        return entry
+
+
+class ResultShaper:
+    """
+    Consumes result rows in order and keeps the head that fits the budget.
+    Column statistics are only gathered once the budget is exceeded (starting with the head),
+    so results that fit cost nothing extra.
+    """
+
+    def __init__(self, columns, budget):
+        self.columns = list(columns)
+        self.budget = budget
+        self.head = []  # compacted rows returned to the model
+        self._head_rows = []  # the same rows as fetched, for the statistics
+        self.head_bytes = 2  # the enclosing []
+        self.row_count = 0
+        self.truncated = False
+        self.stats = None
+        self.summarized_rows = 0
+
+    def add(self, rows):
+        for row in rows:
+            self.row_count += 1
+            if not self.truncated:
+                compact = [compact_value(value) for value in row]
+                size = json_size(compact) + (1 if self.head else 0)
+                if self.budget.allows(len(self.head) + 1, self.head_bytes + size):
+                    self.head.append(compact)
+                    self._head_rows.append(row)
+                    self.head_bytes += size
+                    continue
+                self._truncate()
+            if self.summarized_rows < SUMMARY_MAX_ROWS:
+                self._observe(row)
+
+    def _truncate(self):
+        self.truncated = True
+        self.stats = [_ColumnStats() for _ in self.columns]
+        for head_row in self._head_rows:
+            self._observe(head_row)
+        self._head_rows = []
+
+    def stop(self):
+        """
+        Marks the result truncated after the rows added so far, for callers that stop reading
+        before the end even though the budget still had room (the rest is counted, not fetched).
+        """
+        if not self.truncated:
+            self._truncate()
+
+    def summary_complete(self, total_rows=None):
+        """
+        False when some rows were not summarized: beyond SUMMARY_MAX_ROWS, or never read.
+        :param total_rows: Exact row count when it exceeds the rows added.
+        """
+        return self.summarized_rows >= (total_rows if total_rows is not None else self.row_count)
+
+    def _observe(self, row):
+        self.summarized_rows += 1
+        for stats, value in zip(self.stats, row):
+            stats.add(value)
+
+    def result(self, continuation_token=None, total_rows=None):
+        """
+        Builds the response.
+        :param continuation_token: Token to page past the head with execute_query_paged.
+        :param total_rows: Exact row count when it was obtained without reading every row.
+        """
+        response = {
+            "columns": self.columns,
+            "rows": self.head,
+            "row_count": total_rows if total_rows is not None else self.row_count,
+            "returned_rows": len(self.head),
+            "truncated": self.truncated,
+        }
+        if self.truncated:
+            response["budget"] = self.budget.to_dict()
+            response["column_summary"] = [stats.summary(column) for stats, column in zip(self.stats, self.columns)]
+            if not self.summary_complete(total_rows):
+                response["summary_rows"] = self.summarized_rows
+            response["continuation_token"] = continuation_token
+        response["size"] = {"bytes": self.head_bytes, "estimated_tokens": estimate_tokens(self.head_bytes)}
+        return response
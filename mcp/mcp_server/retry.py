@@ -0,0 +1,107 @@
+import random
+import time
+
+from psycopg2 import InterfaceError, OperationalError
+from psycopg2.extensions import QueryCanceledError
+
+from db_pool import ConnectError, PoolTimeoutError
+
+# Retrying database work across dropped connections (Postgres restarts, failovers, idle
+# timeouts on a proxy). Opening a connection is always safe to retry; re-running a statement
+# whose connection broke mid-flight is only safe for reads, which callers opt into.
+
+# admin_shutdown, crash_shutdown, cannot_connect_now (SQLSTATE class 08 is handled as a whole)
+DISCONNECT_SQLSTATES = {"57P01", "57P02", "57P03"}
+
+
+def is_disconnect(error):
+    """
+    Whether an error means the connection (or the server behind it) went away, as opposed to
+    the statement itself failing. Statement timeouts and pool exhaustion are not disconnects.
+    """
+    if isinstance(error, InterfaceError):  # "connection already closed"
+        return True
+    if not isinstance(error, OperationalError) or isinstance(error, (QueryCanceledError, PoolTimeoutError)):
+        return False
+    code = error.pgcode
+    # Client-side failures ("server closed the connection unexpectedly", SSL EOF) carry no SQLSTATE.
+    return code is None or code.startswith("08") or code in DISCONNECT_SQLSTATES
+
+
+def is_connect_error(error):
+    return isinstance(error, ConnectError)
+
+
+class _Attempt:
+    """
+    One try inside RetryPolicy.attempts(); suppresses a retryable error after sleeping the backoff.
+    """
+
+    def __init__(self, policy, number, retryable, on_retry):
+        self.policy = policy
+        self.number = number
+        self.retryable = retryable
+        self.on_retry = on_retry
+        self.succeeded = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, kind, error, traceback):
+        if error is None:
+            self.succeeded = True
+            return False
+        if self.number + 1 >= self.policy.attempts or not isinstance(error, Exception) or not self.retryable(error):
+            return False
+        if self.on_retry is not None:
+            self.on_retry(error)
+        time.sleep(self.policy.delay(self.number))
+        return True
+
+
+class RetryPolicy:
+    """
+    Bounded retries with jittered exponential backoff ("full jitter": each wait is uniform
+    between 0 and min(max_delay, base_delay * 2**retry)), so clients reconnecting after a
+    blip do not stampede the server in lockstep.
+    """
+
+    def __init__(self, attempts=4, base_delay=0.1, max_delay=2.0):
+        """
+        :param attempts: Total tries, including the first (1 disables retries).
+        :param base_delay: Upper bound of the first wait in seconds.
+        :param max_delay: Cap on any single wait in seconds.
+        """
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, retry):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+    def call(self, operation, retryable, on_retry=None):
+        """
+        Calls operation() until it succeeds, raises a non-retryable error or runs out of attempts.
+        :param operation: Zero-argument callable.
+        :param retryable: Predicate on the raised exception.
+        :param on_retry: Optional callable receiving each error that is retried.
+        """
+        for attempt in self.attempts_for(retryable, on_retry):
+            with attempt:
+                return operation()
+
+    def attempts_for(self, retryable, on_retry=None):
+        """
+        Yields attempts for a block that is re-run on retryable errors:
+
+            for attempt in policy.attempts_for(is_disconnect):
+                with attempt:
+                    ...
+
+        Leaving the block normally (or with return) ends the retries.
+        """
+        for number in range(self.attempts):
+            attempt = _Attempt(self, number, retryable, on_retry)
+            yield attempt
+            if attempt.succeeded:
+                return
@@ -0,0 +1,171 @@
+# Maintained vulnerability exposure rollups: per base image, package and tag, the number
+# of distinct vulnerabilities (and tag/vulnerability findings) by severity.
+# The rollup table is kept in step with tag_vulnerabilities by recomputing only the groups
+# a write touched, inside the writing transaction; rebuild_exposure() recomputes everything.
+
+EXPOSURE_TABLE = "vulnerability_exposure"
+SCOPES = ("base_image", "package", "tag")
+SOURCE_TABLES = {"base_images", "packages", "package_tags", "vulnerabilities", "tag_vulnerabilities"}
+# Comment put on the rollup table by writes it could not follow. It lives in the database so
+# every server process (HTTP worker) rebuilds the rollups, not only the one that saw the write.
+STALE_MARKER = "stale"
+
+_CREATE_SQL = """
+CREATE TABLE IF NOT EXISTS vulnerability_exposure (
+    scope VARCHAR(20) NOT NULL,
+    scope_id INT NOT NULL,
+    severity VARCHAR(50) NOT NULL,
+    vulnerabilities INT NOT NULL,
+    findings INT NOT NULL,
+    PRIMARY KEY (scope, scope_id, severity)
+);
+"""
+
+_SEVERITY = "coalesce(upper(tv.severity), 'UNKNOWN')"
+
+# One aggregate per scope: (scope id expression, joins needed to reach it).
+_SCOPE_SOURCES = {
+    "tag": ("tv.package_tag_id", ""),
+    "package": ("pt.package_id", "JOIN package_tags pt ON pt.id = tv.package_tag_id"),
+    "base_image": (
+        "p.base_image_id",
+        "JOIN package_tags pt ON pt.id = tv.package_tag_id JOIN packages p ON p.id = pt.package_id",
+    ),
+}
+
+_AFFECTED_SQL = """
+SELECT pt.id, pt.package_id, p.base_image_id
+FROM package_tags pt
+JOIN packages p ON p.id = pt.package_id
+WHERE pt.id = ANY(%s);
+"""
+
+_READ_SQL = {
+    "base_image": "SELECT id, name || ':' || version FROM base_images WHERE id = ANY(%s);",
+    "package": "SELECT id, name FROM packages WHERE id = ANY(%s);",
+    "tag": """
+        SELECT pt.id, p.name || '@' || pt.tag
+        FROM package_tags pt JOIN packages p ON p.id = pt.package_id
+        WHERE pt.id = ANY(%s);
+    """,
+}
+
+
+def _aggregate_sql(scope, filtered):
+    key, joins = _SCOPE_SOURCES[scope]
+    return f"""
+    INSERT INTO vulnerability_exposure (scope, scope_id, severity, vulnerabilities, findings)
+    SELECT '{scope}', {key}, {_SEVERITY}, count(DISTINCT tv.vulnerability_id), count(*)
+    FROM tag_vulnerabilities tv {joins}
+    {f"WHERE {key} = ANY(%s)" if filtered else ""}
+    GROUP BY 2, 3;
+    """
+
+
+def ensure_exposure_table(cursor):
+    cursor.execute(_CREATE_SQL)
+
+
+def rebuild_exposure(cursor):
+    """
+    Recomputes every rollup row from scratch (after bulk loads or untracked writes).
+    """
+    ensure_exposure_table(cursor)
+    cursor.execute("TRUNCATE vulnerability_exposure;")
+    for scope in SCOPES:
+        cursor.execute(_aggregate_sql(scope, filtered=False))
+    cursor.execute("COMMENT ON TABLE vulnerability_exposure IS NULL;")
+
+
+def mark_exposure_stale(cursor):
+    """
+    Flags the rollups for a rebuild after a write that bypassed refresh_exposure.
+    """
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL;", (EXPOSURE_TABLE,))
+    if cursor.fetchone()[0]:
+        cursor.execute(f"COMMENT ON TABLE vulnerability_exposure IS '{STALE_MARKER}';")
+
+
+def exposure_state(cursor):
+    """
+    :return: "missing" if the rollup table does not exist, "stale" if it awaits a rebuild,
+             "current" otherwise.
+    """
+    cursor.execute(
+        "SELECT to_regclass(%s) IS NOT NULL, obj_description(to_regclass(%s), 'pg_class');",
+        (EXPOSURE_TABLE, EXPOSURE_TABLE),
+    )
+    exists, comment = cursor.fetchone()
+    if not exists:
+        return "missing"
+    return "stale" if comment == STALE_MARKER else "current"
+
+
+def refresh_exposure(cursor, package_tag_ids):
+    """
+    Recomputes the rollup rows of the given tags and of the packages and base images above them.
+    Must run in the transaction that wrote tag_vulnerabilities. Base images are locked with
+    transaction-level advisory locks so concurrent writers to the same subtree refresh one after
+    the other, each seeing the other's committed rows.
+    :param cursor: Cursor inside the writing transaction.
+    :param package_tag_ids: Tags whose vulnerabilities changed.
+    """
+    cursor.execute(_AFFECTED_SQL, (sorted(set(package_tag_ids)),))
+    affected = cursor.fetchall()
+    if not affected:
+        return
+    groups = {
+        "tag": sorted({tag for tag, _, _ in affected}),
+        "package": sorted({package for _, package, _ in affected}),
+        "base_image": sorted({image for _, _, image in affected}),
+    }
+    cursor.execute(
+        "SELECT pg_advisory_xact_lock(hashtext('vulnerability_exposure'), image_id) "
+        "FROM unnest(%s::int[]) AS image_id ORDER BY image_id;",
+        (groups["base_image"],),
+    )
+    for scope in SCOPES:
+        cursor.execute(
+            "DELETE FROM vulnerability_exposure WHERE scope = %s AND scope_id = ANY(%s);",
+            (scope, groups[scope]),
+        )
+        cursor.execute(_aggregate_sql(scope, filtered=True), (groups[scope],))
+
+
+def read_exposure(cursor, scope="base_image", severities=("CRITICAL", "HIGH"), limit=50):
+    """
+    Returns the most exposed entities of a scope, worst first.
+    :param cursor: Open cursor.
+    :param scope: "base_image", "package" or "tag".
+    :param severities: Severities to report and rank by (in order); None reports all.
+    :param limit: Maximum number of entities.
+    :return: List of dicts with id, name, per-severity vulnerability counts and findings.
+    """
+    if scope not in SCOPES:
+        raise ValueError(f"scope must be one of {', '.join(SCOPES)}")
+    severities = [severity.upper() for severity in severities] if severities else None
+    ranking = severities or ["CRITICAL", "HIGH", "MEDIUM", "LOW", "UNKNOWN"]
+    order_by = ", ".join(
+        ["coalesce(max(vulnerabilities) FILTER (WHERE severity = %s), 0) DESC"] * len(ranking)
+    )
+    cursor.execute(
+        f"""
+        SELECT scope_id, json_object_agg(severity, vulnerabilities), sum(findings)
+        FROM vulnerability_exposure
+        WHERE scope = %s AND (%s::text[] IS NULL OR severity = ANY(%s::text[]))
+        GROUP BY scope_id
+        ORDER BY {order_by}, scope_id
+        LIMIT %s;
+        """,
+        (scope, severities, severities, *ranking, limit),
+    )
+    entities = [
+        {"id": scope_id, "vulnerabilities": counts, "findings": int(findings)}
+        for scope_id, counts, findings in cursor.fetchall()
+    ]
+    if entities:
+        cursor.execute(_READ_SQL[scope], ([entity["id"] for entity in entities],))
+        names = dict(cursor.fetchall())
+        for entity in entities:
+            entity["name"] = names.get(entity["id"])
+    return entities
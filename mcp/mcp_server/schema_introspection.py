@@ -0,0 +1,225 @@
+import threading
+import time
+
+# Builds the schema description served by get_schema / schema://database from the live
+# catalog instead of a hand-maintained string, including the statistics an LLM needs to
+# write selective queries (row estimates, indexes, column cardinality).
+
+LOW_CARDINALITY = 12  # columns with at most this many distinct values list them
+MAX_VALUE_LENGTH = 40
+TYPE_ABBREVIATIONS = {
+    "character varying": "varchar",
+    "character": "char",
+    "integer": "int",
+    "timestamp with time zone": "timestamptz",
+    "timestamp without time zone": "timestamp",
+    "double precision": "float8",
+}
+
+_COLUMNS_SQL = """
+SELECT c.table_name, c.column_name,
+       CASE WHEN c.character_maximum_length IS NOT NULL
+            THEN c.data_type || '(' || c.character_maximum_length || ')'
+            ELSE c.data_type END,
+       c.is_nullable = 'YES'
+FROM information_schema.columns c
+JOIN information_schema.tables t
+  ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+WHERE c.table_schema = %s AND t.table_type = 'BASE TABLE'
+ORDER BY c.table_name, c.ordinal_position;
+"""
+
+_TABLES_SQL = """
+SELECT c.relname,
+       CASE WHEN c.reltuples >= 0 THEN c.reltuples::bigint ELSE s.n_live_tup END
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+WHERE n.nspname = %s AND c.relkind IN ('r', 'p');
+"""
+
+_CONSTRAINTS_SQL = """
+SELECT cl.relname, con.contype, a.attname, ref.relname, ref_a.attname
+FROM pg_constraint con
+JOIN pg_class cl ON cl.oid = con.conrelid
+JOIN pg_namespace n ON n.oid = cl.relnamespace
+CROSS JOIN LATERAL unnest(con.conkey) WITH ORDINALITY AS k(attnum, position)
+JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+LEFT JOIN pg_class ref ON ref.oid = con.confrelid
+LEFT JOIN pg_attribute ref_a ON ref_a.attrelid = con.confrelid AND ref_a.attnum = con.confkey[k.position]
+WHERE n.nspname = %s AND con.contype IN ('p', 'f', 'u');
+"""
+
+_INDEXES_SQL = """
+SELECT tablename, indexname, indexdef
+FROM pg_indexes
+WHERE schemaname = %s
+ORDER BY tablename, indexname;
+"""
+
+_STATS_SQL = """
+SELECT tablename, attname, n_distinct, most_common_vals::text
+FROM pg_stats
+WHERE schemaname = %s;
+"""
+
+
+def _distinct_estimate(n_distinct, rows):
+    # pg_stats stores negative n_distinct as a fraction of the row count.
+    if n_distinct is None:
+        return None
+    if n_distinct < 0:
+        return int(-n_distinct * (rows or 0))
+    return int(n_distinct)
+
+
+def _parse_array_text(text):
+    """
+    Splits a Postgres array literal such as {a,"b c"} into values (good enough for display).
+    """
+    if not text or len(text) < 2:
+        return []
+    values, current, quoted, escaped = [], [], False, False
+    for char in text[1:-1]:
+        if escaped:
+            current.append(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif char == "," and not quoted:
+            values.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    values.append("".join(current))
+    return values
+
+
+def build_schema_description(cursor, schema="public"):
+    """
+    Queries the catalog and renders a compact, LLM-friendly schema description.
+    :param cursor: Open cursor on the target database.
+    :param schema: Schema to describe.
+    """
+    cursor.execute(_COLUMNS_SQL, (schema,))
+    columns = cursor.fetchall()
+    cursor.execute(_TABLES_SQL, (schema,))
+    row_counts = dict(cursor.fetchall())
+    cursor.execute(_CONSTRAINTS_SQL, (schema,))
+    constraints = cursor.fetchall()
+    cursor.execute(_INDEXES_SQL, (schema,))
+    indexes = cursor.fetchall()
+    cursor.execute(_STATS_SQL, (schema,))
+    stats = {(table, column): (n_distinct, common) for table, column, n_distinct, common in cursor.fetchall()}
+
+    flags = {}
+    for table, kind, column, ref_table, ref_column in constraints:
+        label = {"p": "pk", "u": "unique"}.get(kind) or f"fk->{ref_table}.{ref_column}"
+        flags.setdefault((table, column), []).append(label)
+
+    index_lines = {}
+    for table, name, definition in indexes:
+        columns_part = definition[definition.find("(", definition.find(" ON ")):] if " ON " in definition else definition
+        prefix = "unique " if definition.startswith("CREATE UNIQUE") else ""
+        index_lines.setdefault(table, []).append(f"{prefix}{name} {columns_part}")
+
+    lines = [
+        "format: `table (~rows)` then `column type [pk|unique|fk->table.column] [~N distinct | values: ...]`",
+    ]
+    current = None
+    for table, column, data_type, nullable in columns:
+        if table != current:
+            if current is not None and index_lines.get(current):
+                lines.append("  indexes: " + "; ".join(index_lines[current]))
+            current = table
+            rows = row_counts.get(table)
+            lines.append(f"- {table} (~{rows if rows is not None else '?'} rows)")
+        base_type, _, length = data_type.partition("(")
+        column_flags = flags.get((table, column), [])
+        parts = [f"  {column} {TYPE_ABBREVIATIONS.get(base_type, base_type)}" + (f"({length}" if length else "")]
+        parts.extend(column_flags)
+        if not nullable and "pk" not in column_flags:
+            parts.append("not null")
+        n_distinct, common = stats.get((table, column), (None, None))
+        distinct = _distinct_estimate(n_distinct, row_counts.get(table))
+        if distinct is not None and column_flags not in (["pk"], ["unique"]):
+            values = _parse_array_text(common)
+            if 0 < distinct <= LOW_CARDINALITY and values:
+                parts.append("values: " + ", ".join(v[:MAX_VALUE_LENGTH] for v in values[:LOW_CARDINALITY]))
+            else:
+                parts.append(f"~{distinct} distinct")
+        lines.append(" ".join(parts))
+    if current is not None and index_lines.get(current):
+        lines.append("  indexes: " + "; ".join(index_lines[current]))
+    return "\n".join(lines) + "\n"
+
+
+class SchemaIntrospector:
+    """
+    Caches the live schema description of a DatabaseManager's database.
+    The cache is rebuilt when the manager reports a schema change (DDL run through it,
+    setup/reset/reseed), when the catalog fingerprint shows DDL made elsewhere (checked at most
+    every check_interval seconds), and once it is older than max_age seconds.
+    """
+
+    def __init__(self, db_manager, schema="public", max_age=300.0, check_interval=5.0):
+        """
+        :param db_manager: The DatabaseManager to introspect.
+        :param schema: Schema to describe (defaults to public).
+        :param max_age: Seconds after which the description is rebuilt anyway, refreshing row and
+                        distinct-value estimates (None: never).
+        :param check_interval: Seconds a catalog fingerprint check is trusted before the next
+                               describe() checks again (None: only in-process changes are seen).
+        """
+        self.db_manager = db_manager
+        self.schema = schema
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._text = None
+        self._version = None
+        self._fingerprint = None
+        self._built_at = 0.0
+        self._checked_at = 0.0
+
+    def _current(self, now):
+        if self._text is None or self._version != self.db_manager.schema_version:
+            return False
+        return self.max_age is None or now - self._built_at <= self.max_age
+
+    def cached(self):
+        """
+        Returns the cached description if it is current and its fingerprint was checked recently,
+        else None. Never touches the database.
+        """
+        now = time.monotonic()
+        if not self._current(now):
+            return None
+        if self.check_interval is not None and now - self._checked_at > self.check_interval:
+            return None
+        return self._text
+
+    def describe(self):
+        """
+        Returns the schema description, rebuilding it from the catalog if it is stale.
+        """
+        text = self.cached()
+        if text is not None:
+            return text
+        with self._lock:
+            text = self.cached()
+            if text is not None:
+                return text
+            version = self.db_manager.schema_version
+            fingerprint = self.db_manager.schema_fingerprint(self.schema)
+            now = time.monotonic()
+            if self._current(now) and fingerprint == self._fingerprint:
+                self._checked_at = now
+                return self._text
+            # Fingerprint first: DDL committed while the description is built shows up next time.
+            text = self.db_manager.describe_schema(self.schema)
+            self._text, self._version, self._fingerprint = text, version, fingerprint
+            self._built_at = self._checked_at = now
+            return text
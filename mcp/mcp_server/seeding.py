@@ -0,0 +1,208 @@
+import hashlib
+import random
+from datetime import date, datetime, timedelta, timezone
+
+# Deterministic sample data for the vulnerability schema.
+# Row counts grow linearly with the scale factor; at scale 1 the dataset matches the
+# original hand-written seed (12 base images, 15 packages, 20 tags, 15 CVEs, ...).
+# Every table draws from its own RNG derived from the seed, so the same (scale, seed)
+# always produces byte-identical data.
+
+DEFAULT_SEED = 42
+
+BASE_IMAGES = [
+    ("ubuntu", "20.04", date(2020, 4, 23)),
+    ("ubuntu", "22.04", date(2022, 4, 21)),
+    ("debian", "10", date(2019, 7, 6)),
+    ("debian", "11", date(2021, 8, 14)),
+    ("alpine", "3.16", date(2022, 5, 23)),
+    ("alpine", "3.18", date(2023, 5, 9)),
+    ("centos", "7", date(2014, 7, 7)),
+    ("centos", "8", date(2019, 9, 24)),
+    ("amazonlinux", "2", date(2018, 6, 26)),
+    ("amazonlinux", "2023", date(2023, 3, 15)),
+    ("redhat", "8", date(2019, 5, 7)),
+    ("redhat", "9", date(2022, 5, 17)),
+]
+
+VULNERABILITIES = [
+    ("CVE-2023-1234", "OpenSSL buffer overflow in TLS implementation", date(2023, 1, 15)),
+    ("CVE-2022-4304", "DNS query vulnerability in Python", date(2022, 12, 4)),
+    ("CVE-2023-0286", "X.509 certificate validation flaw", date(2023, 2, 7)),
+    ("CVE-2022-3996", "NGINX HTTP/2 memory exhaustion", date(2022, 11, 8)),
+    ("CVE-2022-3116", "PostgreSQL privilege escalation", date(2022, 10, 12)),
+    ("CVE-2023-25690", "HTTP request smuggling in Node.js", date(2023, 3, 22)),
+    ("CVE-2022-42010", "XML external entity vulnerability in libxml2", date(2022, 9, 30)),
+    ("CVE-2023-2650", "Remote code execution in OpenSSL ASN.1", date(2023, 4, 18)),
+    ("CVE-2022-37434", "Zlib buffer overflow", date(2022, 8, 5)),
+    ("CVE-2023-0464", "Bypass of certificate verification", date(2023, 2, 28)),
+    ("CVE-2023-0466", "Denial of service in OpenSSL", date(2023, 5, 3)),
+    ("CVE-2022-4450", "Python zipfile directory traversal", date(2022, 12, 21)),
+    ("CVE-2023-27522", "NGINX buffer overflow", date(2023, 4, 11)),
+    ("CVE-2023-2455", "PostgreSQL memory leak", date(2023, 5, 15)),
+    ("CVE-2023-23919", "Node.js HTTP header injection", date(2023, 3, 7)),
+]
+
+SEVERITIES = ["CRITICAL", "HIGH", "MEDIUM", "LOW"]
+AUTHORS = ["Alice Smith", "Bob Johnson", "Charlie Brown", "David Wilson", "Eve Davis"]
+COMMIT_MESSAGES = [
+    "Update security patches",
+    "Fix memory leak",
+    "Upgrade dependencies",
+    "Address CVE vulnerability",
+    "Improve performance",
+    "Refactor core components",
+    "Add new features",
+    "Update documentation",
+    "Fix regression bug",
+    "Enhance logging",
+]
+
+# Rows per table at scale 1.
+ROWS_PER_SCALE = {
+    "base_images": 12,
+    "packages": 15,
+    "package_tags": 20,
+    "vulnerabilities": 15,
+}
+MAX_VULNERABILITIES_PER_TAG = 3
+MAX_COMMITS_PER_TAG = 2
+
+_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class SeedGenerator:
+    """
+    Generates rows for every table of the vulnerability schema in foreign-key order.
+    IDs are assigned explicitly (1..n) so child rows can reference parents without lookups.
+    """
+
+    def __init__(self, scale=1, seed=DEFAULT_SEED):
+        """
+        :param scale: Positive integer multiplier applied to ROWS_PER_SCALE.
+        :param seed: RNG seed; the same seed and scale always yield the same data.
+        """
+        if scale < 1:
+            raise ValueError("scale must be >= 1")
+        self.scale = int(scale)
+        self.seed = seed
+        self.counts = {table: rows * self.scale for table, rows in ROWS_PER_SCALE.items()}
+
+    def _rng(self, table):
+        return random.Random(f"{self.seed}:{table}")
+
+    def base_images(self):
+        rng = self._rng("base_images")
+        for index in range(self.counts["base_images"]):
+            if index < len(BASE_IMAGES):
+                name, version, release_date = BASE_IMAGES[index]
+            else:
+                name, _, _ = BASE_IMAGES[index % len(BASE_IMAGES)]
+                version = f"{rng.randint(1, 30)}.{index // len(BASE_IMAGES)}"
+                release_date = date(2014, 1, 1) + timedelta(days=rng.randint(0, 3650))
+            yield (index + 1, name, version, release_date)
+
+    def packages(self):
+        rng = self._rng("packages")
+        n_images = self.counts["base_images"]
+        for index in range(self.counts["packages"]):
+            name = rng.choice((
+                f"openssl-{rng.randint(1, 3)}.{rng.randint(0, 1)}.{rng.randint(0, 20)}",
+                f"nginx-1.{rng.randint(10, 25)}",
+                f"python3.{rng.randint(7, 11)}",
+                f"postgresql-{rng.randint(12, 15)}",
+                f"nodejs-{rng.randint(16, 20)}",
+            ))
+            yield (index + 1, name, rng.randint(1, n_images))
+
+    def package_tags(self):
+        rng = self._rng("package_tags")
+        n_packages = self.counts["packages"]
+        for index in range(self.counts["package_tags"]):
+            tag = f"{rng.randint(1, 2)}.{rng.randint(0, 2)}.{rng.randint(0, 20)}"
+            created_at = _EPOCH + timedelta(seconds=rng.randint(0, 365 * 86400))
+            yield (index + 1, rng.randint(1, n_packages), tag, created_at)
+
+    def vulnerabilities(self):
+        rng = self._rng("vulnerabilities")
+        for index in range(self.counts["vulnerabilities"]):
+            if index < len(VULNERABILITIES):
+                cve_id, description, discovered_at = VULNERABILITIES[index]
+            else:
+                _, description, _ = VULNERABILITIES[index % len(VULNERABILITIES)]
+                discovered_at = date(2018, 1, 1) + timedelta(days=rng.randint(0, 2500))
+                # Six-digit sequence numbers never collide with the curated CVEs above.
+                cve_id = f"CVE-{discovered_at.year}-{100000 + index}"
+            yield (index + 1, cve_id, description, discovered_at)
+
+    def tag_vulnerabilities(self):
+        rng = self._rng("tag_vulnerabilities")
+        n_vulns = self.counts["vulnerabilities"]
+        population = range(1, n_vulns + 1)
+        for tag_id in range(1, self.counts["package_tags"] + 1):
+            for vuln_id in rng.sample(population, rng.randint(0, MAX_VULNERABILITIES_PER_TAG)):
+                yield (tag_id, vuln_id, rng.choice(SEVERITIES))
+
+    def commits(self):
+        rng = self._rng("commits")
+        n_vulns = self.counts["vulnerabilities"]
+        commit_id = 0
+        for tag_id in range(1, self.counts["package_tags"] + 1):
+            for _ in range(rng.randint(0, MAX_COMMITS_PER_TAG)):
+                commit_id += 1
+                commit_hash = hashlib.sha1(f"{self.seed}:{commit_id}".encode()).hexdigest()
+                message = rng.choice(COMMIT_MESSAGES)
+                if "CVE" in message:
+                    message += f" {rng.randint(1, n_vulns)}"
+                committed_at = _EPOCH + timedelta(seconds=rng.randint(0, 365 * 86400))
+                yield (commit_id, tag_id, commit_hash, rng.choice(AUTHORS), committed_at, message)
+
+    def tables(self):
+        """
+        Yields (table, columns, rows) in an order that satisfies foreign keys.
+        Rows are produced lazily so arbitrarily large scales stream in constant memory.
+        """
+        yield "base_images", ("id", "name", "version", "release_date"), self.base_images()
+        yield "packages", ("id", "name", "base_image_id"), self.packages()
+        yield "package_tags", ("id", "package_id", "tag", "created_at"), self.package_tags()
+        yield "vulnerabilities", ("id", "cve_id", "description", "discovered_at"), self.vulnerabilities()
+        yield "tag_vulnerabilities", ("package_tag_id", "vulnerability_id", "severity"), self.tag_vulnerabilities()
+        yield "commits", ("id", "package_tag_id", "commit_hash", "author", "committed_at", "message"), self.commits()
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    text = str(value)
+    if "\\" in text or "\t" in text or "\n" in text or "\r" in text:
+        text = text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    return text
+
+
+class CopyStream:
+    """
+    A read-only file-like object that renders rows in COPY text format on demand,
+    so psycopg2's copy_expert can stream a generator without materializing it.
+    """
+
+    def __init__(self, rows):
+        self._lines = ("\t".join(map(_copy_value, row)) + "\n" for row in rows)
+        self._buffer = ""
+
+    def read(self, size=-1):
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            chunks.append(line)
+            length += len(line)
+        data = "".join(chunks)
+        if size < 0:
+            self._buffer = ""
+            return data
+        self._buffer = data[size:]
+        return data[:size]
@@ -1,64 +1,94 @@
 from fastmcp import FastMCP, Context
-import os
-import sys
-import importlib.util
+from fastmcp.exceptions import ResourceError, ToolError
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from psycopg2 import DatabaseError
+from psycopg2.extensions import QueryCanceledError
+import asyncio
+import json
+import threading
+import time
+
+from admission import AdmissionController, AdmissionPolicy, AdmissionRejected
+from async_executor import AsyncQueryExecutor
+from database import DatabaseManager
+from db_pool import ConnectError
+from index_advisor import IndexAdvisor, WorkloadRecorder
+from query_metrics import start_metrics_server
+from result_format import FORMATS, format_result
+from retry import RetryPolicy
+from settings import Settings
+from targets import TargetRegistry, UnknownTargetError, load_targets
 
-# ===================================== import modules as path =====================================
-def import_module_from_path(file_path, module_name=None):
-    """
-    Dynamically imports a Python module from a given file path.
-
-    Args:
-        file_path (str): The absolute path to the .py file.
-        module_name (str, optional): The name to assign to the imported module.
-                                     If None, the base filename (without .py)
-                                     is used as the module name.
+mcp = FastMCP(name="Query MCP")
+settings = Settings.from_env()
+admission_policy = AdmissionPolicy(**settings.admission())
 
-    Returns:
-        module: The imported module object.
 
-    Raises:
-        FileNotFoundError: If the file_path does not exist.
-        ImportError: If there's an issue importing the module.
+def open_database(target_settings):
     """
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"Module file not found: {file_path}")
-
-    if module_name is None:
-        module_name = os.path.splitext(os.path.basename(file_path))[0] # 1.2.1, 1.2.4
-
-    # Create a module specification
-    spec = importlib.util.spec_from_file_location(module_name, file_path) # 1.1.1, 1.8.4
-
-    if spec is None:
-        raise ImportError(f"Could not create module spec for: {file_path}")
-
-    # Create a module object
-    module = importlib.util.module_from_spec(spec) # 1.1.1, 1.8.4
-
-    # Add the module to sys.modules (makes it behave like a regular import)
-    sys.modules[module_name] = module # 1.1.3, 1.3.4
-
-    # Execute the module's code
-    spec.loader.exec_module(module) # 1.1.1, 1.3.2
+    Builds a target's DatabaseManager. It is lazy: the pool opens on the first tool call (or the
+    background warm-up), not here, so the MCP handshake never waits for Postgres and the server
+    starts even while a database is unreachable.
+    """
+    return DatabaseManager(
+        **target_settings.connection(),
+        min_connections=min(target_settings.min_connections, target_settings.per_worker(target_settings.max_connections)),
+        max_connections=target_settings.per_worker(target_settings.max_connections),
+        statement_timeout_ms=target_settings.statement_timeout_ms,
+        workload_recorder=WorkloadRecorder(),
+        # Another worker's writes would not invalidate this worker's cached results.
+        cache_size=256 if target_settings.workers == 1 else 0,
+        lazy=True,
+        connect_timeout=target_settings.connect_timeout,
+        retry_policy=RetryPolicy(attempts=target_settings.retry_attempts),
+        replicas=target_settings.replicas,
+        max_replica_lag=target_settings.max_replica_lag,
+    )
+
+
+target_settings, default_target = load_targets(settings)
+targets = TargetRegistry(target_settings, open_database, default=default_target)
+# The default target backs the tools and resources that take no `target` argument.
+db_manager = targets.get().db_manager
+schema_introspector = targets.get().schema_introspector
+db_executor = AsyncQueryExecutor(max_workers=settings.per_worker(settings.max_connections))
+admission = AdmissionController(admission_policy)
+index_advisor = IndexAdvisor(db_manager, db_manager.workload_recorder)
+metrics_port = settings.metrics_port  # standalone /metrics listener; 0 disables
+
+
+def warm_up_in_background():
+    """
+    Opens the connection pool and caches the schema description on a daemon thread,
+    so the first tool call does not pay for them.
+    """
+    def warm_up():
+        if db_manager.warm_up():
+            schema_introspector.describe()
 
-    return module
+    thread = threading.Thread(target=warm_up, name="db-warm-up", daemon=True)
+    thread.start()
+    return thread
 
-# ==================================================================================================
 
-database_module = import_module_from_path("/workspaces/query-mcp/mcp/mcp_server/database.py")
+def start_background_tasks():
+    """
+    Starts the warm-up and the liveness probes, as configured.
+    """
+    if settings.warm_up:
+        warm_up_in_background()
+    if settings.liveness_interval:
+        targets.start_liveness_probes(settings.liveness_interval)
 
-DatabaseManager = database_module.DatabaseManager
 
-mcp = FastMCP(name="Query MCP")
-postgres = "postgres"
-db_manager = DatabaseManager(
-    db_name=postgres,
-    host="localhost",
-    password=postgres,
-    port=5432,
-    user=postgres,
-) 
+def close(wait=True):
+    """
+    Stops the query worker threads and closes every target's connections.
+    :param wait: Wait for running queries first; otherwise their connections close when they finish.
+    """
+    db_executor.shutdown(wait=wait)
+    targets.close()
 
 # @mcp.tool
 # def roll_dice(n_dice: int) -> list[int]:
@@ -271,34 +301,161 @@ db_manager = DatabaseManager(
 #     except Exception as e:
 #         return f"Error resetting database: {str(e)}"
 
-SCHEMA_BRIEF = """
-format: `tablename: attributes`
-- base_images: id(int,pk), name(str), version(str), release_date(date)
-- packages: id(int, pk), name(str), base_image_id(fk)
-- package_tags: id(int,pk), package_id(fk), tag(str), created_at(timestamp)
-- vulnerabilities: id(int,pk), cve_id(str,unique), description(str), discovered_at(date)
-- tag_vulnerabilities: package_tag_id(fk), vulnerability_id(fk), severity(str)
-- commits: id(int,pk), package_tag_id(fk), commit_hash(str,unique), author(str), committed_at(timestamp), message(str)
-* indexes for performance
-- idx_packages_base_image ON packages(base_image_id);
-- idx_tags_package_id ON package_tags(package_id);
-- idx_tag_vuln_vulnerability_id ON tag_vulnerabilities(vulnerability_id);
-- idx_commits_package_tag_id ON commits(package_tag_id);
-"""
-
 # Get Database Schema
 @mcp.resource("schema://database")
-def get_schema_resource() -> str:
-    """Returns a brief description of the PostgreSQL database schema."""
-    return SCHEMA_BRIEF
+async def get_schema_resource() -> str:
+    """Returns a description of the PostgreSQL database schema generated from the live catalog."""
+    return schema_introspector.cached() or await db_executor.run(schema_introspector.describe)
+
+@mcp.resource("schema://database/{target}")
+async def get_target_schema_resource(target: str) -> str:
+    """Returns the schema description of a named database target."""
+    try:
+        introspector = targets.get(target).schema_introspector
+    except UnknownTargetError as e:
+        raise ResourceError(e.args[0]) from None
+    return introspector.cached() or await db_executor.run(introspector.describe)
+
+@mcp.resource("metrics://query-cache")
+def get_query_cache_stats() -> str:
+    """Returns hit/miss/eviction counters of the query result cache as JSON."""
+    return json.dumps(db_manager.cache_stats())
+
+@mcp.resource("metrics://admission")
+def get_admission_stats() -> str:
+    """Returns running/queued query counts and admission rejection counters as JSON."""
+    return json.dumps(admission.stats())
+
+@mcp.resource("metrics://queries")
+def get_query_metrics() -> str:
+    """Returns per-method latency percentiles, rows, result bytes and errors, pool wait times, database and replica health, the database targets and the slowest query shapes as JSON."""
+    report = db_manager.metrics.snapshot() if db_manager.metrics else {}
+    report["pool"] = db_manager.pool_stats()
+    report["database"] = db_manager.health()
+    report["replicas"] = db_manager.replica_stats()
+    report["targets"] = targets.stats()
+    if db_manager.workload_recorder is not None:
+        report["slowest_queries"] = [
+            {"query": query, "calls": calls, "mean_ms": round(mean_ms, 3)}
+            for query, calls, mean_ms in db_manager.workload_recorder.shapes()[:10]
+        ]
+    return json.dumps(report)
+
+
+def render_prometheus_metrics():
+    """Renders DatabaseManager, pool, cache and admission metrics as Prometheus text."""
+    if db_manager.metrics is None:
+        return ""
+    cache = db_manager.cache_stats()
+    queue = admission.stats()
+    counters = {
+        "query_cache_hits_total": ("Raw queries answered from the result cache.", cache.get("hits", 0)),
+        "query_cache_misses_total": ("Cacheable raw queries that had to run.", cache.get("misses", 0)),
+    }
+    gauges = {
+        "admission_running": queue["running"],
+        "admission_queued": queue["queued"],
+    }
+    up = db_manager.health()["up"]
+    if up is not None:  # known once the liveness probe has run
+        gauges["database_up"] = int(up)
+    return db_manager.metrics.render_prometheus(pool_stats=db_manager.pool_stats(), extra_gauges=gauges,
+                                                extra_counters=counters)
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def prometheus_metrics(request: Request) -> PlainTextResponse:
+    """Prometheus scrape endpoint, served alongside the HTTP transports."""
+    return PlainTextResponse(render_prometheus_metrics(), media_type="text/plain; version=0.0.4")
+
+
+def resolve_target(name):
+    """
+    Returns the named target (the default one for None), as an `unknown_target` ToolError if it is not configured.
+    """
+    try:
+        return targets.get(name)
+    except UnknownTargetError as e:
+        raise ToolError(AdmissionRejected("unknown_target", e.args[0], targets=e.known).to_json()) from None
+
+
+CLIENT_ID_HEADER = "x-client-id"
+
+
+def admission_key(ctx: Context):
+    """
+    Key of the per-session admission cap. Over stateless HTTP each request is a new MCP session,
+    so there the cap applies to the client instead: its X-Client-ID header, or else its address.
+    """
+    request = ctx.request_context.request
+    if request is None:  # stdio: one client per server process
+        return ctx.session_id
+    client_id = request.headers.get(CLIENT_ID_HEADER)
+    if client_id:
+        return f"client:{client_id}"
+    if request.client is not None:
+        return f"address:{request.client.host}"
+    return ctx.session_id
+
+
+async def run_admitted(ctx: Context, fn, *args, cost_query=None, manager=None, **kwargs):
+    """
+    Runs a blocking DatabaseManager call under the admission policy.
+    Rejections, statement timeouts and database errors are raised as ToolErrors whose
+    message is a JSON object with an `error` code, so agents can react to them.
+    :param manager: DatabaseManager of the target the call runs against (default target if None).
+    """
+    manager = manager or db_manager
+    try:
+        async with admission.admit(admission_key(ctx)):
+            if cost_query:
+                await admission.check_cost(lambda: db_executor.run(manager.estimate_cost, cost_query))
+            return await db_executor.run_cancellable(fn, *args, **kwargs)
+    except AdmissionRejected as e:
+        raise ToolError(e.to_json()) from None
+    except QueryCanceledError as e:
+        if "statement timeout" not in str(e):
+            raise
+        rejection = AdmissionRejected(
+            "statement_timeout",
+            "The query exceeded the statement timeout and was cancelled; narrow it down or add a LIMIT.",
+            statement_timeout_ms=manager.statement_timeout_ms,
+        )
+        raise ToolError(rejection.to_json()) from None
+    except ConnectError as e:
+        rejection = AdmissionRejected(
+            "database_unavailable",
+            "The database cannot be reached right now (reconnects were retried); try again shortly.",
+            detail=str(e).strip(),
+        )
+        raise ToolError(rejection.to_json()) from None
+    except DatabaseError as e:
+        raise ToolError(AdmissionRejected("database_error", str(e).strip()).to_json()) from None
 
 @mcp.tool(
     name="execute_raw_query",
-    description="Execute arbitrary SQL query (SELECT) using database manager.",
+    description=(
+        "Execute arbitrary SQL query (SELECT) using database manager. By default returns a list of "
+        "rows. Set `output_format` to get column names and a smaller payload: \"columnar\" (one "
+        "array per column, repetitive columns dictionary-encoded as {dictionary, codes}), \"csv\" "
+        "or \"rows\" (names plus row arrays); the response then reports its size in bytes. "
+        "Set `max_rows`, `max_bytes` or `max_tokens` to cap the rows returned: a larger result comes "
+        "back truncated with the exact `row_count`, a `column_summary` of every row (nulls, distinct "
+        "values, min/max, top values) and a `continuation_token` for execute_query_paged. "
+        "Set `target` to query a named database other than the default one (see list_targets)."
+    ),
     annotations={"readOnlyHint": False, "openWorldHint": True}
 )
-async def tool_execute_raw_query(query: str, ctx: Context) -> list[list]:
-    """Executes the query and returns rows; logs schema context for reference."""
+async def tool_execute_raw_query(
+    query: str,
+    ctx: Context,
+    output_format: str | None = None,
+    max_rows: int | None = None,
+    max_bytes: int | None = None,
+    max_tokens: int | None = None,
+    target: str | None = None,
+) -> list[list] | dict:
+    """Executes the query and returns rows, or a compact or budget-limited encoding of the result."""
     # Fetch schema context
     # resource_contents = await ctx.read_resource("schema://database")
     # schema_text = ""
@@ -308,32 +465,305 @@ async def tool_execute_raw_query(query: str, ctx: Context) -> list[list]:
     #         break
 
     # await ctx.info("Executing query using the following schema:\n" + schema_text)
+    if output_format is not None and output_format not in FORMATS:
+        raise ToolError(AdmissionRejected(
+            "invalid_argument", f"output_format must be one of {', '.join(FORMATS)}"
+        ).to_json())
+    database = resolve_target(target).db_manager
     await ctx.info("Executing query :\n" + query)
+    budgeted = any(limit is not None for limit in (max_rows, max_bytes, max_tokens))
+
+    def run(handle):
+        if budgeted:
+            shaped = database.execute_shaped_query(
+                query, max_rows=max_rows, max_bytes=max_bytes, max_tokens=max_tokens, handle=handle
+            )
+            if shaped is None:
+                return []
+            if output_format is None:
+                return shaped
+            # Encode the head in the requested format; keep the exact count and the summary.
+            formatted = format_result(shaped.pop("columns"), shaped.pop("rows"), output_format)
+            del shaped["size"]
+            formatted.update(shaped)
+            return formatted
+        if output_format is None:
+            return database.execute_raw_query(query, handle=handle, raise_errors=True) or []
+        result = database.execute_raw_query(query, handle=handle, raise_errors=True, include_columns=True)
+        if result is None:
+            result = {"columns": [], "rows": []}
+        return format_result(result["columns"], result["rows"], output_format)
 
     try:
-        rows = db_manager.execute_raw_query(query)
-        return [list(row) for row in (rows or [])]
+        return await run_admitted(ctx, run, cost_query=query, manager=database)
+    except ValueError as e:
+        # Logged like any other failure, so clients watching the log see that the query did not run.
+        await ctx.error(f"Error executing raw query: {e}")
+        raise ToolError(AdmissionRejected("invalid_argument", str(e)).to_json()) from None
     except Exception as e:
         await ctx.error(f"Error executing raw query: {e}")
         raise
 
 
+MAX_BATCH_QUERIES = 20
+MAX_BATCH_PARALLEL = 4
+
+
+@mcp.tool(
+    name="execute_batch",
+    description=(
+        f"Run up to {MAX_BATCH_QUERIES} independent SQL queries in one call, concurrently on separate "
+        "connections, instead of several execute_raw_query calls in a row. Set `consistent` to run "
+        "them all read-only in one snapshot of the database (REPEATABLE READ), so counts and details "
+        "agree with each other. Returns one entry per query, in order, with columns, rows, row_count "
+        "and elapsed_ms, or an `error` code and message if that query failed. `target` selects a "
+        "named database as in execute_raw_query."
+    ),
+    annotations={"readOnlyHint": False, "openWorldHint": True}
+)
+async def tool_execute_batch(
+    queries: list[str],
+    ctx: Context,
+    consistent: bool = False,
+    target: str | None = None,
+) -> dict:
+    """Executes the queries concurrently, optionally in a shared exported snapshot."""
+    if not queries or len(queries) > MAX_BATCH_QUERIES:
+        raise ToolError(AdmissionRejected(
+            "invalid_argument", f"queries must list between 1 and {MAX_BATCH_QUERIES} SQL statements"
+        ).to_json())
+    database = resolve_target(target).db_manager
+    # A consistent batch holds one connection open for the snapshot while the queries use others.
+    parallel = min(len(queries), MAX_BATCH_PARALLEL, database.max_connections - consistent,
+                   admission_policy.max_concurrent_per_session or MAX_BATCH_PARALLEL)
+    if parallel < 1:
+        raise ToolError(AdmissionRejected(
+            "invalid_argument", "consistent batches need a connection pool of at least 2 connections"
+        ).to_json())
+    await ctx.info(f"Executing batch of {len(queries)} queries{' in one snapshot' if consistent else ''}")
+
+    started = time.perf_counter()
+    slots = asyncio.Semaphore(parallel)
+    snapshot = None
+
+    async def run(index, query):
+        async with slots:
+            query_started = time.perf_counter()
+            try:
+                result = await run_admitted(
+                    ctx, database.execute_raw_query, query, raise_errors=True, include_columns=True,
+                    snapshot=snapshot.snapshot_id if snapshot else None, cost_query=query, manager=database,
+                )
+                result = result or {"columns": [], "rows": []}
+                entry = {"index": index, **result, "row_count": len(result["rows"])}
+            except ToolError as e:
+                entry = {"index": index, **json.loads(str(e))}
+            entry["elapsed_ms"] = round((time.perf_counter() - query_started) * 1000, 3)
+            return entry
+
+    try:
+        if consistent:
+            snapshot = await run_admitted(ctx, lambda handle: database.export_snapshot(), manager=database)
+        results = await asyncio.gather(*(run(index, query) for index, query in enumerate(queries)))
+    finally:
+        if snapshot is not None:
+            await db_executor.run(snapshot.close)
+    failed = sum("error" in entry for entry in results)
+    if failed:
+        await ctx.error(f"Error executing batch: {failed} of {len(queries)} queries failed")
+    return {
+        "results": results,
+        "snapshot": snapshot.snapshot_id if snapshot else None,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+@mcp.tool(
+    name="explain_query",
+    description=(
+        "Show the PostgreSQL query plan for one SQL statement as a compact summary: total cost, "
+        "estimated (and with analyze, actual) rows, sequential scans on large tables, indexes used "
+        "and the most expensive plan nodes. With analyze=true the statement runs inside a "
+        "transaction that is rolled back. Use it to check an expensive query before running it. "
+        "`target` selects a named database as in execute_raw_query."
+    ),
+    annotations={"readOnlyHint": True, "openWorldHint": True}
+)
+async def tool_explain_query(
+    query: str, ctx: Context, analyze: bool = False, buffers: bool = False, target: str | None = None
+) -> dict:
+    """Explains the query and returns a condensed plan summary."""
+    await ctx.info(("Analyzing" if analyze else "Explaining") + " query :\n" + query)
+    database = resolve_target(target).db_manager
+
+    try:
+        return await run_admitted(
+            ctx, database.explain_query, query, analyze=analyze, buffers=buffers, manager=database
+        )
+    except Exception as e:
+        await ctx.error(f"Error explaining query: {e}")
+        raise
+
+
+@mcp.tool(
+    name="execute_query_paged",
+    description=(
+        "Execute a SELECT query and return one page of rows with column names. "
+        "If `continuation_token` in the response is not null, call again with only "
+        "that token (and the same `target`, if any) to fetch the next page. A token from a "
+        "truncated execute_raw_query result continues after the rows it returned. An unknown or "
+        "expired token is reported as an `invalid_argument` error: re-run the query."
+    ),
+    annotations={"readOnlyHint": True, "openWorldHint": True}
+)
+async def tool_execute_query_paged(
+    ctx: Context,
+    query: str | None = None,
+    page_size: int = 500,
+    continuation_token: str | None = None,
+    target: str | None = None,
+) -> dict:
+    """Executes the query through a server-side cursor and returns a single page."""
+    if continuation_token:
+        await ctx.info(f"Fetching next page for token {continuation_token}")
+    else:
+        await ctx.info("Executing paged query :\n" + (query or ""))
+    database = resolve_target(target).db_manager
+
+    try:
+        page = await run_admitted(
+            ctx,
+            database.execute_query_page,
+            query=None if continuation_token else query,
+            page_size=page_size,
+            continuation_token=continuation_token or None,
+            raise_errors=True,
+            cost_query=None if continuation_token else query,
+            manager=database,
+        )
+    except ValueError as e:
+        # Both or neither of query and token, or an unknown or expired token.
+        await ctx.error(f"Error executing paged query: {e}")
+        raise ToolError(AdmissionRejected("invalid_argument", str(e)).to_json()) from None
+    except Exception as e:
+        await ctx.error(f"Error executing paged query: {e}")
+        raise
+    return page
+
+
 @mcp.tool(
     name="get_schema",
-    description="Retrieve the database schema description.",
+    description=(
+        "Retrieve the database schema: tables with row estimates, columns with types, keys, "
+        "distinct-value estimates (or the values themselves for low-cardinality columns) and indexes. "
+        "Set `target` to describe a named database other than the default one."
+    ),
     annotations={
         "title": "Get Database Schema",
         "readOnlyHint": True,
         "openWorldHint": False
     }
 )
-async def tool_get_schema(ctx: Context) -> str:
-    """Returns a brief description of the PostgreSQL database schema."""
+async def tool_get_schema(ctx: Context, target: str | None = None) -> str:
+    """Returns a description of the PostgreSQL database schema with row estimates, indexes and cardinality hints."""
     await ctx.info("Tool `get_schema` invoked. Delivering schema details.")
-    schema = SCHEMA_BRIEF
+    introspector = resolve_target(target).schema_introspector
+    schema = introspector.cached() or await db_executor.run(introspector.describe)
     return schema
 
 
+@mcp.tool(
+    name="list_targets",
+    description=(
+        "List the named databases this server can query (pass one as `target` to execute_raw_query, "
+        "execute_query_paged, explain_query or get_schema), which one is the default, and the "
+        "health and pool usage of those already in use."
+    ),
+    annotations={"readOnlyHint": True, "openWorldHint": False}
+)
+def tool_list_targets() -> list[dict]:
+    """Returns the configured targets."""
+    return targets.stats()
+
+
+@mcp.tool(
+    name="get_vulnerability_exposure",
+    description=(
+        "Answer 'how many CRITICAL/HIGH CVEs per base image / package / tag' from maintained rollups "
+        "instead of a four-table join. `scope` is base_image, package or tag; `severities` lists the "
+        "severities to count and rank by, most important first (default CRITICAL, HIGH; [] counts all). "
+        "Returns the most "
+        "exposed entities first with distinct vulnerability counts per severity."
+    ),
+    annotations={"readOnlyHint": True, "openWorldHint": False}
+)
+async def tool_get_vulnerability_exposure(
+    ctx: Context,
+    scope: str = "base_image",
+    severities: list[str] | None = None,
+    limit: int = 50,
+) -> list[dict]:
+    """Reads the exposure rollups for one scope."""
+    await ctx.info(f"Reading vulnerability exposure per {scope}")
+    if severities is None:
+        severities = ["CRITICAL", "HIGH"]
+    try:
+        return await run_admitted(
+            ctx, lambda handle: db_manager.get_vulnerability_exposure(scope, severities or None, limit)
+        )
+    except ValueError as e:
+        raise ToolError(AdmissionRejected("invalid_argument", str(e)).to_json()) from None
+    except Exception as e:
+        await ctx.error(f"Error reading vulnerability exposure: {e}")
+        raise
+
+
+@mcp.tool(
+    name="recommend_indexes",
+    description=(
+        "Suggest indexes for the queries this server has run (and pg_stat_statements, if installed). "
+        "Each recommendation has an `index_name`, the CREATE INDEX CONCURRENTLY statement, the "
+        "predicates it serves and an estimated benefit in rows not scanned. Nothing is changed; "
+        "pass an `index_name` to apply_index_recommendation to build one."
+    ),
+    annotations={"readOnlyHint": True, "openWorldHint": True},
+    enabled=settings.index_advisor,
+)
+async def tool_recommend_indexes(ctx: Context, limit: int = 10) -> dict:
+    """Returns ranked index recommendations for the observed workload."""
+    await ctx.info("Analyzing the recorded workload for index recommendations.")
+    try:
+        return await run_admitted(ctx, lambda handle: index_advisor.recommend(limit))
+    except Exception as e:
+        await ctx.error(f"Error recommending indexes: {e}")
+        raise
+
+
+@mcp.tool(
+    name="apply_index_recommendation",
+    description=(
+        "Build one index proposed by the latest recommend_indexes call, using CREATE INDEX "
+        "CONCURRENTLY so the table stays writable while it builds."
+    ),
+    annotations={"readOnlyHint": False, "destructiveHint": False, "idempotentHint": True, "openWorldHint": True},
+    enabled=settings.index_advisor,
+)
+async def tool_apply_index_recommendation(index_name: str, ctx: Context) -> dict:
+    """Creates the recommended index and refreshes the schema description."""
+    await ctx.info(f"Building index {index_name}")
+    try:
+        return await run_admitted(ctx, lambda handle: index_advisor.apply(index_name))
+    except KeyError as e:
+        raise ToolError(AdmissionRejected("unknown_recommendation", e.args[0]).to_json()) from None
+    except Exception as e:
+        await ctx.error(f"Error applying index recommendation: {e}")
+        raise
+
+
 if __name__ == "__main__":
+    # stdio transport, one process per client; see http_server.py for a shared HTTP deployment.
+    start_background_tasks()
+    if metrics_port:
+        start_metrics_server(metrics_port, render_prometheus_metrics)
     mcp.run()
-    db_manager.close_connection()
+    close()
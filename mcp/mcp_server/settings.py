@@ -0,0 +1,195 @@
+import os
+
+# Server configuration from QUERY_MCP_* environment variables. Unset variables keep the
+# defaults below, which match a local development Postgres.
+
+ENV_PREFIX = "QUERY_MCP_"
+
+
+def _env_bool(value):
+    return value.strip().lower() not in ("0", "false", "no", "off", "")
+
+
+def _env_list(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+class Settings:
+    """
+    Connection, pool and startup settings of the MCP server.
+    """
+
+    # attribute -> (environment variable, parser)
+    ENVIRONMENT = {
+        "db_name": ("DB_NAME", str),
+        "db_user": ("DB_USER", str),
+        "db_password": ("DB_PASSWORD", str),
+        "db_host": ("DB_HOST", str),
+        "db_port": ("DB_PORT", int),
+        "replicas": ("REPLICAS", _env_list),
+        "max_replica_lag": ("MAX_REPLICA_LAG", float),
+        "min_connections": ("MIN_CONNECTIONS", int),
+        "max_connections": ("MAX_CONNECTIONS", int),
+        "statement_timeout_ms": ("STATEMENT_TIMEOUT_MS", int),
+        "max_plan_cost": ("MAX_PLAN_COST", float),
+        "max_concurrent_per_session": ("MAX_CONCURRENT_PER_SESSION", int),
+        "max_queue": ("MAX_QUEUE", int),
+        "queue_timeout": ("QUEUE_TIMEOUT", float),
+        "connect_timeout": ("CONNECT_TIMEOUT", int),
+        "retry_attempts": ("RETRY_ATTEMPTS", int),
+        "liveness_interval": ("LIVENESS_INTERVAL", float),
+        "metrics_port": ("METRICS_PORT", int),
+        "warm_up": ("WARM_UP", _env_bool),
+        "targets": ("TARGETS", str),
+        "targets_file": ("TARGETS_FILE", str),
+        "http_host": ("HTTP_HOST", str),
+        "http_port": ("HTTP_PORT", int),
+        "http_path": ("HTTP_PATH", str),
+        "workers": ("WORKERS", int),
+        "shutdown_timeout": ("SHUTDOWN_TIMEOUT", float),
+        "index_advisor": ("INDEX_ADVISOR", _env_bool),
+    }
+
+    # Settings a named target may override; the rest are process-wide.
+    TARGET_FIELDS = (
+        "db_name", "db_user", "db_password", "db_host", "db_port", "replicas", "max_replica_lag",
+        "min_connections", "max_connections", "statement_timeout_ms", "connect_timeout", "retry_attempts",
+    )
+
+    def __init__(self, db_name="postgres", db_user="postgres", db_password="postgres", db_host="localhost",
+                 db_port=5432, replicas=(), max_replica_lag=None, min_connections=1, max_connections=10, statement_timeout_ms=30000,
+                 max_plan_cost=0, max_concurrent_per_session=4, max_queue=50, queue_timeout=30.0,
+                 connect_timeout=10, retry_attempts=4, liveness_interval=15.0, metrics_port=0, warm_up=True,
+                 targets=None, targets_file=None, http_host="127.0.0.1", http_port=8000, http_path="/mcp",
+                 workers=1, shutdown_timeout=30.0, index_advisor=True):
+        """
+        :param db_name: Database to connect to (QUERY_MCP_DB_NAME).
+        :param db_user: Database user (QUERY_MCP_DB_USER).
+        :param db_password: Database password (QUERY_MCP_DB_PASSWORD).
+        :param db_host: Database host (QUERY_MCP_DB_HOST).
+        :param db_port: Database port (QUERY_MCP_DB_PORT).
+        :param replicas: Read replica DSNs or postgresql:// URIs (QUERY_MCP_REPLICAS, comma-separated).
+        :param max_replica_lag: Seconds of replay lag beyond which a replica is not read from
+                                (QUERY_MCP_MAX_REPLICA_LAG; unset accepts any lag).
+        :param min_connections: Connections kept open once the pool exists (QUERY_MCP_MIN_CONNECTIONS).
+        :param max_connections: Pool size, query worker threads and global concurrency limit
+                                (QUERY_MCP_MAX_CONNECTIONS).
+        :param statement_timeout_ms: Per-statement timeout for agent SQL; 0 disables it
+                                     (QUERY_MCP_STATEMENT_TIMEOUT_MS).
+        :param max_plan_cost: Reject queries whose EXPLAIN cost estimate exceeds this; 0 disables
+                              the check (QUERY_MCP_MAX_PLAN_COST).
+        :param max_concurrent_per_session: Queries one client may have running or queued; 0
+                                           disables the cap (QUERY_MCP_MAX_CONCURRENT_PER_SESSION).
+        :param max_queue: Queries allowed to wait for a free connection before new ones are
+                          rejected (QUERY_MCP_MAX_QUEUE).
+        :param queue_timeout: Seconds a query may wait in that queue (QUERY_MCP_QUEUE_TIMEOUT).
+        :param connect_timeout: Seconds to wait for a new connection (QUERY_MCP_CONNECT_TIMEOUT).
+        :param retry_attempts: Tries for reconnecting and for reads whose connection dropped;
+                               1 disables retries (QUERY_MCP_RETRY_ATTEMPTS).
+        :param liveness_interval: Seconds between background database health checks, which also
+                                  close paged queries left idle; 0 disables them
+                                  (QUERY_MCP_LIVENESS_INTERVAL).
+        :param metrics_port: Port of the standalone Prometheus /metrics listener; 0 disables it
+                             (QUERY_MCP_METRICS_PORT).
+        :param warm_up: Open the pool and load the schema description in the background right
+                        after startup instead of on the first tool call (QUERY_MCP_WARM_UP).
+        :param targets: JSON object of named database targets (QUERY_MCP_TARGETS), see targets.py.
+        :param targets_file: Path of a JSON file with the targets (QUERY_MCP_TARGETS_FILE).
+        :param http_host: Interface the HTTP transport binds (QUERY_MCP_HTTP_HOST).
+        :param http_port: Port of the HTTP transport (QUERY_MCP_HTTP_PORT).
+        :param http_path: URL path of the MCP endpoint (QUERY_MCP_HTTP_PATH).
+        :param workers: HTTP worker processes. Each gets an equal share of max_connections, so
+                        the total stays within it (QUERY_MCP_WORKERS). Always 1 while the index
+                        advisor is on.
+        :param shutdown_timeout: Seconds a stopping HTTP worker waits for in-flight queries
+                                 before cancelling them (QUERY_MCP_SHUTDOWN_TIMEOUT).
+        :param index_advisor: Offer the recommend_indexes and apply_index_recommendation tools
+                              (QUERY_MCP_INDEX_ADVISOR). They work from the queries and the
+                              recommendations of their own process, which several workers would split.
+        """
+        self.db_name = db_name
+        self.db_user = db_user
+        self.db_password = db_password
+        self.db_host = db_host
+        self.db_port = db_port
+        self.replicas = list(replicas)
+        self.max_replica_lag = max_replica_lag
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.statement_timeout_ms = statement_timeout_ms or None
+        self.max_plan_cost = max_plan_cost or None
+        self.max_concurrent_per_session = max_concurrent_per_session or None
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.connect_timeout = connect_timeout
+        self.retry_attempts = retry_attempts
+        self.liveness_interval = liveness_interval
+        self.metrics_port = metrics_port
+        self.warm_up = warm_up
+        self.targets = targets
+        self.targets_file = targets_file
+        self.http_host = http_host
+        self.http_port = http_port
+        self.http_path = http_path
+        self.index_advisor = index_advisor
+        if index_advisor and workers > 1:
+            print(f"Running 1 worker instead of {workers}: set {ENV_PREFIX}INDEX_ADVISOR=0 to use several.")
+            workers = 1
+        self.workers = max(1, workers)
+        self.shutdown_timeout = shutdown_timeout
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """
+        Builds settings from the environment.
+        :param environ: Mapping to read instead of os.environ.
+        :raises ValueError: If a numeric variable is not a number.
+        """
+        environ = os.environ if environ is None else environ
+        values = {}
+        for attribute, (name, parse) in cls.ENVIRONMENT.items():
+            raw = environ.get(ENV_PREFIX + name)
+            if raw is None:
+                continue
+            try:
+                values[attribute] = parse(raw)
+            except ValueError:
+                raise ValueError(f"{ENV_PREFIX}{name} must be a {parse.__name__}, got {raw!r}") from None
+        return cls(**values)
+
+    def override(self, values):
+        """
+        Copy of these settings with some target settings replaced.
+        :param values: Mapping of TARGET_FIELDS names to values.
+        :raises ValueError: If a name is not a target setting.
+        """
+        unknown = sorted(set(values) - set(self.TARGET_FIELDS))
+        if unknown:
+            raise ValueError(f"unknown target settings: {', '.join(unknown)}")
+        merged = dict(vars(self))
+        merged.update(values)
+        if isinstance(merged["replicas"], str):
+            merged["replicas"] = _env_list(merged["replicas"])
+        return type(self)(**merged)
+
+    def per_worker(self, count):
+        """
+        One worker process's share of a connection or concurrency limit (at least 1).
+        """
+        return max(1, -(-count // self.workers))
+
+    def admission(self):
+        """
+        AdmissionPolicy arguments for one worker process.
+        """
+        return dict(statement_timeout_ms=self.statement_timeout_ms, max_plan_cost=self.max_plan_cost,
+                    max_concurrent_per_session=self.max_concurrent_per_session,
+                    max_concurrent=self.per_worker(self.max_connections), max_queue=self.max_queue,
+                    queue_timeout=self.queue_timeout)
+
+    def connection(self):
+        """
+        DatabaseManager connection arguments.
+        """
+        return dict(db_name=self.db_name, user=self.db_user, password=self.db_password,
+                    host=self.db_host, port=self.db_port)
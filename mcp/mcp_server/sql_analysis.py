@@ -0,0 +1,425 @@
+import re
+
+# Lightweight, dependency-free SQL inspection used for caching and routing decisions.
+# It does not parse SQL; it tokenizes just enough to find statement kinds and table names,
+# and errs on the side of "this might write" whenever it is unsure.
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<string>'(?:[^']|'')*')        # string literal
+    | (?P<quoted>"(?:[^"]|"")*")      # quoted identifier
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<word>[A-Za-z_][\w$]*)       # keyword or identifier
+    | (?P<number>\d+(?:\.\d+)?)
+    | (?P<space>\s+)
+    | (?P<other>.)
+    """,
+    re.X | re.S,
+)
+
+READ_ONLY_KINDS = {"select", "values", "table", "show"}
+DDL_KINDS = {"create", "alter", "drop", "comment", "grant", "revoke", "reindex", "cluster"}
+DATA_MODIFYING_WORDS = {"insert", "update", "delete", "merge", "truncate", "copy", "call", "do"}
+VOLATILE_FUNCTIONS = {
+    "now", "random", "clock_timestamp", "statement_timestamp", "timeofday",
+    "current_timestamp", "current_time", "current_date", "localtime", "localtimestamp",
+    "nextval", "setval", "currval", "pg_sleep", "gen_random_uuid", "txid_current",
+}
+# Functions that write or need the primary even inside an otherwise read-only SELECT.
+PRIMARY_ONLY_FUNCTIONS = {
+    "nextval", "setval", "txid_current", "pg_current_xact_id", "pg_current_wal_lsn",
+    "pg_advisory_lock", "pg_advisory_xact_lock", "pg_try_advisory_lock", "pg_try_advisory_xact_lock",
+    "lo_create", "lo_import", "lo_unlink", "set_config",
+}
+# Statements that may change settings outliving their transaction (procedures and DO blocks can run SET).
+SESSION_SETTING_KINDS = {"set", "reset", "do", "call"}
+# Session, transaction-control and maintenance commands, which change no table contents or schema.
+NO_WRITE_KINDS = {
+    "set", "reset", "begin", "start", "commit", "end", "rollback", "abort", "savepoint", "release",
+    "analyze", "vacuum", "checkpoint", "discard", "deallocate", "prepare", "listen", "unlisten", "notify", "lock",
+}
+_TABLE_KEYWORDS = {"from", "join", "into", "update", "table", "truncate"}
+_SKIP_AFTER_TABLE_KEYWORD = {"only", "if", "exists", "lateral", "table"}
+_CLAUSE_WORDS = {
+    "where", "group", "order", "having", "limit", "offset", "join", "inner", "left", "right",
+    "full", "cross", "natural", "on", "using", "union", "intersect", "except", "window",
+    "for", "returning", "set", "values", "select", "fetch", "tablesample", "default",
+}
+
+
+def tokenize(query):
+    """
+    Splits SQL into (kind, text) tokens with comments and whitespace removed.
+    Words are lower-cased; literals and quoted identifiers are kept verbatim.
+    """
+    tokens = []
+    for match in _TOKEN_RE.finditer(query):
+        kind = match.lastgroup
+        if kind in ("space", "comment"):
+            continue
+        text = match.group()
+        tokens.append((kind, text.lower() if kind == "word" else text))
+    return tokens
+
+
+def normalize_sql(query):
+    """
+    Returns a canonical form of the query for use as a cache key:
+    comments dropped, whitespace collapsed, keywords lower-cased, trailing semicolons removed.
+    """
+    tokens = tokenize(query)
+    while tokens and tokens[-1] == ("other", ";"):
+        tokens.pop()
+    return " ".join(text for _, text in tokens)
+
+
+def split_statements(query):
+    """
+    Splits a (possibly multi-statement) query into token lists, one per statement.
+    """
+    statements, current = [], []
+    for token in tokenize(query):
+        if token == ("other", ";"):
+            if current:
+                statements.append(current)
+            current = []
+        else:
+            current.append(token)
+    if current:
+        statements.append(current)
+    return statements
+
+
+def fingerprint(query):
+    """
+    Returns the query's shape: normalize_sql with string and numeric literals replaced by `?`,
+    so queries that differ only in their constants (or IN-list length) share a fingerprint.
+    """
+    tokens = tokenize(query)
+    while tokens and tokens[-1] == ("other", ";"):
+        tokens.pop()
+    shape = []
+    for kind, text in tokens:
+        if kind in ("string", "number"):
+            if shape[-2:] == ["?", ","]:
+                shape.pop()  # IN (?, ?, ?) lists of any length share one shape
+                continue
+            text = "?"
+        shape.append(text)
+    return " ".join(shape)
+
+
+def split_sql(query):
+    """
+    Splits a multi-statement query into the text of each statement (without the semicolons).
+    """
+    statements = []
+    start = 0
+    has_tokens = False
+    for match in _TOKEN_RE.finditer(query):
+        kind = match.lastgroup
+        if kind == "other" and match.group() == ";":
+            if has_tokens:
+                statements.append(query[start:match.start()].strip())
+            start = match.end()
+            has_tokens = False
+        elif kind not in ("space", "comment"):
+            has_tokens = True
+    if has_tokens:
+        statements.append(query[start:].strip())
+    return statements
+
+
+def _words(tokens):
+    return [text for kind, text in tokens if kind == "word"]
+
+
+def statement_kind(query):
+    """
+    Returns the leading keyword of the first statement (e.g. "select", "insert"), or "" if none.
+    """
+    statements = split_statements(query)
+    words = _words(statements[0]) if statements else []
+    return words[0] if words else ""
+
+
+def _statement_is_read_only(tokens):
+    words = _words(tokens)
+    if not words:
+        return True
+    kind = words[0]
+    if kind == "explain":
+        # Plain EXPLAIN only plans the statement; EXPLAIN ANALYZE also runs it.
+        if "analyze" not in words:
+            return True
+        return not DATA_MODIFYING_WORDS.intersection(words)
+    if kind not in READ_ONLY_KINDS and kind != "with":
+        return False
+    if DATA_MODIFYING_WORDS.intersection(words):
+        return False
+    for index, word in enumerate(words):
+        if word == "into" and kind in ("select", "with"):
+            return False  # SELECT ... INTO creates a table
+        if word == "for" and index + 1 < len(words) and words[index + 1] in ("update", "share", "no", "key"):
+            return False  # row locks need the primary
+    return True
+
+
+def is_read_only(query):
+    """
+    True if every statement in the query only reads data.
+    """
+    return all(_statement_is_read_only(tokens) for tokens in split_statements(query))
+
+
+def is_ddl(query):
+    """
+    True if any statement in the query changes the schema.
+    """
+    return any(_words(tokens)[:1] and _words(tokens)[0] in DDL_KINDS for tokens in split_statements(query))
+
+
+def resets_session_state(query):
+    """
+    True if the query drops session state such as prepared statements (DEALLOCATE, DISCARD).
+    """
+    return bool({"deallocate", "discard"}.intersection(_words(tokenize(query))))
+
+
+def changes_session_settings(query):
+    """
+    True if the query may change session settings (SET, RESET, SET ROLE, set_config()) that a
+    later user of the same pooled connection would inherit.
+    """
+    if "set_config" in _words(tokenize(query)):
+        return True
+    return any(_words(tokens)[:1] and _words(tokens)[0] in SESSION_SETTING_KINDS
+               for tokens in split_statements(query))
+
+
+def writes_no_tables(query):
+    """
+    True if every statement in the query is a session, transaction-control or maintenance
+    command (SET, BEGIN, ANALYZE, VACUUM, ...) that leaves table contents and the schema alone.
+    """
+    statements = split_statements(query)
+    return bool(statements) and all(_words(tokens)[:1] and _words(tokens)[0] in NO_WRITE_KINDS
+                                    for tokens in statements)
+
+
+def is_cacheable(query):
+    """
+    True if the query's result depends only on table contents,
+    i.e. it is read-only and calls no volatile functions.
+    """
+    if not is_read_only(query):
+        return False
+    words = set(_words(tokenize(query)))
+    return not VOLATILE_FUNCTIONS.intersection(words) and "explain" not in words
+
+
+def is_replica_safe(query):
+    """
+    True if the query can run on a read replica (a hot standby): read-only, and calling no
+    function that writes or needs the primary.
+    """
+    if not is_read_only(query):
+        return False
+    return not PRIMARY_ONLY_FUNCTIONS.intersection(_words(tokenize(query)))
+
+
+def _identifier(token):
+    kind, text = token
+    if kind == "quoted":
+        return text[1:-1].replace('""', '"')
+    if kind == "word":
+        return text
+    return None
+
+
+def referenced_tables(query):
+    """
+    Returns the set of table names (without schema) that the query reads from or writes to.
+    Subqueries and function calls in FROM are skipped; CTE names are excluded.
+    """
+    tables = set()
+    cte_names = set()
+    tokens = tokenize(query)
+    count = len(tokens)
+
+    for index, token in enumerate(tokens):
+        if token[1] == "as" and index > 0 and index + 1 < count and tokens[index + 1][1] == "(":
+            name = _identifier(tokens[index - 1])
+            if name:
+                cte_names.add(name)
+
+    index = 0
+    while index < count:
+        kind, text = tokens[index]
+        index += 1
+        if kind != "word" or text not in _TABLE_KEYWORDS:
+            continue
+        while True:
+            while index < count and tokens[index][1] in _SKIP_AFTER_TABLE_KEYWORD:
+                index += 1
+            if index >= count:
+                break
+            name = _identifier(tokens[index])
+            if name is None or tokens[index][1] in _CLAUSE_WORDS:
+                break
+            index += 1
+            while index + 1 < count and tokens[index][1] == "." and _identifier(tokens[index + 1]):
+                name = _identifier(tokens[index + 1])  # schema-qualified: keep the table part
+                index += 2
+            if text in ("from", "join") and index < count and tokens[index][1] == "(":
+                break  # function call such as generate_series(...)
+            if name not in cte_names:
+                tables.add(name)
+            if text not in ("from", "truncate"):
+                break
+            # FROM a [AS] x, b [AS] y: skip the alias and continue after a comma
+            while index < count and tokens[index][1] not in _CLAUSE_WORDS and tokens[index][1] not in (",", ")"):
+                index += 1
+            if index < count and tokens[index][1] == ",":
+                index += 1
+                continue
+            break
+    return tables
+
+
+def written_tables(query):
+    """
+    Returns the tables a write statement may modify, or None when that cannot be
+    determined (DDL, DO blocks, function calls), meaning "assume everything changed".
+    """
+    if is_ddl(query):
+        return None
+    if {"do", "call"}.intersection(_words(tokenize(query))):
+        return None  # a procedure or anonymous block may write anywhere
+    tables = referenced_tables(query)
+    return tables or None
+
+
+def may_write_tables(query, tables):
+    """
+    True if a write statement could change rows of any of the given tables: it names one of
+    them, or its targets cannot be told (DO blocks, procedures, EXECUTE, unparsed writes).
+    DDL counts only when it names one of the tables, so CREATE INDEX or CREATE TABLE elsewhere do not.
+    """
+    if {"do", "call", "execute"}.intersection(_words(tokenize(query))):
+        return True
+    referenced = referenced_tables(query)
+    if not referenced and not is_ddl(query):
+        return True
+    return bool(referenced.intersection(tables))
+
+
+_PREDICATE_CLAUSES = {"where", "on", "having"}
+_CLAUSE_STARTERS = _PREDICATE_CLAUSES | {
+    "select", "from", "join", "group", "order", "set", "returning", "values", "limit", "offset", "using",
+}
+_COMPARISON_CHARS = {"=", "<", ">", "!"}
+_VALUE_WORDS = {
+    "true", "false", "null", "not", "and", "or", "any", "all", "some", "select", "case", "exists",
+    "array", "interval", "date", "timestamp", "cast", "current_date", "current_timestamp", "now",
+}
+
+
+def _table_aliases(tokens, tables):
+    """
+    Maps aliases (and bare names) to the tables they stand for, e.g. `package_tags pt` -> pt.
+    """
+    aliases = {table: table for table in tables}
+    for index, token in enumerate(tokens):
+        name = _identifier(token)
+        if name not in tables:
+            continue
+        following = index + 1
+        if following < len(tokens) and tokens[following][1] == "as":
+            following += 1
+        if following < len(tokens):
+            alias = _identifier(tokens[following])
+            if alias and alias not in _CLAUSE_WORDS and alias not in _CLAUSE_STARTERS:
+                aliases[alias] = name
+    return aliases
+
+
+def _column_before(tokens, end):
+    """
+    Reads a column reference ending just before `end`: (qualifier or None, column) or None.
+    """
+    if end < 1 or tokens[end - 1][0] not in ("word", "quoted") or tokens[end - 1][1] in _VALUE_WORDS:
+        return None
+    column = _identifier(tokens[end - 1])
+    if end >= 3 and tokens[end - 2][1] == ".":
+        return _identifier(tokens[end - 3]), column
+    return None, column
+
+
+def _column_after(tokens, start):
+    """
+    Reads a column reference starting at `start`: (qualifier or None, column) or None.
+    Function calls and literals are not column references.
+    """
+    count = len(tokens)
+    if start >= count or tokens[start][0] not in ("word", "quoted") or tokens[start][1] in _VALUE_WORDS:
+        return None
+    qualifier, column, end = None, _identifier(tokens[start]), start + 1
+    if end + 1 < count and tokens[end][1] == "." and _identifier(tokens[end + 1]):
+        qualifier, column, end = column, _identifier(tokens[end + 1]), end + 2
+    if end < count and tokens[end][1] in ("(", "."):
+        return None
+    return qualifier, column
+
+
+def predicate_columns(query):
+    """
+    Finds columns compared in WHERE / ON / HAVING clauses, the candidates for an index.
+    Returns a set of (table, column, kind) where kind is "equality", "range" or "join" and
+    table is None when an unqualified column cannot be attributed to a single table.
+    """
+    tokens = tokenize(query)
+    tables = referenced_tables(query)
+    aliases = _table_aliases(tokens, tables)
+    only_table = next(iter(tables)) if len(tables) == 1 else None
+
+    def resolve(reference):
+        qualifier, column = reference
+        if qualifier is None:
+            return only_table, column
+        return aliases.get(qualifier), column
+
+    found = set()
+    clause = None
+    index, count = 0, len(tokens)
+    while index < count:
+        kind, text = tokens[index]
+        if kind == "word" and text in _CLAUSE_STARTERS:
+            clause = text
+        if clause not in _PREDICATE_CLAUSES:
+            index += 1
+            continue
+
+        if kind == "other" and text in _COMPARISON_CHARS:
+            end = index
+            while end < count and tokens[end][1] in _COMPARISON_CHARS:
+                end += 1
+            operator = "".join(token[1] for token in tokens[index:end])
+        elif kind == "word" and text in ("in", "between"):
+            end, operator = index + 1, text
+        else:
+            index += 1
+            continue
+
+        left = _column_before(tokens, index)
+        right = _column_after(tokens, end) if operator not in ("in", "between") else None
+        comparison = "equality" if operator in ("=", "in") else "range"
+        if left and right:
+            found.add((*resolve(left), "join"))
+            found.add((*resolve(right), "join"))
+        elif left and operator not in ("<>", "!="):
+            found.add((*resolve(left), comparison))
+        elif right and operator not in ("<>", "!="):
+            found.add((*resolve(right), comparison))
+        index = end
+    return {item for item in found if item[1]}
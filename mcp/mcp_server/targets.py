@@ -0,0 +1,163 @@
+import json
+import threading
+
+from schema_introspection import SchemaIntrospector
+
+# Named database targets (e.g. one per region) served by one server process. Each target has
+# its own DatabaseManager, connection pool and cached schema description, created on first
+# use, so configured targets that are never queried open no connections.
+#
+# Targets come from QUERY_MCP_TARGETS (inline JSON) or QUERY_MCP_TARGETS_FILE:
+#
+#     {"default": "eu",
+#      "targets": {"eu": {"db_host": "eu.db.internal", "replicas": ["host=eu-replica.db.internal"]},
+#                  "us": {"db_host": "us.db.internal", "db_name": "vulns_us"}}}
+#
+# Each target overrides the QUERY_MCP_* connection settings, which act as defaults. Without
+# either variable there is a single target, "default", built from those settings.
+
+DEFAULT_TARGET = "default"
+
+
+class UnknownTargetError(KeyError):
+    """
+    Raised when a tool names a target that is not configured.
+    """
+
+    def __init__(self, name, known):
+        super().__init__(f"unknown target {name!r}; configured targets: {', '.join(known)}")
+        self.name = name
+        self.known = list(known)
+
+
+def load_targets(settings):
+    """
+    Reads the target configuration referenced by the settings.
+    :param settings: Process Settings; their connection settings are the targets' defaults.
+    :return: (dict of target name -> Settings, name of the default target).
+    :raises ValueError: If the configuration is not valid JSON or names unknown settings.
+    """
+    if settings.targets_file:
+        with open(settings.targets_file, encoding="utf-8") as f:
+            raw, source = f.read(), settings.targets_file
+    elif settings.targets:
+        raw, source = settings.targets, "QUERY_MCP_TARGETS"
+    else:
+        return {DEFAULT_TARGET: settings}, DEFAULT_TARGET
+
+    try:
+        config = json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"{source} is not valid JSON: {e}") from None
+    targets = config.get("targets") if isinstance(config, dict) else None
+    if not isinstance(targets, dict) or not targets:
+        raise ValueError(f"{source} must be an object with a non-empty \"targets\" object")
+
+    resolved = {}
+    for name, overrides in targets.items():
+        if not isinstance(overrides, dict):
+            raise ValueError(f"target {name!r} in {source} must be an object of settings")
+        try:
+            resolved[name] = settings.override(overrides)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"target {name!r} in {source}: {e}") from None
+    default = config.get("default", next(iter(resolved)))
+    if default not in resolved:
+        raise ValueError(f"default target {default!r} in {source} is not one of the targets")
+    return resolved, default
+
+
+class Target:
+    """
+    One named database: its DatabaseManager and schema description cache.
+    """
+
+    def __init__(self, name, settings, db_manager):
+        self.name = name
+        self.settings = settings
+        self.db_manager = db_manager
+        self.schema_introspector = SchemaIntrospector(db_manager)
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "database": self.settings.db_name,
+            "host": f"{self.settings.db_host}:{self.settings.db_port}",
+            "health": self.db_manager.health(),
+            "pool": self.db_manager.pool_stats(),
+            "replicas": self.db_manager.replica_stats(),
+        }
+
+
+class TargetRegistry:
+    """
+    Creates each target's DatabaseManager on first use and hands it out by name.
+    """
+
+    def __init__(self, targets, open_manager, default=None):
+        """
+        :param targets: Dict of target name -> Settings.
+        :param open_manager: Callable building a (lazy) DatabaseManager from a target's Settings.
+        :param default: Target used when a tool names none (defaults to the first one).
+        """
+        self.settings = dict(targets)
+        self.open_manager = open_manager
+        self.default = default if default is not None else next(iter(self.settings))
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._liveness_interval = None
+
+    def names(self):
+        return list(self.settings)
+
+    def get(self, name=None):
+        """
+        Returns the named target, creating its DatabaseManager on first use.
+        :param name: Target name; None or "" selects the default target.
+        :raises UnknownTargetError: If no such target is configured.
+        """
+        name = name or self.default
+        target = self._targets.get(name)
+        if target is not None:
+            return target
+        if name not in self.settings:
+            raise UnknownTargetError(name, self.settings)
+        with self._lock:
+            target = self._targets.get(name)
+            if target is None:
+                target = Target(name, self.settings[name], self.open_manager(self.settings[name]))
+                if self._liveness_interval:
+                    target.db_manager.start_liveness_probe(self._liveness_interval)
+                self._targets[name] = target
+            return target
+
+    def loaded(self):
+        with self._lock:
+            return list(self._targets.values())
+
+    def start_liveness_probes(self, interval):
+        """
+        Probes every target in use now, and each target as it comes into use, every `interval` seconds.
+        """
+        with self._lock:
+            self._liveness_interval = interval
+            targets = list(self._targets.values())
+        for target in targets:
+            target.db_manager.start_liveness_probe(interval)
+
+    def stats(self):
+        loaded = {target.name: target for target in self.loaded()}
+        report = []
+        for name, settings in self.settings.items():
+            if name in loaded:
+                entry = dict(loaded[name].stats(), loaded=True)
+            else:
+                entry = {"name": name, "database": settings.db_name,
+                         "host": f"{settings.db_host}:{settings.db_port}", "loaded": False}
+            entry["default"] = name == self.default
+            report.append(entry)
+        return report
+
+    def close(self):
+        for target in self.loaded():
+            target.db_manager.close_connection()
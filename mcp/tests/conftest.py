@@ -0,0 +1,80 @@
+import os
+import sys
+
+import psycopg2
+import pytest
+
+# The server modules import each other as top-level modules (they run as scripts from
+# mcp_server/); the client is imported as the mcp_client package. The repository root must
+# not be on the path (python -m pytest puts the working directory there): its mcp/ directory
+# would shadow the mcp SDK that fastmcp imports.
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+sys.path[:] = [path for path in sys.path if os.path.abspath(path or os.curdir) != ROOT]
+sys.path.insert(0, os.path.join(HERE, "..", "mcp_server"))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+# Database tests run against a throwaway database, dropped and recreated once per test run.
+# The QUERY_MCP_* connection variables select the server; the database name is ignored.
+TEST_DB = "query_mcp_test"
+CONNECTION = dict(
+    user=os.environ.get("QUERY_MCP_DB_USER", "postgres"),
+    password=os.environ.get("QUERY_MCP_DB_PASSWORD", "postgres"),
+    host=os.environ.get("QUERY_MCP_DB_HOST", "localhost"),
+    port=int(os.environ.get("QUERY_MCP_DB_PORT", "5432")),
+)
+# server.py reads its settings at import.
+os.environ["QUERY_MCP_DB_NAME"] = TEST_DB
+os.environ["QUERY_MCP_WARM_UP"] = "0"
+os.environ["QUERY_MCP_STATEMENT_TIMEOUT_MS"] = "1000"
+
+
+def connect_kwargs():
+    return dict(dbname=TEST_DB, **CONNECTION)
+
+
+@pytest.fixture(scope="session")
+def database():
+    """
+    Creates the test database with the schema and the scale 1 seed data.
+    Skips the test if Postgres cannot be reached.
+    """
+    try:
+        admin = psycopg2.connect(dbname="postgres", connect_timeout=3, **CONNECTION)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL is not reachable: {e}")
+    admin.autocommit = True
+    with admin.cursor() as cursor:
+        cursor.execute(f"DROP DATABASE IF EXISTS {TEST_DB} WITH (FORCE);")
+        # UTF8 whatever the cluster default: the schema and seed data are not plain ASCII.
+        cursor.execute(f"CREATE DATABASE {TEST_DB} ENCODING 'UTF8' TEMPLATE template0;")
+    admin.close()
+    from database import DatabaseManager
+
+    manager = DatabaseManager(TEST_DB, **CONNECTION)
+    assert manager.setup_database() == "Database seeded successfully!"
+    manager.close_connection()
+    return TEST_DB
+
+
+@pytest.fixture
+def db(database):
+    """
+    A DatabaseManager on the seeded test database.
+    """
+    from database import DatabaseManager
+
+    manager = DatabaseManager(database, **CONNECTION, max_connections=4)
+    yield manager
+    manager.close_all_query_pages()
+    manager.close_connection()
+
+
+@pytest.fixture
+def pool(database):
+    from db_pool import ConnectionPool
+
+    pool = ConnectionPool(connect_kwargs(), min_size=1, max_size=2, timeout=1.0)
+    yield pool
+    pool.closeall()
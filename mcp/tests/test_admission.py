@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+import pytest
+
+from admission import AdmissionController, AdmissionPolicy, AdmissionRejected
+
+
+def controller(**limits):
+    return AdmissionController(AdmissionPolicy(**limits))
+
+
+async def hold(admission, session, release, entered=None):
+    async with admission.admit(session):
+        if entered is not None:
+            entered.set()
+        await release.wait()
+
+
+def test_session_cap_rejects_only_that_session():
+    async def run():
+        admission = controller(max_concurrent_per_session=2, max_concurrent=10)
+        release = asyncio.Event()
+        holders = [asyncio.create_task(hold(admission, "a", release)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with admission.admit("a"):
+                pass
+        async with admission.admit("b"):
+            pass
+        release.set()
+        await asyncio.gather(*holders)
+        return rejected.value, admission.stats()
+
+    rejection, stats = asyncio.run(run())
+    assert rejection.code == "session_concurrency_limit"
+    assert json.loads(rejection.to_json()) == {
+        "error": "session_concurrency_limit", "message": rejection.message, "limit": 2,
+    }
+    assert stats["admitted"] == 3 and stats["sessions"] == 0
+    assert stats["rejected"] == {"session_concurrency_limit": 1}
+
+
+def test_full_queue_and_queue_timeout_are_rejected():
+    async def run():
+        admission = controller(max_concurrent_per_session=None, max_concurrent=1, max_queue=1,
+                               queue_timeout=0.1)
+        release, entered = asyncio.Event(), asyncio.Event()
+        running = asyncio.create_task(hold(admission, "a", release, entered))
+        await entered.wait()
+        queued = asyncio.create_task(hold(admission, "b", release))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as full:
+            async with admission.admit("c"):
+                pass
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await queued
+        release.set()
+        await running
+        return full.value.code, timed_out.value.code, admission.stats()
+
+    full, timed_out, stats = asyncio.run(run())
+    assert (full, timed_out) == ("queue_full", "queue_timeout")
+    assert stats["running"] == 0 and stats["queued"] == 0
+
+
+def test_queued_query_runs_once_a_slot_frees():
+    async def run():
+        admission = controller(max_concurrent=1)
+        release, entered = asyncio.Event(), asyncio.Event()
+        running = asyncio.create_task(hold(admission, "a", release, entered))
+        await entered.wait()
+        queued = asyncio.create_task(hold(admission, "b", asyncio.Event()))
+        await asyncio.sleep(0.01)
+        assert admission.stats()["queued"] == 1
+        release.set()
+        await running
+        await asyncio.sleep(0.01)
+        assert admission.stats()["running"] == 1
+        queued.cancel()
+
+    asyncio.run(run())
+
+
+def test_cost_ceiling():
+    async def estimate():
+        return 1500.0
+
+    async def run(ceiling):
+        await controller(max_plan_cost=ceiling).check_cost(estimate)
+
+    asyncio.run(run(None))
+    asyncio.run(run(2000))
+    with pytest.raises(AdmissionRejected) as rejected:
+        asyncio.run(run(1000))
+    assert rejected.value.details == {"estimated_cost": 1500.0, "max_plan_cost": 1000}
+
+
+def test_drain_waits_for_admitted_queries_and_rejects_new_ones():
+    async def run():
+        admission = controller(max_concurrent=2)
+        release, entered = asyncio.Event(), asyncio.Event()
+        running = asyncio.create_task(hold(admission, "a", release, entered))
+        await entered.wait()
+        assert not await admission.drain(timeout=0.05)
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with admission.admit("b"):
+                pass
+        asyncio.get_running_loop().call_later(0.05, release.set)
+        drained = await admission.drain(timeout=5)
+        await running
+        return drained, rejected.value.code, admission.stats()
+
+    drained, code, stats = asyncio.run(run())
+    assert drained and code == "shutting_down"
+    assert stats["draining"] and stats["running"] == 0
@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+import pytest
+from psycopg2.extensions import QueryCanceledError
+
+from async_executor import AsyncQueryExecutor
+from database import QueryHandle
+
+
+def test_blocking_calls_do_not_block_the_event_loop():
+    executor = AsyncQueryExecutor(max_workers=2)
+
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        started = time.perf_counter()
+        await asyncio.gather(executor.run(time.sleep, 0.2), executor.run(time.sleep, 0.2))
+        ticker.cancel()
+        return time.perf_counter() - started, ticks
+
+    elapsed, ticks = asyncio.run(run())
+    executor.shutdown()
+    assert elapsed < 0.35  # both ran at once
+    assert ticks >= 5
+
+
+def test_cancelled_query_is_cancelled_on_the_backend(db):
+    executor = AsyncQueryExecutor(max_workers=2)
+
+    async def run():
+        task = asyncio.create_task(executor.run_cancellable(db.execute_raw_query, "SELECT pg_sleep(5);",
+                                                            raise_errors=True))
+        await asyncio.sleep(0.3)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    executor.shutdown(wait=True)  # returns once the backend gave up the query
+    assert time.perf_counter() - started < 3
+    assert db.pool_stats()["in_use"] == 0
+
+
+def test_handle_cancelled_before_start_refuses_to_attach():
+    handle = QueryHandle()
+    handle.cancel()
+    with pytest.raises(QueryCanceledError):
+        handle.attach(object())
@@ -0,0 +1,36 @@
+import suite
+
+
+def test_percentile_is_nearest_rank():
+    ordered = [0.001 * n for n in range(1, 101)]
+    assert suite.percentile(ordered, 0.5) == ordered[49]
+    assert suite.percentile(ordered, 0.99) == ordered[98]
+    assert suite.percentile([0.2], 0.95) == 0.2
+
+
+def test_run_sync_counts_errors_apart():
+    def operation(i):
+        if i % 3 == 1:
+            raise RuntimeError("boom")
+
+    summary = suite.run_sync(operation, iterations=9, warmup=1)
+    assert (summary["count"], summary["errors"]) == (6, 3)
+    assert summary["p50_ms"] <= summary["p95_ms"] <= summary["p99_ms"]
+    assert suite.summarize([], 1.0, errors=2) == {"count": 0, "errors": 2}
+
+
+def test_compare_reports_regressions_beyond_the_threshold(capsys):
+    fast = {"count": 10, "p50_ms": 1.0, "p95_ms": 2.0, "p99_ms": 3.0, "ops_per_s": 100.0}
+    slow = dict(fast, p95_ms=3.0)
+    baseline = {"meta": {"commit": "abc123"}, "scales": {"1": {"scenarios": {"raw.point_select": fast}}}}
+    report = {"scales": {"1": {"scenarios": {"raw.point_select": slow}}}}
+    assert suite.compare(report, baseline, threshold=0.1) == [("1", "raw.point_select", "p95_ms", 0.5)]
+    assert "p95_ms +50.0% !" in capsys.readouterr().out
+
+
+def test_manager_scenarios_run_against_the_seeded_database(db):
+    ids = suite.sample_ids(db)
+    for name, operation in suite.manager_scenarios(db, ids, scale=1).items():
+        summary = suite.run_sync(operation, iterations=2, warmup=0)
+        assert summary["errors"] == 0, name
+    db.seed_bulk()  # drop the benchmark's commits and associations
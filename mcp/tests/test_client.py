@@ -0,0 +1,143 @@
+import asyncio
+
+from fastmcp import Context, FastMCP
+from fastmcp.exceptions import ToolError
+from google.genai import types
+
+from mcp_client.client import ChatPrinter, ChatSession
+from mcp_client.sql_cache import SqlCache
+
+
+def make_server(tables):
+    server = FastMCP("stub")
+
+    @server.tool
+    async def execute_raw_query(query: str, ctx: Context) -> str:
+        await ctx.info(f"Executing query :\n{query}")
+        table = query.split()[-1]
+        if table not in tables:
+            await ctx.error(f"Error executing raw query: relation \"{table}\" does not exist")
+            raise ToolError(f"relation \"{table}\" does not exist")
+        return f"count\n{tables[table]}"
+
+    return server
+
+
+class StubModels:
+    """
+    Stands in for client.aio.models: answers every question by running `sql` through the
+    chat's MCP client and recording the call, the way automatic function calling would.
+    """
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.chat = None
+        self.questions = []
+
+    async def generate_content_stream(self, model, contents, config):
+        self.questions.append(contents[-1].parts[0].text)
+        arguments = {"query": self.sql}
+        result = await self.chat.mcp_client.call_tool("execute_raw_query", arguments)
+        history = [*contents, types.Content(role="model", parts=[
+            types.Part.from_function_call(name="execute_raw_query", args=arguments),
+        ]), types.Content(role="user", parts=[
+            types.Part.from_function_response(name="execute_raw_query", response={"result": result.content[0].text}),
+        ])]
+
+        async def chunks():
+            text = f"There are {result.content[0].text.split()[-1]}."
+            yield types.GenerateContentResponse(candidates=[types.Candidate(
+                content=types.Content(role="model", parts=[types.Part.from_text(text=text)]))],
+                automatic_function_calling_history=history)
+
+        return chunks()
+
+    async def generate_content(self, model, contents, config):
+        return types.GenerateContentResponse(candidates=[types.Candidate(
+            content=types.Content(role="model", parts=[types.Part.from_text(text="summary")]))])
+
+
+class StubModelClient:
+    def __init__(self, sql):
+        self.models = StubModels(sql)
+        self.aio = self
+
+
+def chat(tables, sql, sql_cache):
+    model_client = StubModelClient(sql)
+    session = ChatSession(make_server(tables), model_client, sql_cache)
+    model_client.models.chat = session
+    return session, model_client.models
+
+
+def test_miss_asks_the_model_and_caches_its_sql(capsys):
+    cache = SqlCache()
+
+    async def run():
+        session, models = chat({"packages": 750}, "SELECT count(*) FROM packages", cache)
+        async with session:
+            return await session.ask("How many packages are there?"), models.questions
+
+    answered_by, questions = asyncio.run(run())
+    assert answered_by == "model"
+    assert questions == ["How many packages are there?"]
+    assert cache.lookup("how many packages are there")["sql"] == "SELECT count(*) FROM packages"
+    assert "There are 750." in capsys.readouterr().out
+
+
+def test_hit_runs_cached_sql_without_the_model(capsys):
+    cache = SqlCache()
+    cache.store("How many packages are there?", "SELECT count(*) FROM packages")
+
+    async def run():
+        session, models = chat({"packages": 750}, "SELECT count(*) FROM wrong", cache)
+        async with session:
+            answered_by = await session.ask("how many packages are there")
+            return answered_by, models.questions, session.conversation.turns
+
+    answered_by, questions, turns = asyncio.run(run())
+    assert answered_by == "cache"
+    assert questions == []
+    assert "750" in turns[-1][1]
+    assert "cached SQL" in capsys.readouterr().out
+
+
+def test_failing_cached_sql_is_forgotten_and_the_model_asked():
+    cache = SqlCache()
+    cache.store("How many packages are there?", "SELECT count(*) FROM old_packages")
+
+    async def run():
+        session, models = chat({"packages": 750}, "SELECT count(*) FROM packages", cache)
+        async with session:
+            return await session.ask("How many packages are there?"), models.questions
+
+    answered_by, questions = asyncio.run(run())
+    assert answered_by == "model"
+    assert questions == ["How many packages are there?"]
+    # The model's SQL replaced the stale entry; the failed cached query was not captured.
+    assert cache.lookup("How many packages are there?")["sql"] == "SELECT count(*) FROM packages"
+
+
+def test_progress_lines_start_on_their_own_line(capsys):
+    printer = ChatPrinter()
+    printer.text("Let me check")
+    printer.progress("Executing query :\nSELECT count(*)\n  FROM packages")
+    printer.progress("x" * 150)
+    printer.text("done.\n")
+    printer.end()
+    assert capsys.readouterr().out == (
+        "Let me check\n  … Executing query : SELECT count(*) FROM packages\n"
+        f"  … {'x' * 99}…\ndone.\n"
+    )
+
+
+def test_server_progress_is_printed_while_the_model_answers(capsys):
+    async def run():
+        session, _ = chat({"packages": 750}, "SELECT count(*) FROM packages", SqlCache())
+        async with session:
+            await session.ask("How many packages are there?")
+
+    asyncio.run(run())
+    out = capsys.readouterr().out
+    assert "  … Executing query : SELECT count(*) FROM packages\n" in out
+    assert out.index("Executing query") < out.index("There are 750.")
@@ -0,0 +1,155 @@
+import asyncio
+
+from google.genai import types
+
+from mcp_client.conversation import ConversationManager, _chunk_text, estimate_tokens
+
+
+def response(*parts):
+    return types.GenerateContentResponse(candidates=[types.Candidate(
+        content=types.Content(role="model", parts=list(parts)))])
+
+
+class StubModels:
+    """
+    Stands in for client.aio.models. Answers echo the question; summaries append the user
+    messages of the folded turns to the current summary.
+    """
+
+    def __init__(self, fail_summaries=False):
+        self.fail_summaries = fail_summaries
+        self.requests = []  # (model, contents, config)
+
+    async def generate_content(self, model, contents, config):
+        self.requests.append((model, contents, config))
+        if model == "summary":
+            await asyncio.sleep(0)  # let the caller queue another fold behind this one
+            if self.fail_summaries:
+                raise RuntimeError("quota exceeded")
+            summary = contents.split("Current summary:\n")[1].split("\n")[0]
+            asked = [line[len("User: "):] for line in contents.splitlines() if line.startswith("User: ")]
+            return response(types.Part.from_text(text=" ".join(
+                ([] if summary == "(empty)" else [summary]) + asked)))
+        return response(types.Part.from_text(text=f"answer to {contents[-1].parts[0].text}"))
+
+    async def generate_content_stream(self, model, contents, config):
+        self.requests.append((model, contents, config))
+
+        async def chunks():
+            yield response(types.Part(text="thinking about it", thought=True))
+            yield response(types.Part.from_text(text="answer "))
+            yield response(types.Part.from_function_call(name="execute_raw_query", args={"query": "SELECT 1"}))
+            yield types.GenerateContentResponse(candidates=[])
+            yield response(types.Part.from_text(text="to "), types.Part.from_text(text=contents[-1].parts[0].text))
+
+        return chunks()
+
+
+class StubClient:
+    def __init__(self, models):
+        self.models = models
+        self.aio = self
+
+
+def conversation(models, **limits):
+    config = types.GenerateContentConfig(system_instruction="Be brief.")
+    return ConversationManager(StubClient(models), "answer", config=config, summary_model="summary", **limits)
+
+
+def test_turns_beyond_the_window_are_folded_into_the_summary():
+    models = StubModels()
+
+    async def run():
+        manager = conversation(models, max_turns=2)
+        for question in ("q1", "q2", "q3"):
+            await manager.send(question)
+        await manager.close()
+        return manager
+
+    manager = asyncio.run(run())
+    assert [user_text for user_text, _ in manager.turns] == ["q2", "q3"]
+    assert manager.summary == "q1"
+    instruction = manager.request_config().system_instruction
+    assert instruction == "Be brief.\n\nSummary of the earlier conversation:\nq1"
+
+
+def test_contents_send_the_window_then_the_new_message():
+    manager = conversation(StubModels())
+    manager.record("q1", "a1")
+    contents = manager.contents("q2")
+    assert [(content.role, content.parts[0].text) for content in contents] == [
+        ("user", "q1"), ("model", "a1"), ("user", "q2"),
+    ]
+    assert manager.request_config() is manager.config  # no summary yet
+
+
+def test_token_budget_evicts_old_turns_but_keeps_the_latest():
+    async def run():
+        manager = conversation(StubModels(), max_turns=10, max_tokens=estimate_tokens("x" * 40) * 2)
+        manager.record("x" * 40, "")
+        manager.record("y" * 40, "")
+        manager.record("z" * 400, "")  # over budget on its own
+        await manager.close()
+        return manager
+
+    manager = asyncio.run(run())
+    assert [user_text[0] for user_text, _ in manager.turns] == ["z"]
+    assert manager.summary == "x" * 40 + " " + "y" * 40
+
+
+def test_folds_started_back_to_back_are_chained():
+    async def run():
+        manager = conversation(StubModels(), max_turns=1)
+        manager.record("q1", "a1")
+        manager.record("q2", "a2")  # folds q1
+        manager.record("q3", "a3")  # folds q2 while the first fold is still running
+        await manager.close()
+        return manager
+
+    manager = asyncio.run(run())
+    assert manager.summary == "q1 q2"
+    assert manager._compaction is None
+
+
+def test_failed_fold_keeps_the_questions():
+    async def run():
+        manager = conversation(StubModels(fail_summaries=True), max_turns=1)
+        manager.record("q1", "a1")
+        manager.record("q2", "a2")
+        await manager.close()
+        return manager
+
+    manager = asyncio.run(run())
+    assert manager.summary == "Earlier the user asked: q1"
+
+
+def test_send_waits_for_a_pending_fold():
+    models = StubModels()
+
+    async def run():
+        manager = conversation(models, max_turns=1)
+        manager.record("q1", "a1")
+        manager.record("q2", "a2")
+        await manager.send("q3")
+        await manager.close()
+
+    asyncio.run(run())
+    config = next(config for model, _, config in models.requests if model == "answer")
+    assert config.system_instruction.endswith("Summary of the earlier conversation:\nq1")
+
+
+def test_chunk_text_keeps_only_reply_text():
+    assert _chunk_text(response(types.Part.from_text(text="a"), types.Part(text="b", thought=True))) == "a"
+    assert _chunk_text(response(types.Part.from_function_call(name="f", args={}))) == ""
+    assert _chunk_text(types.GenerateContentResponse(candidates=[])) == ""
+
+
+def test_stream_yields_text_and_records_the_exchange():
+    async def run():
+        manager = conversation(StubModels())
+        chunks = [chunk async for chunk in manager.stream("q1")]
+        return chunks, manager.turns
+
+    chunks, turns = asyncio.run(run())
+    assert chunks == ["answer ", "to q1"]
+    assert turns == [("q1", "answer to q1")]
@@ -0,0 +1,201 @@
+import inspect
+import threading
+
+import pytest
+
+from conftest import CONNECTION
+from database import DatabaseManager
+
+
+def test_concurrent_queries_run_on_separate_connections(db):
+    pids = []
+    barrier = threading.Barrier(3)
+
+    def work():
+        barrier.wait()
+        pids.append(db.execute_raw_query("SELECT pg_backend_pid(), pg_sleep(0.2);")[0][0])
+
+    threads = [threading.Thread(target=work) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(pids)) == 3
+    assert db.pool_stats()["in_use"] == 0
+
+
+def test_session_settings_do_not_leak_to_the_next_caller(db):
+    db.execute_raw_query("SET search_path TO pg_catalog;")
+    db.execute_raw_query("SELECT set_config('application_name', 'leaky', false);")
+    assert db.execute_raw_query("SELECT current_setting('search_path'), current_setting('application_name');") \
+        == [('"$user", public', "")]
+    assert db.execute_raw_query("SELECT count(*) FROM base_images;")[0][0] > 0
+
+
+def test_paged_query_returns_every_row_once(db):
+    expected = db.execute_raw_query("SELECT id FROM package_tags ORDER BY id;")
+    page = db.execute_query_page("SELECT id FROM package_tags ORDER BY id;", page_size=7)
+    rows, offsets = list(page["rows"]), [page["offset"]]
+    while page["continuation_token"]:
+        page = db.execute_query_page(continuation_token=page["continuation_token"], page_size=7)
+        rows += page["rows"]
+        offsets.append(page["offset"])
+    assert page["columns"] == ["id"]
+    assert rows == expected
+    assert offsets == list(range(0, len(expected), 7))
+    assert db.pool_stats()["in_use"] == 0
+
+
+def test_single_page_result_has_no_token(db):
+    page = db.execute_query_page("SELECT 1 AS one;", page_size=10)
+    assert page["rows"] == [(1,)] and page["continuation_token"] is None
+
+
+def test_unknown_continuation_token_is_rejected(db):
+    with pytest.raises(ValueError, match="continuation token"):
+        db.execute_query_page(continuation_token="nope")
+    with pytest.raises(ValueError):
+        db.execute_query_page()
+
+
+def test_open_page_does_not_block_other_calls(db):
+    page = db.execute_query_page("SELECT id FROM package_tags;", page_size=10)
+    assert page["continuation_token"]
+    assert db.execute_raw_query("SELECT 42;") == [(42,)]
+    assert db.close_query_page(page["continuation_token"])
+
+
+def test_oldest_open_page_is_evicted_past_the_limit(db):
+    tokens = [db.execute_query_page("SELECT id FROM package_tags;", page_size=10)["continuation_token"]
+              for _ in range(db.max_connections // 2 + 1)]
+    with pytest.raises(ValueError):
+        db.execute_query_page(continuation_token=tokens[0])
+    assert db.execute_query_page(continuation_token=tokens[-1], page_size=10)["offset"] == 10
+
+
+def test_health_check_closes_idle_pages(db):
+    token = db.execute_shaped_query("SELECT id FROM package_tags", max_rows=5)["continuation_token"]
+    assert db.pool_stats()["in_use"] == 1
+    db.check_health()
+    assert db.pool_stats()["in_use"] == 1  # not idle long enough yet
+    db.CURSOR_IDLE_TIMEOUT = 0
+    db.check_health()
+    assert db.pool_stats()["in_use"] == 0
+    with pytest.raises(ValueError):
+        db.execute_query_page(continuation_token=token)
+
+
+def test_default_pool_leaves_room_beside_open_pages():
+    default = inspect.signature(DatabaseManager).parameters["max_connections"].default
+    assert default == 10
+
+
+def test_repeated_query_is_served_from_the_cache(db):
+    query = "SELECT count(*) FROM base_images;"
+    first = db.execute_raw_query(query)
+    hits = db.cache_stats()["hits"]
+    assert db.execute_raw_query("select count(*)  from base_images") == first
+    assert db.cache_stats()["hits"] == hits + 1
+
+
+def test_write_through_the_manager_invalidates_cached_reads(db):
+    query = "SELECT count(*) FROM base_images WHERE name = 'cache-test';"
+    assert db.execute_raw_query(query) == [(0,)]
+    db.execute_raw_query("INSERT INTO base_images (name, version) VALUES ('cache-test', '1');")
+    try:
+        assert db.execute_raw_query(query) == [(1,)]
+    finally:
+        db.execute_raw_query("DELETE FROM base_images WHERE name = 'cache-test';")
+    assert db.execute_raw_query(query) == [(0,)]
+
+
+def test_batch_insert_returns_ids_in_input_order_and_reports_conflicts(db):
+    images = db.create_base_images([("batch-a", "1", None), ("batch-b", "2", "2024-01-01")])
+    try:
+        assert all(images.ids) and images.conflicts == []
+        assert db.execute_raw_query(f"SELECT name FROM base_images WHERE id = {images.ids[1]};") == [("batch-b",)]
+
+        packages = db.create_packages([("pkg-ok", images.ids[0]), ("pkg-orphan", 10 ** 6)])
+        assert packages.ids[0] is not None and packages.ids[1] is None
+        assert packages.conflicts == [(1, f"base_image_id {10 ** 6} does not exist in base_images")]
+
+        cves = db.create_vulnerabilities([("CVE-2099-0001", "new", None), ("CVE-2023-1234", "dup", None),
+                                          ("CVE-2099-0001", "repeat", None)])
+        assert cves.ids[0] is not None and cves.ids[1:] == [None, None]
+        assert [index for index, _ in cves.conflicts] == [1, 2]
+    finally:
+        db.execute_raw_query("DELETE FROM vulnerabilities WHERE cve_id = 'CVE-2099-0001';")
+        db.execute_raw_query("DELETE FROM base_images WHERE name LIKE 'batch-%';")
+
+
+def test_batch_rows_of_the_wrong_width_are_refused(db):
+    with pytest.raises(ValueError, match="name, version, release_date"):
+        db.create_base_images([("only-a-name",)])
+
+
+def test_batch_tag_associations_keep_the_last_duplicate(db):
+    result = db.add_vulnerabilities_to_tags([(1, 2, "LOW"), (1, 2, "CRITICAL"), (10 ** 6, 1, "LOW")])
+    try:
+        assert result.ids == [None, (1, 2), None]
+        assert dict(result.conflicts)[0].startswith("duplicate in batch")
+        assert db.execute_raw_query(
+            "SELECT severity FROM tag_vulnerabilities WHERE package_tag_id = 1 AND vulnerability_id = 2;"
+        ) == [("CRITICAL",)]
+    finally:
+        db.seed_bulk()
+
+
+@pytest.fixture
+def single_connection_db(database):
+    manager = DatabaseManager(database, **CONNECTION, max_connections=1, cache_size=0)
+    yield manager
+    manager.close_connection()
+
+
+def test_crud_reads_run_as_prepared_statements(single_connection_db, db):
+    db.use_prepared_statements = False
+    expected = db.get_vulnerability_by_cve("CVE-2023-1234")
+    assert single_connection_db.get_vulnerability_by_cve("CVE-2023-1234") == expected
+    assert single_connection_db.get_vulnerability_by_cve("CVE-2023-1234") == expected
+    assert single_connection_db.execute_raw_query("SELECT name FROM pg_prepared_statements;") \
+        == [("get_vulnerability_by_cve",)]
+
+
+def test_statements_are_prepared_again_after_deallocate(single_connection_db):
+    first = single_connection_db.get_tags_for_package(1)
+    single_connection_db.execute_raw_query("DEALLOCATE ALL;")
+    assert single_connection_db.get_tags_for_package(1) == first
+
+
+def test_explain_analyze_rolls_back_writes(db):
+    summary = db.explain_query("DELETE FROM commits;", analyze=True, buffers=True)
+    assert summary["analyzed"] and summary["actual_rows"] == 0 and "buffers" in summary
+    assert db.execute_raw_query("SELECT count(*) > 0 FROM commits;") == [(True,)]
+
+
+def test_explain_takes_one_statement(db):
+    with pytest.raises(ValueError):
+        db.explain_query("SELECT 1; SELECT 2;")
+    summary = db.explain_query("SELECT * FROM packages WHERE id = 1")
+    assert not summary["analyzed"] and summary["total_cost"] > 0
+
+
+def test_snapshot_reads_ignore_later_commits(db):
+    snapshot = db.export_snapshot()
+    try:
+        db.execute_raw_query("INSERT INTO base_images (name, version) VALUES ('after-snapshot', '1')")
+        count = "SELECT count(*) FROM base_images"
+        assert db.execute_raw_query(count, snapshot=snapshot.snapshot_id) == [(12,)]
+        assert db.execute_raw_query(count) == [(13,)]
+    finally:
+        snapshot.close()
+        db.execute_raw_query("DELETE FROM base_images WHERE name = 'after-snapshot'")
+
+
+def test_snapshot_reads_are_read_only(db):
+    snapshot = db.export_snapshot()
+    try:
+        assert db.execute_raw_query("DELETE FROM base_images", snapshot=snapshot.snapshot_id) is None
+    finally:
+        snapshot.close()
+    assert db.execute_raw_query("SELECT count(*) FROM base_images") == [(12,)]
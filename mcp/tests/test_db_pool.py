@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+
+from db_pool import ConnectionPool, PoolTimeoutError, ConnectError
+from conftest import CONNECTION
+
+
+def test_connections_are_reused(pool):
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert pool.stats()["created"] == 1
+
+
+def test_checkout_blocks_until_a_connection_is_returned(pool):
+    first, second = pool.getconn(), pool.getconn()
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn(timeout=0.1)
+
+    threading.Timer(0.1, pool.putconn, (first,)).start()
+    assert pool.getconn(timeout=2) is first
+    pool.putconn(second)
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_concurrent_callers_get_separate_connections(pool):
+    seen = []
+    barrier = threading.Barrier(2)
+
+    def work():
+        conn = pool.getconn()
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_backend_pid();")
+            seen.append(cursor.fetchone()[0])
+        barrier.wait()
+        pool.putconn(conn)
+
+    threads = [threading.Thread(target=work) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(seen)) == 2
+
+
+def test_open_transaction_is_rolled_back_on_return(pool):
+    conn = pool.getconn()
+    with conn.cursor() as cursor:
+        cursor.execute("CREATE TEMP TABLE scratch (id int);")
+    pool.putconn(conn)
+    conn = pool.getconn()
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('pg_temp.scratch') IS NULL;")
+        assert cursor.fetchone()[0]
+    pool.putconn(conn)
+
+
+def test_dirty_session_settings_are_reset_on_return(pool):
+    conn = pool.getconn()
+    with conn.cursor() as cursor:
+        cursor.execute("SET search_path TO pg_catalog; SET ROLE pg_monitor;")
+    conn.commit()
+    conn.session_dirty = True
+    pool.putconn(conn)
+
+    again = pool.getconn()
+    assert again is conn and not again.session_dirty
+    with again.cursor() as cursor:
+        cursor.execute("SELECT current_setting('search_path'), current_user = session_user;")
+        assert cursor.fetchone() == ('"$user", public', True)
+    pool.putconn(again)
+
+
+def test_broken_connection_is_replaced(pool):
+    conn = pool.getconn()
+    conn.close()
+    pool.putconn(conn)
+    fresh = pool.getconn()
+    assert fresh is not conn and not fresh.closed
+    pool.putconn(fresh)
+    assert pool.stats()["discarded"] == 1
+
+
+def test_unreachable_server_raises_connect_error(database):
+    kwargs = dict(CONNECTION, dbname=database, port=1, connect_timeout=1)
+    with pytest.raises(ConnectError):
+        ConnectionPool(kwargs, min_size=1)
+
+
+def test_closeall_rejects_checkouts(pool):
+    pool.closeall()
+    with pytest.raises(Exception, match="closed"):
+        pool.getconn()
@@ -0,0 +1,79 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import http_server
+import server
+from admission import AdmissionController
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """
+    A worker app whose lifespan records the background tasks and shutdown instead of closing
+    the databases the other server tests share.
+    """
+    events = []
+    monkeypatch.setattr(server, "admission", AdmissionController(server.admission_policy))
+    monkeypatch.setattr(server, "start_background_tasks", lambda: events.append("started"))
+    monkeypatch.setattr(server, "close", lambda wait=True: events.append(("closed", wait)))
+    app = http_server.create_app()
+    app.state.events = events
+    return app
+
+
+def query(number, sql):
+    return {"jsonrpc": "2.0", "id": number, "method": "tools/call",
+            "params": {"name": "execute_raw_query", "arguments": {"query": sql}}}
+
+
+async def post_all(app, requests):
+    """
+    Sends (client id, JSON-RPC request) pairs concurrently within the app's lifespan.
+    :return: The tool results, in order.
+    """
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(
+                client.post(server.settings.http_path, json=body, headers={
+                    "Accept": "application/json, text/event-stream",
+                    **({server.CLIENT_ID_HEADER: client_id} if client_id else {}),
+                })
+                for client_id, body in requests
+            ))
+    return [response.json()["result"] for response in responses]
+
+
+def test_lifespan_starts_and_drains(database, app):
+    [result] = asyncio.run(post_all(app, [(None, query(1, "SELECT 1"))]))
+    assert result["structuredContent"] == {"result": [[1]]}
+    assert app.state.events == ["started", ("closed", True)]
+    assert server.admission.stats()["draining"]
+
+
+def test_per_client_cap_applies_across_requests(database, app):
+    sleep = "SELECT pg_sleep(0.3)"
+    requests = [("a", query(number, sleep)) for number in range(5)] + [("b", query(5, sleep))]
+    results = asyncio.run(post_all(app, requests))
+    rejected = [json.loads(result["content"][0]["text"])["error"] for result in results if result["isError"]]
+    assert rejected == ["session_concurrency_limit"]
+    assert not results[-1]["isError"]  # another client is not held back
+
+
+def request_context(request):
+    return SimpleNamespace(request_context=SimpleNamespace(request=request), session_id="session-1")
+
+
+def test_admission_key_prefers_the_client_id():
+    headers = {server.CLIENT_ID_HEADER: "agent-7"}
+    address = SimpleNamespace(host="10.0.0.5")
+    assert server.admission_key(request_context(None)) == "session-1"  # stdio
+    assert server.admission_key(request_context(SimpleNamespace(headers=headers, client=address))) == \
+        "client:agent-7"
+    assert server.admission_key(request_context(SimpleNamespace(headers={}, client=address))) == \
+        "address:10.0.0.5"
+    assert server.admission_key(request_context(SimpleNamespace(headers={}, client=None))) == "session-1"
@@ -0,0 +1,80 @@
+import pytest
+
+from conftest import CONNECTION
+from database import DatabaseManager
+from index_advisor import IndexAdvisor, WorkloadRecorder
+from retry import RetryPolicy
+from sql_analysis import fingerprint, predicate_columns
+
+
+def test_fingerprint_replaces_literals_and_in_lists():
+    assert fingerprint("SELECT * FROM t WHERE a = 1 AND b IN ('x', 'y')") == \
+        fingerprint("select * from t where a = 22 and b in ('z');")
+
+
+def test_predicate_columns_resolve_aliases():
+    query = """
+        SELECT * FROM packages p JOIN package_tags pt ON pt.package_id = p.id
+        WHERE p.name = 'openssl' AND pt.created_at > now() - interval '1 day' AND p.id <> 3
+    """
+    assert predicate_columns(query) == {
+        ("package_tags", "package_id", "join"), ("packages", "id", "join"),
+        ("packages", "name", "equality"), ("package_tags", "created_at", "range"),
+    }
+
+
+def test_recorder_groups_queries_by_shape():
+    recorder = WorkloadRecorder(max_shapes=2)
+    recorder.record("SELECT * FROM t WHERE a = 1", 0.002)
+    recorder.record("SELECT * FROM t WHERE a = 2", 0.004)
+    recorder.record("CREATE INDEX ON t (a)", 1.0)
+    recorder.record("SELECT * FROM u", 0.001)
+    assert recorder.shapes() == [("SELECT * FROM t WHERE a = 1", 2, pytest.approx(3.0)),
+                                 ("SELECT * FROM u", 1, pytest.approx(1.0))]
+    recorder.record("SELECT * FROM v", 0.001)
+    assert len(recorder.shapes()) == 2
+
+
+@pytest.fixture
+def advisor(db):
+    db.execute_raw_query("ANALYZE commits;")
+    recorder = WorkloadRecorder()
+    db.workload_recorder = recorder
+    yield IndexAdvisor(db, recorder, min_table_rows=0, max_selectivity=1.0)
+    db.execute_autocommit("DROP INDEX IF EXISTS idx_commits_author;")
+
+
+def test_recommends_and_builds_an_index_for_filtered_columns(advisor, db):
+    for author in ("Alice Smith", "Bob Johnson", "Eve Davis"):
+        db.execute_raw_query(f"SELECT * FROM commits WHERE author = '{author}';")
+    db.execute_raw_query("SELECT * FROM package_tags WHERE package_id = 1;")
+
+    report = advisor.recommend()
+    assert [item["index_name"] for item in report["recommendations"]] == ["idx_commits_author"]
+    recommendation = report["recommendations"][0]
+    assert recommendation["statement"] == \
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_commits_author ON public.commits (author);"
+    assert recommendation["calls"] == 3 and recommendation["predicates"] == ["equality"]
+    assert {"table": "package_tags", "column": "package_id",
+            "reason": "already the leading column of an index"} in report["skipped"]
+
+    assert advisor.apply("idx_commits_author")["index_name"] == "idx_commits_author"
+    assert db.execute_raw_query(
+        "SELECT count(*) FROM pg_indexes WHERE indexname = 'idx_commits_author';"
+    ) == [(1,)]
+    with pytest.raises(KeyError):
+        advisor.apply("idx_commits_author")  # applied recommendations are consumed
+
+
+def test_small_tables_are_skipped_by_default(db):
+    recorder = WorkloadRecorder()
+    recorder.record("SELECT * FROM commits WHERE author = 'x'", 0.001)
+    report = IndexAdvisor(db, recorder).recommend()
+    assert report["recommendations"] == []
+    assert "a sequential scan is cheap" in report["skipped"][0]["reason"]
+
+
+def test_autocommit_without_a_connection_honours_raise_errors(database):
+    manager = DatabaseManager(database, **dict(CONNECTION, port=1), lazy=True, connect_timeout=1,
+                              retry_policy=RetryPolicy(attempts=1))
+    assert manager.execute_autocommit("SELECT 1;", raise_errors=False) is False
@@ -0,0 +1,57 @@
+import time
+
+from query_cache import QueryResultCache
+
+
+def test_hit_and_miss_are_counted():
+    cache = QueryResultCache()
+    assert cache.get("select 1") is None
+    cache.put("select 1", {"t"}, [(1,)], cache.epoch, ["x"])
+    assert cache.get("select 1") == [(1,)]
+    assert cache.get("select 1", with_columns=True) == ([(1,)], ["x"])
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QueryResultCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.put(key, {key}, [key], cache.epoch)
+    cache.get("a")
+    cache.put("c", {"c"}, ["c"], cache.epoch)
+    assert cache.get("b") is None
+    assert cache.get("a") == ["a"] and cache.get("c") == ["c"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = QueryResultCache(ttl=0.05)
+    cache.put("a", {"t"}, [1], cache.epoch)
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_write_invalidates_only_entries_reading_the_table():
+    cache = QueryResultCache()
+    cache.put("a", {"packages", "base_images"}, [1], cache.epoch)
+    cache.put("b", {"commits"}, [2], cache.epoch)
+    cache.invalidate_tables({"base_images"})
+    assert cache.get("a") is None
+    assert cache.get("b") == [2]
+    cache.invalidate_tables(None)
+    assert cache.get("b") is None
+
+
+def test_result_read_before_an_invalidation_is_not_stored():
+    cache = QueryResultCache()
+    epoch = cache.epoch
+    cache.invalidate_tables({"packages"})  # a write finished while the query ran
+    cache.put("a", {"packages"}, [1], epoch)
+    assert cache.get("a") is None
+
+
+def test_large_results_are_not_cached():
+    cache = QueryResultCache(max_rows=2)
+    cache.put("a", {"t"}, [1, 2, 3], cache.epoch)
+    assert cache.get("a") is None
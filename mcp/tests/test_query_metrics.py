@@ -0,0 +1,153 @@
+import asyncio
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+from fastmcp import Client
+
+from database import DatabaseManager
+from query_metrics import QueryMetrics, _Series, instrumented, result_size, start_metrics_server
+from retry import RetryPolicy
+
+
+class Recorder:
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    @instrumented
+    def rows(self, count):
+        return [(i, f"name-{i}") for i in range(count)]
+
+    @instrumented
+    def fails(self):
+        raise RuntimeError("boom")
+
+    @instrumented
+    def swallows(self):
+        self.metrics.note_error()
+        return []
+
+    @instrumented
+    def nested(self):
+        self.swallows()
+        return self.rows(1)
+
+
+def test_quantile_interpolates_inside_the_bucket():
+    series = _Series()
+    assert series.quantile(0.5) == 0.0
+    metrics = QueryMetrics()
+    for _ in range(4):
+        metrics.observe("m", 0.002)  # bucket (0.001, 0.0025]
+    series = metrics._series["m"]
+    assert series.quantile(0.5) == pytest.approx(0.00175)
+    assert series.quantile(1.0) == pytest.approx(0.002)  # capped at the observed max
+
+
+def test_result_size_of_manager_return_values():
+    assert result_size(None) == (0, 0)
+    assert result_size(True) == (0, 0)
+    assert result_size([]) == (0, 0)
+    rows = [(1, "a")] * 20
+    assert result_size(rows) == (20, 20 * len(str((1, "a"))))
+    assert result_size({"columns": ["id"], "rows": [(1,), (2,)]})[0] == 2
+    assert result_size({"error": "x"}) == (1, len(str({"error": "x"})))
+    assert result_size(42) == (1, 2)
+
+
+def test_snapshot_summarizes_calls_and_pool_waits():
+    metrics = QueryMetrics()
+    metrics.observe("get", 0.010, rows=3, nbytes=30)
+    metrics.observe("get", 0.030, rows=1, nbytes=10, error=True)
+    metrics.observe_pool_wait(0.001)
+    snapshot = metrics.snapshot()
+    get = snapshot["methods"]["get"]
+    assert (get["count"], get["errors"], get["rows"], get["bytes"]) == (2, 1, 4, 40)
+    assert get["mean_ms"] == 20.0 and get["max_ms"] == 30.0
+    assert snapshot["pool_wait"]["count"] == 1 and "rows" not in snapshot["pool_wait"]
+
+
+def test_render_prometheus_has_cumulative_buckets_and_gauges():
+    metrics = QueryMetrics()
+    metrics.observe("get", 0.002, rows=2)
+    metrics.observe("get", 0.2)
+    text = metrics.render_prometheus(pool_stats={"idle": 1, "in_use": 2, "timeouts": 0},
+                                     extra_gauges={"database_up": 1},
+                                     extra_counters={"query_cache_hits_total": ("Cache hits.", 7)})
+    assert 'query_mcp_call_duration_seconds_bucket{method="get",le="0.0025"} 1' in text
+    assert 'query_mcp_call_duration_seconds_bucket{method="get",le="+Inf"} 2' in text
+    assert 'query_mcp_call_duration_seconds_count{method="get"} 2' in text
+    assert 'query_mcp_rows_returned_total{method="get"} 2' in text
+    assert 'query_mcp_pool_connections{state="in_use"} 2' in text
+    assert "query_mcp_database_up 1" in text
+    assert "# HELP query_mcp_pool_timeouts_total " in text
+    assert "# HELP query_mcp_query_cache_hits_total Cache hits.\n" \
+           "# TYPE query_mcp_query_cache_hits_total counter\nquery_mcp_query_cache_hits_total 7\n" in text
+    assert text.endswith("\n")
+
+
+def test_instrumented_records_rows_errors_and_caught_errors():
+    metrics = QueryMetrics()
+    recorder = Recorder(metrics)
+    assert len(recorder.rows(3)) == 3
+    with pytest.raises(RuntimeError):
+        recorder.fails()
+    recorder.nested()
+    methods = metrics.snapshot()["methods"]
+    assert methods["rows"]["count"] == 2 and methods["rows"]["rows"] == 4 and methods["rows"]["errors"] == 0
+    assert methods["fails"]["errors"] == 1
+    assert methods["swallows"]["errors"] == 1
+    assert methods["nested"]["errors"] == 1  # an inner caught error fails the outer call too
+
+
+def test_instrumented_is_a_passthrough_without_metrics():
+    assert Recorder(None).rows(2) == [(0, "name-0"), (1, "name-1")]
+
+
+def test_database_manager_records_calls(db):
+    db.get_base_images()
+    db.execute_raw_query("SELECT * FROM no_such_table")
+    methods = db.metrics.snapshot()["methods"]
+    assert methods["get_base_images"]["rows"] == 12
+    assert methods["execute_raw_query"]["errors"] == 1
+    assert db.metrics.snapshot()["pool_wait"]["count"] >= 2
+
+
+def test_failed_connection_checkouts_count_as_errors():
+    manager = DatabaseManager("nowhere", "postgres", "postgres", host="127.0.0.1", port=1, lazy=True,
+                              connect_timeout=1, retry_policy=RetryPolicy(attempts=1))
+    assert manager.execute_raw_query("SELECT 1") is None
+    assert manager.metrics.snapshot()["methods"]["execute_raw_query"]["errors"] == 1
+
+
+def test_metrics_http_server_serves_only_the_metrics_path():
+    httpd = start_metrics_server(0, lambda: "query_mcp_up 1\n")
+    try:
+        base = f"http://127.0.0.1:{httpd.server_address[1]}"
+        with urllib.request.urlopen(f"{base}/metrics") as response:
+            assert response.read() == b"query_mcp_up 1\n"
+            assert response.headers["Content-Type"].startswith("text/plain")
+        with pytest.raises(urllib.error.HTTPError) as missing:
+            urllib.request.urlopen(f"{base}/other")
+        assert missing.value.code == 404
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_query_metrics_resource(database):
+    import server
+
+    async def run():
+        async with Client(server.mcp) as client:
+            await client.call_tool("execute_raw_query", {"query": "SELECT 1"})
+            contents = await client.read_resource("metrics://queries")
+            return json.loads(contents[0].text)
+
+    report = asyncio.run(run())
+    assert report["methods"]["execute_raw_query"]["count"] >= 1
+    assert {"pool", "database", "replicas", "targets"} <= report.keys()
+    text = server.render_prometheus_metrics()
+    assert "query_mcp_call_duration_seconds" in text
+    assert "# TYPE query_mcp_query_cache_misses_total counter" in text
@@ -0,0 +1,50 @@
+from query_plan import plan_relations, summarize_plan
+
+PLAN = [{
+    "Plan": {
+        "Node Type": "Hash Join", "Total Cost": 500.0, "Plan Rows": 10,
+        "Actual Rows": 2000, "Actual Loops": 1, "Actual Total Time": 12.5,
+        "Plans": [
+            {"Node Type": "Seq Scan", "Relation Name": "packages", "Total Cost": 420.0, "Plan Rows": 30000,
+             "Filter": "(name ~~ 'openssl%'::text)", "Actual Rows": 30000, "Actual Loops": 1,
+             "Actual Total Time": 9.0},
+            {"Node Type": "Index Scan", "Index Name": "base_images_pkey", "Relation Name": "base_images",
+             "Total Cost": 30.0, "Plan Rows": 1, "Actual Rows": 1, "Actual Loops": 2000,
+             "Actual Total Time": 0.001},
+        ],
+    },
+    "Planning Time": 0.2,
+    "Execution Time": 13.0,
+}]
+
+
+def test_plan_relations():
+    assert plan_relations(PLAN) == {"packages", "base_images"}
+
+
+def test_summary_flags_large_seq_scans_and_misestimates():
+    summary = summarize_plan(PLAN, {"packages": 30000.0, "base_images": 12.0})
+    assert summary["analyzed"] and summary["execution_ms"] == 13.0
+    assert summary["indexes_used"] == ["base_images_pkey"]
+    assert summary["seq_scans"] == [{"table": "packages", "table_rows": 30000.0, "estimated_rows": 30000,
+                                     "filter": "(name ~~ 'openssl%'::text)"}]
+    assert [item["node"] for item in summary["misestimates"]] == [
+        "Hash Join", "Index Scan using base_images_pkey on base_images",
+    ]
+    assert summary["top_nodes"][0] == {
+        "node": "Seq Scan on packages", "depth": 1, "self_cost": 420.0, "total_cost": 420.0,
+        "estimated_rows": 30000, "actual_rows": 30000, "actual_ms": 9.0,
+    }
+    assert any("consider an index" in warning for warning in summary["warnings"])
+
+
+def test_small_tables_and_plain_explain_are_not_flagged():
+    plain = [{"Plan": {"Node Type": "Seq Scan", "Relation Name": "base_images", "Total Cost": 1.1,
+                       "Plan Rows": 12}}]
+    summary = summarize_plan(plain, {"base_images": 12.0})
+    assert summary == {
+        "analyzed": False, "total_cost": 1.1, "estimated_rows": 12, "seq_scans": [], "indexes_used": [],
+        "top_nodes": [{"node": "Seq Scan on base_images", "depth": 0, "self_cost": 1.1, "total_cost": 1.1,
+                       "estimated_rows": 12}],
+        "warnings": [],
+    }
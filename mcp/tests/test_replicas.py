@@ -0,0 +1,104 @@
+import psycopg2
+import pytest
+
+from conftest import CONNECTION
+from database import DatabaseManager
+from replicas import replica_connect_kwargs
+from sql_analysis import is_replica_safe
+
+# Without a standby to hand, the routing tests use a second pool on the primary (reached
+# through 127.0.0.1) as the "replica" and tell the two apart by their checkout counts.
+REPLICA_PORT = 5433
+
+
+def test_replica_settings_default_to_the_primary():
+    primary = dict(dbname="cves", user="app", password="secret", host="db", port=5432, connect_timeout=10)
+    assert replica_connect_kwargs("host=standby port=5433", primary) == dict(primary, host="standby", port="5433")
+    assert replica_connect_kwargs("postgresql://reader@standby/other", primary)["dbname"] == "other"
+    assert replica_connect_kwargs({"host": "standby", "db_name": "x"}, primary)["dbname"] == "x"
+
+
+def test_only_reads_that_need_no_primary_are_replica_safe():
+    assert is_replica_safe("SELECT * FROM packages")
+    assert not is_replica_safe("SELECT nextval('packages_id_seq')")
+    assert not is_replica_safe("SELECT set_config('work_mem', '64MB', false)")
+    assert not is_replica_safe("UPDATE packages SET name = name")
+
+
+def replicated(database, **kwargs):
+    replica = dict(host="127.0.0.1", port=CONNECTION["port"])
+    return DatabaseManager(database, **CONNECTION, cache_size=0, replicas=[replica], **kwargs)
+
+
+def replica_checkouts(db):
+    return db.replica_stats()[0]["checkouts"]
+
+
+def test_reads_go_to_the_replica_and_writes_to_the_primary(database):
+    db = replicated(database)
+    try:
+        assert db.execute_raw_query("SELECT count(*) FROM packages") == [(15,)]
+        assert replica_checkouts(db) == 1
+        db.execute_raw_query("SELECT nextval('packages_id_seq')")
+        db.get_base_images()  # CRUD methods stay on the primary
+        assert replica_checkouts(db) == 1
+    finally:
+        db.close_connection()
+
+
+def test_reads_right_after_a_write_stay_on_the_primary(database):
+    db = replicated(database)
+    try:
+        db.execute_raw_query("UPDATE packages SET name = name WHERE id = 1")
+        db.execute_raw_query("SELECT count(*) FROM packages")
+        assert replica_checkouts(db) == 0
+        db._last_write -= db.READ_AFTER_WRITE_WINDOW
+        db.execute_raw_query("SELECT count(*) FROM packages")
+        assert replica_checkouts(db) == 1
+    finally:
+        db.close_connection()
+
+
+def test_lagging_or_unreachable_replicas_fall_back_to_the_primary(database):
+    db = replicated(database, max_replica_lag=-1)  # even no lag is too much
+    try:
+        assert db.execute_raw_query("SELECT count(*) FROM packages") == [(15,)]
+        assert replica_checkouts(db) == 1  # the lag measurement only
+        assert db.replica_stats()[0]["lag_s"] == 0.0
+    finally:
+        db.close_connection()
+
+    db = DatabaseManager(database, **CONNECTION, cache_size=0, replicas=["host=127.0.0.1 port=1 connect_timeout=1"])
+    try:
+        assert db.execute_raw_query("SELECT count(*) FROM packages") == [(15,)]
+        stats = db.replica_stats()[0]
+        assert not stats["up"] and stats["last_error"]
+    finally:
+        db.close_connection()
+
+
+def test_busy_replica_falls_back_without_being_marked_down(database):
+    db = replicated(database, max_connections=1, pool_timeout=0.2)
+    try:
+        [replica] = db.replicas.replicas
+        held = replica.get_pool().getconn()
+        try:
+            assert db.execute_raw_query("SELECT count(*) FROM packages") == [(15,)]
+        finally:
+            replica.get_pool().putconn(held)
+        assert db.replica_stats()[0]["up"] and replica.down_until == 0.0
+    finally:
+        db.close_connection()
+
+
+def test_reads_reach_a_real_standby(database):
+    standby = dict(CONNECTION, port=REPLICA_PORT)
+    try:
+        psycopg2.connect(dbname="postgres", connect_timeout=1, **standby).close()
+    except psycopg2.OperationalError:
+        pytest.skip(f"no standby on port {REPLICA_PORT}")
+    db = DatabaseManager(database, **CONNECTION, cache_size=0, replicas=[{"port": REPLICA_PORT}])
+    try:
+        assert db.execute_raw_query("SELECT pg_is_in_recovery()") == [(True,)]
+    finally:
+        db.close_connection()
@@ -0,0 +1,61 @@
+import datetime
+import decimal
+import uuid
+
+import pytest
+
+from result_format import columnar, compact_value, format_result, json_size, to_csv
+
+UTC = datetime.timezone.utc
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None),
+    ("text", "text"),
+    (datetime.datetime(2024, 5, 1, 12, 30, tzinfo=UTC), "2024-05-01T12:30:00Z"),
+    (datetime.datetime(2024, 5, 1, 12, 30, 0, 250000), "2024-05-01T12:30:00.250000"),
+    (datetime.date(2024, 5, 1), "2024-05-01"),
+    (decimal.Decimal("7.00"), 7),
+    (decimal.Decimal("7.5"), 7.5),
+    (datetime.timedelta(minutes=2), 120.0),
+    (b"\x01\xff", "01ff"),
+    (uuid.UUID(int=1), "00000000-0000-0000-0000-000000000001"),
+    ((decimal.Decimal("1"), None), [1, None]),
+])
+def test_compact_value(value, expected):
+    assert compact_value(value) == expected
+
+
+def test_repetitive_columns_are_dictionary_encoded():
+    severities = ["HIGH", "LOW", "HIGH", "CRITICAL"] * 4
+    rows = [(index, severity) for index, severity in enumerate(severities)]
+    ids, encoded = columnar(["id", "severity"], rows)
+    assert ids == list(range(16))  # all distinct: left as is
+    assert encoded["dictionary"] == ["HIGH", "LOW", "CRITICAL"]
+    assert [encoded["dictionary"][code] for code in encoded["codes"]] == severities
+    assert columnar(["id", "severity"], rows, dictionary=False)[1] == severities
+
+
+def test_short_columns_are_not_dictionary_encoded():
+    rows = [("HIGH",)] * 3
+    assert columnar(["severity"], rows) == [["HIGH", "HIGH", "HIGH"]]
+
+
+def test_csv_has_a_header_and_empty_nulls():
+    text = to_csv(["id", "name", "created"], [(1, "a,b", None), (2, "c", datetime.date(2024, 1, 2))])
+    assert text == 'id,name,created\n1,"a,b",\n2,c,2024-01-02\n'
+
+
+def test_format_result_reports_sizes():
+    rows = [(index, "same value") for index in range(50)]
+    result = format_result(["id", "value"], rows, "columnar")
+    assert result["format"] == "columnar" and result["row_count"] == 50
+    assert result["size"]["bytes"] == json_size({key: value for key, value in result.items() if key != "size"})
+    assert result["size"]["bytes"] < result["size"]["row_json_bytes"]
+    assert "columns" not in format_result(["id"], [(1,)], "csv")
+    assert format_result(["id"], [(1,)], "rows")["rows"] == [[1]]
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        format_result(["id"], [], "xml")
@@ -0,0 +1,94 @@
+import pytest
+
+import database as database_module
+import result_shaping
+from result_shaping import ResultBudget, ResultShaper
+
+
+def test_budget_rejects_negative_limits():
+    with pytest.raises(ValueError):
+        ResultBudget(max_rows=-1)
+
+
+def test_budget_uses_the_tighter_byte_limit():
+    budget = ResultBudget(max_bytes=100, max_tokens=10)  # 10 tokens are 40 bytes
+    assert budget.enabled
+    assert budget.allows(1000, 40) and not budget.allows(1, 41)
+    assert budget.to_dict() == {"max_bytes": 100, "max_tokens": 10}
+    assert not ResultBudget().enabled
+
+
+def test_result_within_budget_is_returned_whole():
+    shaper = ResultShaper(["id"], ResultBudget(max_rows=5))
+    shaper.add([(1,), (2,)])
+    result = shaper.result()
+    assert result["rows"] == [[1], [2]] and not result["truncated"]
+    assert "column_summary" not in result and shaper.stats is None
+    assert result["size"] == {"bytes": len("[[1],[2]]"), "estimated_tokens": 3}
+
+
+def test_truncated_result_summarizes_every_row():
+    rows = [(index, "HIGH" if index % 2 else "LOW", None) for index in range(10)]
+    shaper = ResultShaper(["id", "severity", "note"], ResultBudget(max_rows=3))
+    shaper.add(rows)
+    result = shaper.result("token")
+    assert result["rows"] == [[0, "LOW", None], [1, "HIGH", None], [2, "LOW", None]]
+    assert (result["row_count"], result["returned_rows"], result["truncated"]) == (10, 3, True)
+    assert result["continuation_token"] == "token" and result["budget"] == {"max_rows": 3}
+    ids, severity, note = result["column_summary"]
+    assert (ids["min"], ids["max"], ids["distinct"]) == (0, 9, 10)
+    assert sorted(severity["top_values"]) == [["HIGH", 5], ["LOW", 5]]
+    assert (note["non_null"], note["nulls"]) == (0, 10)
+    assert "summary_rows" not in result
+
+
+def test_summary_is_complete_at_exactly_the_read_limit(monkeypatch):
+    monkeypatch.setattr(result_shaping, "SUMMARY_MAX_ROWS", 4)
+    shaper = ResultShaper(["id"], ResultBudget(max_rows=1))
+    shaper.add([(index,) for index in range(4)])
+    assert shaper.summary_complete()
+    assert not shaper.summary_complete(total_rows=5)
+    shaper.add([(4,)])
+    assert shaper.row_count == 5 and shaper.summarized_rows == 4
+    assert shaper.result()["summary_rows"] == 4
+
+
+def test_stop_truncates_a_result_that_fits():
+    shaper = ResultShaper(["id"], ResultBudget(max_rows=10))
+    shaper.add([(1,), (2,)])
+    shaper.stop()
+    result = shaper.result("token", total_rows=50)
+    assert result["truncated"] and result["row_count"] == 50 and result["summary_rows"] == 2
+
+
+def test_shaped_query_continues_after_the_head(db):
+    result = db.execute_shaped_query("SELECT id FROM package_tags ORDER BY id", max_rows=5)
+    assert result["truncated"] and result["row_count"] == 20 and result["returned_rows"] == 5
+    page = db.execute_query_page(continuation_token=result["continuation_token"], page_size=100)
+    assert [row[0] for row in page["rows"]] == [row[0] for row in db.execute_raw_query(
+        "SELECT id FROM package_tags ORDER BY id OFFSET 5")]
+    assert page["offset"] == 5 and page["continuation_token"] is None
+
+
+def test_shaped_query_that_fits_closes_its_cursor(db):
+    result = db.execute_shaped_query("SELECT id FROM base_images", max_rows=100)
+    assert not result["truncated"] and result["row_count"] == 12
+    assert "continuation_token" not in result and not db._open_cursors
+
+
+def test_shaped_query_counts_rows_beyond_the_read_limit(db, monkeypatch):
+    monkeypatch.setattr(database_module, "SUMMARY_MAX_ROWS", 5)
+    monkeypatch.setattr(result_shaping, "SUMMARY_MAX_ROWS", 5)
+    db.SHAPE_FETCH_SIZE = 2
+    result = db.execute_shaped_query("SELECT n FROM generate_series(1, 20) AS n", max_rows=100)
+    assert result["truncated"] and result["row_count"] == 20
+    assert result["returned_rows"] == result["summary_rows"] == 6
+    page = db.execute_query_page(continuation_token=result["continuation_token"], page_size=100)
+    assert [row[0] for row in page["rows"]] == list(range(7, 21))
+
+
+def test_shaped_non_select_gets_no_continuation_token(db):
+    result = db.execute_shaped_query(
+        "EXPLAIN SELECT * FROM packages JOIN base_images ON base_images.id = packages.base_image_id", max_rows=1
+    )
+    assert result["truncated"] and result["continuation_token"] is None
@@ -0,0 +1,95 @@
+import psycopg2
+import pytest
+from psycopg2 import InterfaceError, OperationalError
+from psycopg2.extensions import QueryCanceledError
+
+from conftest import CONNECTION, connect_kwargs
+from database import DatabaseManager
+from db_pool import ConnectError, PoolTimeoutError
+from retry import RetryPolicy, is_connect_error, is_disconnect
+
+
+def test_delay_is_jittered_below_the_capped_backoff():
+    policy = RetryPolicy(base_delay=0.1, max_delay=0.5)
+    for retry in range(6):
+        assert 0 <= policy.delay(retry) <= min(0.5, 0.1 * 2 ** retry)
+
+
+def test_call_retries_only_retryable_errors():
+    policy = RetryPolicy(attempts=3, base_delay=0)
+    calls, retried = [], []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectError("refused")
+        return "ok"
+
+    assert policy.call(flaky, is_connect_error, on_retry=retried.append) == "ok"
+    assert len(calls) == 3 and len(retried) == 2
+
+    def broken():
+        raise ValueError("not retried")
+
+    with pytest.raises(ValueError):
+        policy.call(broken, is_connect_error)
+
+
+def test_call_gives_up_after_its_attempts():
+    calls = []
+
+    def refused():
+        calls.append(1)
+        raise ConnectError("refused")
+
+    with pytest.raises(ConnectError):
+        RetryPolicy(attempts=2, base_delay=0).call(refused, is_connect_error)
+    assert len(calls) == 2
+    assert RetryPolicy(attempts=0).attempts == 1
+
+
+def test_disconnects_are_told_apart_from_failing_statements():
+    assert is_disconnect(InterfaceError("connection already closed"))
+    assert is_disconnect(OperationalError("server closed the connection unexpectedly"))
+    assert is_disconnect(ConnectError("refused"))
+    assert not is_disconnect(QueryCanceledError("canceling statement due to statement timeout"))
+    assert not is_disconnect(PoolTimeoutError("no free connection"))
+    assert not is_disconnect(ValueError("nope"))
+
+
+def terminate(pid):
+    admin = psycopg2.connect(**connect_kwargs())
+    admin.autocommit = True
+    with admin.cursor() as cursor:
+        cursor.execute("SELECT pg_terminate_backend(%s);", (pid,))
+    admin.close()
+
+
+def test_read_is_rerun_after_its_connection_was_killed(db):
+    db.retry_policy = RetryPolicy(attempts=3, base_delay=0)
+    [(pid,)] = db.execute_raw_query("SELECT pg_backend_pid()")
+    terminate(pid)
+    [(new_pid,)] = db.execute_raw_query("SELECT pg_backend_pid() AS again")
+    assert new_pid != pid
+
+
+def test_write_is_not_rerun_after_its_connection_was_killed(database):
+    db = DatabaseManager(database, **CONNECTION, max_connections=1, cache_size=0,
+                         retry_policy=RetryPolicy(attempts=3, base_delay=0))
+    try:
+        [(pid,)] = db.execute_raw_query("SELECT pg_backend_pid()")
+        terminate(pid)
+        assert db.execute_raw_query("INSERT INTO base_images (name, version) VALUES ('retried', '1')") is None
+        assert db.execute_raw_query("SELECT count(*) FROM base_images WHERE name = 'retried'") == [(0,)]
+    finally:
+        db.execute_raw_query("DELETE FROM base_images WHERE name = 'retried'")
+        db.close_connection()
+
+
+def test_health_check_replaces_dead_idle_connections(db):
+    [(pid,)] = db.execute_raw_query("SELECT pg_backend_pid()")
+    terminate(pid)
+    assert db.check_health()
+    health = db.health()
+    assert health["up"] is True and health["consecutive_failures"] == 0
+    assert db.pool.stats()["idle"] >= 1
@@ -0,0 +1,80 @@
+import pytest
+
+from conftest import CONNECTION
+from database import DatabaseManager
+from rollups import exposure_state
+
+# Exposure per base image computed straight from the source tables.
+EXPECTED_SQL = """
+SELECT p.base_image_id, upper(tv.severity), count(DISTINCT tv.vulnerability_id)
+FROM tag_vulnerabilities tv
+JOIN package_tags pt ON pt.id = tv.package_tag_id
+JOIN packages p ON p.id = pt.package_id
+GROUP BY 1, 2;
+"""
+
+
+def exposure_by_image(db):
+    return {
+        (entity["id"], severity): count
+        for entity in db.get_vulnerability_exposure("base_image", None, limit=1000)
+        for severity, count in entity["vulnerabilities"].items()
+    }
+
+
+def expected_by_image(db):
+    return {(image, severity): count for image, severity, count in db.execute_raw_query(EXPECTED_SQL)}
+
+
+@pytest.fixture
+def rollup_db(db):
+    yield db
+    db.seed_bulk()
+
+
+def test_seeded_rollups_match_the_source_tables(db):
+    assert exposure_by_image(db) == expected_by_image(db)
+
+
+def test_tag_writes_refresh_the_rollups_incrementally(rollup_db):
+    db = rollup_db
+    vulnerability = db.create_vulnerability("CVE-2099-1000", "rollup test")
+    db.add_vulnerability_to_tag(1, vulnerability, "critical")
+    db.add_vulnerabilities_to_tags([(2, vulnerability, "HIGH"), (3, vulnerability, "LOW")])
+    with db._cursor() as cursor:
+        assert exposure_state(cursor) == "current"  # no rebuild needed
+    assert exposure_by_image(db) == expected_by_image(db)
+
+
+def test_raw_writes_flag_the_rollups_for_every_process(rollup_db, database):
+    db = rollup_db
+    other = DatabaseManager(database, **CONNECTION)
+    try:
+        other.get_vulnerability_exposure()
+        db.execute_raw_query("DELETE FROM tag_vulnerabilities WHERE package_tag_id <= 5;")
+        with other._cursor() as cursor:
+            assert exposure_state(cursor) == "stale"
+        assert exposure_by_image(other) == expected_by_image(other)
+        with other._cursor() as cursor:
+            assert exposure_state(cursor) == "current"
+    finally:
+        other.close_connection()
+
+
+def test_session_and_maintenance_commands_keep_the_rollups(db):
+    db.get_vulnerability_exposure()
+    version = db.schema_version
+    for command in ("SET work_mem = '8MB'", "ANALYZE packages", "VACUUM package_tags",
+                    "CREATE TEMP TABLE scratch (id int); INSERT INTO scratch VALUES (1)"):
+        db.execute_raw_query(command)
+    with db._cursor() as cursor:
+        assert exposure_state(cursor) == "current"
+    assert db.schema_version == version + 1  # only the CREATE TABLE changed the schema
+
+
+def test_ranking_and_scope_validation(db):
+    ranked = db.get_vulnerability_exposure("package", ["CRITICAL"], limit=3)
+    counts = [entity["vulnerabilities"].get("CRITICAL", 0) for entity in ranked]
+    assert counts == sorted(counts, reverse=True) and all(entity["name"] for entity in ranked)
+    with pytest.raises(ValueError):
+        db.get_vulnerability_exposure("region")
@@ -0,0 +1,72 @@
+import psycopg2
+import pytest
+
+from conftest import connect_kwargs
+from schema_introspection import SchemaIntrospector, _distinct_estimate, _parse_array_text
+
+
+def test_parse_array_text():
+    assert _parse_array_text('{a,"b c","d\\"e"}') == ["a", "b c", 'd"e']
+    assert _parse_array_text(None) == []
+
+
+def test_distinct_estimate_reads_negative_values_as_fractions():
+    assert _distinct_estimate(-0.5, 1000) == 500
+    assert _distinct_estimate(7, 1000) == 7
+    assert _distinct_estimate(None, 1000) is None
+
+
+def test_description_comes_from_the_live_catalog(db):
+    text = db.describe_schema()
+    assert "- base_images (~12 rows)" in text
+    assert "  base_image_id int fk->base_images.id not null" in text
+    assert "  cve_id varchar(50) unique not null" in text
+    assert "values: " in text.split("- tag_vulnerabilities")[1]  # severity has four values
+    assert "idx_commits_package_tag_id" in text
+
+
+def run_ddl(statement):
+    conn = psycopg2.connect(**connect_kwargs())
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute(statement)
+    conn.close()
+
+
+@pytest.fixture
+def scratch_table():
+    yield "introspection_scratch"
+    run_ddl("DROP TABLE IF EXISTS introspection_scratch;")
+
+
+def test_description_is_cached_until_the_manager_changes_the_schema(db, scratch_table):
+    introspector = SchemaIntrospector(db, check_interval=None)
+    first = introspector.describe()
+    assert introspector.cached() is first
+    db.execute_raw_query(f"CREATE TABLE {scratch_table} (id int);")
+    assert introspector.cached() is None
+    assert f"- {scratch_table}" in introspector.describe()
+
+
+def test_ddl_made_elsewhere_is_noticed(db, scratch_table):
+    introspector = SchemaIntrospector(db, check_interval=0)
+    assert scratch_table not in introspector.describe()
+    run_ddl(f"CREATE TABLE {scratch_table} (id int);")
+    assert f"- {scratch_table}" in introspector.describe()
+    run_ddl(f"ALTER TABLE {scratch_table} RENAME COLUMN id TO renamed;")
+    assert "  renamed int" in introspector.describe()
+
+
+def test_unchanged_catalog_is_not_rebuilt(db, monkeypatch):
+    introspector = SchemaIntrospector(db, check_interval=0)
+    introspector.describe()
+    monkeypatch.setattr(db, "describe_schema", lambda schema: pytest.fail("rebuilt"))
+    introspector.describe()
+
+
+def test_descriptions_expire_by_default(db):
+    introspector = SchemaIntrospector(db)
+    assert introspector.max_age is not None
+    introspector.describe()
+    introspector._built_at -= introspector.max_age + 1
+    assert introspector.cached() is None
@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+import pytest
+from fastmcp import Client
+
+import server
+from admission import AdmissionController
+
+
+@pytest.fixture(autouse=True)
+def fresh_admission(monkeypatch):
+    # Its semaphore belongs to the event loop of the test that first waited on it.
+    monkeypatch.setattr(server, "admission", AdmissionController(server.admission_policy))
+
+
+def call(tool, arguments, logs=None):
+    """
+    Calls a tool of the server through an in-memory MCP client.
+    :param logs: Optional list receiving (level, message) of the server's log notifications.
+    """
+    async def on_log(message):
+        if logs is not None:
+            data = message.data
+            logs.append((message.level, data.get("msg") if isinstance(data, dict) else data))
+
+    async def run():
+        async with Client(server.mcp, log_handler=on_log) as client:
+            return await client.call_tool(tool, arguments, raise_on_error=False)
+
+    return asyncio.run(run())
+
+
+def error_of(result):
+    assert result.is_error
+    return json.loads(result.content[0].text)
+
+
+def test_raw_query_returns_rows(database):
+    result = call("execute_raw_query", {"query": "SELECT count(*) FROM base_images"})
+    assert not result.is_error and result.structured_content["result"] == [[12]]
+
+
+def test_statement_timeout_is_reported_as_a_json_error(database):
+    error = error_of(call("execute_raw_query", {"query": "SELECT pg_sleep(5)"}))
+    assert error["error"] == "statement_timeout"
+    assert error["statement_timeout_ms"] == 1000
+
+
+def test_database_errors_are_reported_as_json(database):
+    error = error_of(call("execute_raw_query", {"query": "SELECT * FROM no_such_table"}))
+    assert error["error"] == "database_error" and "no_such_table" in error["message"]
+
+
+def test_invalid_arguments_are_logged_as_errors(database):
+    logs = []
+    error = error_of(call("execute_raw_query", {"query": "SELECT 1", "max_rows": -1}, logs))
+    assert error["error"] == "invalid_argument"
+    assert logs[-1] == ("error", "Error executing raw query: max_rows must not be negative")
+
+
+def test_output_format_encodes_the_result(database):
+    result = call("execute_raw_query", {
+        "query": "SELECT id, name FROM base_images ORDER BY id", "output_format": "columnar",
+    })
+    content = result.structured_content["result"]
+    assert content["format"] == "columnar" and content["columns"] == ["id", "name"]
+    assert content["row_count"] == 12 and len(content["data"]) == 2
+
+
+def test_unknown_output_format_is_an_invalid_argument(database):
+    error = error_of(call("execute_raw_query", {"query": "SELECT 1", "output_format": "xml"}))
+    assert error["error"] == "invalid_argument"
+
+
+def test_list_targets_shows_the_default_target(database):
+    [target] = call("list_targets", {}).structured_content["result"]
+    assert target["name"] == "default" and target["default"] and target["database"] == "query_mcp_test"
+
+
+def test_unknown_target_is_reported_with_the_known_ones(database):
+    error = error_of(call("execute_raw_query", {"query": "SELECT 1", "target": "mars"}))
+    assert error["error"] == "unknown_target" and error["targets"] == ["default"]
+
+
+def test_batch_runs_queries_concurrently_and_reports_failures_inline(database):
+    queries = ["SELECT pg_sleep(0.3), 1", "SELECT pg_sleep(0.3), 2", "SELECT * FROM no_such_table"]
+    logs = []
+    result = call("execute_batch", {"queries": queries}, logs).structured_content
+    first, second, failed = result["results"]
+    assert [entry["index"] for entry in result["results"]] == [0, 1, 2]
+    assert first["rows"][0][1] == 1 and second["rows"][0][1] == 2 and first["row_count"] == 1
+    assert failed["error"] == "database_error" and "no_such_table" in failed["message"]
+    assert result["snapshot"] is None and result["elapsed_ms"] < 550  # not 600 ms one after another
+    assert logs[-1] == ("error", "Error executing batch: 1 of 3 queries failed")
+
+
+def test_consistent_batch_shares_one_snapshot(database):
+    queries = ["SELECT count(*) FROM packages", "SELECT count(*) FROM package_tags",
+               "SELECT current_setting('transaction_isolation')"]
+    result = call("execute_batch", {"queries": queries, "consistent": True}).structured_content
+    assert result["snapshot"]
+    assert [entry["rows"] for entry in result["results"]] == [[[15]], [[20]], [["repeatable read"]]]
+
+
+def test_batch_size_is_validated(database):
+    assert error_of(call("execute_batch", {"queries": []}))["error"] == "invalid_argument"
+    assert error_of(call("execute_batch", {"queries": ["SELECT 1"] * 21}))["error"] == "invalid_argument"
+
+
+def test_paged_query_errors_have_codes(database):
+    error = error_of(call("execute_query_paged", {"continuation_token": "expired"}))
+    assert error["error"] == "invalid_argument" and "re-run the query" in error["message"]
+    error = error_of(call("execute_query_paged", {"query": "SELECT * FROM no_such_table"}))
+    assert error["error"] == "database_error" and "no_such_table" in error["message"]
+    page = call("execute_query_paged", {"query": "SELECT id FROM base_images", "page_size": 5})
+    assert len(page.structured_content["rows"]) == 5
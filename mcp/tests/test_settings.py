@@ -0,0 +1,79 @@
+import pytest
+
+from conftest import CONNECTION
+from database import DatabaseManager
+from retry import RetryPolicy
+from settings import Settings
+
+
+def test_defaults_match_a_local_database():
+    settings = Settings.from_env({})
+    assert settings.connection() == dict(db_name="postgres", user="postgres", password="postgres",
+                                         host="localhost", port=5432)
+    assert settings.max_connections == 10 and settings.warm_up and settings.replicas == []
+
+
+def test_environment_variables_are_parsed():
+    settings = Settings.from_env({
+        "QUERY_MCP_DB_NAME": "cves",
+        "QUERY_MCP_DB_PORT": "6543",
+        "QUERY_MCP_REPLICAS": "host=a, host=b ,",
+        "QUERY_MCP_MAX_REPLICA_LAG": "2.5",
+        "QUERY_MCP_STATEMENT_TIMEOUT_MS": "0",
+        "QUERY_MCP_WARM_UP": "off",
+        "OTHER_DB_NAME": "ignored",
+    })
+    assert settings.db_name == "cves" and settings.db_port == 6543
+    assert settings.replicas == ["host=a", "host=b"] and settings.max_replica_lag == 2.5
+    assert settings.statement_timeout_ms is None  # 0 disables the timeout
+    assert settings.warm_up is False
+
+
+def test_bad_number_names_the_variable():
+    with pytest.raises(ValueError, match="QUERY_MCP_MAX_CONNECTIONS must be a int, got 'ten'"):
+        Settings.from_env({"QUERY_MCP_MAX_CONNECTIONS": "ten"})
+
+
+def test_lazy_manager_connects_on_first_use(database):
+    manager = DatabaseManager(database, **CONNECTION, lazy=True)
+    try:
+        assert manager.pool is None
+        assert manager.warm_up() and manager.pool is not None
+        assert manager.execute_raw_query("SELECT count(*) FROM packages") == [(15,)]
+    finally:
+        manager.close_connection()
+
+
+def test_lazy_manager_starts_without_the_database():
+    manager = DatabaseManager("nowhere", "postgres", "postgres", host="127.0.0.1", port=1, lazy=True,
+                              connect_timeout=1, retry_policy=RetryPolicy(attempts=1))
+    assert manager.pool is None
+    assert manager.warm_up() is False
+    assert manager.execute_raw_query("SELECT 1") is None
+
+
+def test_workers_share_the_connection_limits():
+    settings = Settings(workers=3, index_advisor=False, max_connections=10)
+    assert settings.workers == 3
+    assert settings.per_worker(10) == 4 and settings.per_worker(1) == 1
+
+
+def test_index_advisor_keeps_a_single_worker(capsys):
+    assert Settings(workers=4).workers == 1
+    assert "QUERY_MCP_INDEX_ADVISOR=0" in capsys.readouterr().out
+    assert Settings.from_env({"QUERY_MCP_WORKERS": "4", "QUERY_MCP_INDEX_ADVISOR": "0"}).workers == 4
+
+
+def test_admission_limits_come_from_the_environment():
+    settings = Settings.from_env({
+        "QUERY_MCP_MAX_PLAN_COST": "50000",
+        "QUERY_MCP_MAX_CONCURRENT_PER_SESSION": "0",
+        "QUERY_MCP_MAX_QUEUE": "5",
+        "QUERY_MCP_QUEUE_TIMEOUT": "2.5",
+        "QUERY_MCP_MAX_CONNECTIONS": "6",
+    })
+    assert settings.admission() == dict(statement_timeout_ms=30000, max_plan_cost=50000.0,
+                                        max_concurrent_per_session=None, max_concurrent=6, max_queue=5,
+                                        queue_timeout=2.5)
+    defaults = Settings().admission()
+    assert defaults["max_plan_cost"] is None and defaults["max_concurrent_per_session"] == 4
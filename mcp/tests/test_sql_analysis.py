@@ -0,0 +1,75 @@
+from sql_analysis import (
+    changes_session_settings, is_cacheable, is_read_only, may_write_tables, normalize_sql, referenced_tables,
+    statement_kind, writes_no_tables, written_tables,
+)
+
+
+def test_normalize_sql_ignores_case_whitespace_comments_and_semicolons():
+    assert normalize_sql("SELECT *\n  FROM packages -- all\n;") == normalize_sql("select * from packages")
+    assert normalize_sql("SELECT 'A'") != normalize_sql("SELECT 'a'")
+
+
+def test_read_only_detection():
+    assert is_read_only("SELECT 1; WITH x AS (SELECT 1) SELECT * FROM x")
+    assert is_read_only("EXPLAIN DELETE FROM packages")
+    assert not is_read_only("EXPLAIN ANALYZE DELETE FROM packages")
+    assert not is_read_only("SELECT 1; DELETE FROM packages")
+    assert not is_read_only("WITH gone AS (DELETE FROM packages RETURNING id) SELECT * FROM gone")
+    assert not is_read_only("SELECT * INTO copy FROM packages")
+    assert not is_read_only("SELECT * FROM packages FOR UPDATE")
+    assert is_read_only("SELECT 'delete' FROM packages")
+
+
+def test_volatile_queries_are_not_cacheable():
+    assert is_cacheable("SELECT count(*) FROM packages")
+    assert not is_cacheable("SELECT now(), count(*) FROM packages")
+    assert not is_cacheable("SELECT random()")
+    assert not is_cacheable("UPDATE packages SET name = 'x'")
+
+
+def test_referenced_tables():
+    query = """
+        WITH recent AS (SELECT * FROM public.package_tags)
+        SELECT * FROM packages p, base_images AS b
+        JOIN recent r ON r.package_id = b.id
+        LEFT JOIN "Quoted" q ON true, generate_series(1, 3)
+    """
+    assert referenced_tables(query) == {"package_tags", "packages", "base_images", "Quoted"}
+
+
+def test_written_tables():
+    assert written_tables("INSERT INTO commits (id) VALUES (1)") == {"commits"}
+    assert written_tables("UPDATE packages SET name = 'x' FROM base_images") == {"packages", "base_images"}
+    assert written_tables("TRUNCATE packages, commits") == {"packages", "commits"}
+    assert written_tables("ALTER TABLE packages ADD COLUMN x int") is None
+    assert written_tables("DO $$ BEGIN END $$") is None
+
+
+def test_session_and_maintenance_commands_write_no_tables():
+    assert writes_no_tables("SET work_mem = '64MB'; BEGIN; ANALYZE packages; COMMIT")
+    assert writes_no_tables("VACUUM packages")
+    assert not writes_no_tables("BEGIN; DELETE FROM packages; COMMIT")
+    assert not writes_no_tables("")
+
+
+def test_may_write_tables():
+    sources = {"packages", "package_tags"}
+    assert may_write_tables("DELETE FROM package_tags WHERE id = 1", sources)
+    assert not may_write_tables("INSERT INTO commits (id) VALUES (1)", sources)
+    assert may_write_tables("ALTER TABLE packages ADD COLUMN x int", sources)
+    assert not may_write_tables("CREATE INDEX ix ON packages (name)", sources)
+    assert may_write_tables("DO $$ BEGIN END $$", sources)
+
+
+def test_statement_kind():
+    assert statement_kind("  -- hi\n insert into t values (1)") == "insert"
+    assert statement_kind("") == ""
+
+
+def test_session_setting_changes_are_detected():
+    assert changes_session_settings("SET search_path TO pg_catalog")
+    assert changes_session_settings("select 1; RESET ROLE")
+    assert changes_session_settings("SELECT set_config('role', 'x', false)")
+    assert changes_session_settings("CALL refresh()")
+    assert not changes_session_settings("UPDATE packages SET name = 'x'")
+    assert not changes_session_settings("SELECT 'set' AS word")
@@ -0,0 +1,79 @@
+from google.genai import types
+
+from mcp_client.sql_cache import (
+    HashingEmbedder, SqlCache, answer_sql, is_read_only_sql, normalize_question, sql_values,
+)
+
+CRITICAL_OPENSSL = "SELECT * FROM vulnerabilities WHERE severity = 'CRITICAL' AND description ILIKE '%OpenSSL%'"
+
+
+def test_questions_normalize_to_the_same_key():
+    assert normalize_question("Which base images have CRITICAL OpenSSL CVEs?") == \
+        normalize_question("  which base images have critical openssl cves ")
+    assert normalize_question("Please show me all packages.") == "packages"
+
+
+def test_sql_values_are_the_words_of_literals():
+    assert sql_values(CRITICAL_OPENSSL) == {"critical", "openssl"}
+    assert sql_values("SELECT * FROM packages WHERE id = 42 AND name = 'it''s'") == {"42", "it", "s"}
+
+
+def test_only_read_only_sql_is_cacheable():
+    assert is_read_only_sql("-- count\nSELECT count(*) FROM packages")
+    assert is_read_only_sql("WITH t AS (SELECT 1) SELECT * FROM t")
+    assert not is_read_only_sql("SELECT * INTO copy FROM packages")
+    assert not is_read_only_sql("WITH d AS (DELETE FROM packages RETURNING *) SELECT * FROM d")
+    assert not SqlCache().store("Drop it", "DROP TABLE packages")
+
+
+def test_exact_match_and_forget():
+    cache = SqlCache()
+    assert cache.store("How many packages are there?", "SELECT count(*) FROM packages")
+    hit = cache.lookup("how many packages")
+    assert hit == {"sql": "SELECT count(*) FROM packages", "question": "How many packages are there?",
+                   "similarity": 1.0, "match": "exact"}
+    assert cache.forget("How many packages?") and cache.lookup("how many packages") is None
+
+
+def test_similar_question_must_mention_the_filtered_values():
+    cache = SqlCache(embedder=HashingEmbedder(), threshold=0.6)
+    cache.store("List the CRITICAL OpenSSL vulnerabilities", CRITICAL_OPENSSL)
+    hit = cache.lookup("list critical openssl vulnerability")
+    assert hit["match"] == "similar" and hit["sql"] == CRITICAL_OPENSSL
+    assert cache.lookup("List the HIGH zlib vulnerabilities") is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = SqlCache(max_entries=2)
+    cache.store("one", "SELECT 1")
+    cache.store("two", "SELECT 2")
+    cache.lookup("one")
+    cache.store("three", "SELECT 3")
+    assert len(cache) == 2 and cache.lookup("two") is None and cache.lookup("one") is not None
+
+
+def test_cache_persists_to_json(tmp_path):
+    path = str(tmp_path / "sql_cache.json")
+    SqlCache(path).store("How many packages are there?", "SELECT count(*) FROM packages")
+    assert SqlCache(path).lookup("how many packages")["sql"] == "SELECT count(*) FROM packages"
+    (tmp_path / "broken.json").write_text("{not json")
+    assert len(SqlCache(str(tmp_path / "broken.json"))) == 0
+
+
+def call(sql):
+    return types.Content(role="model", parts=[
+        types.Part.from_function_call(name="execute_raw_query", args={"query": sql})])
+
+
+def response(**result):
+    return types.Content(role="user", parts=[
+        types.Part.from_function_response(name="execute_raw_query", response=result)])
+
+
+def test_answer_sql_is_the_last_successful_query_call():
+    question = types.Content(role="user", parts=[types.Part.from_text(text="How many packages?")])
+    history = [question, call("SELECT 1"), response(result="1"), call("SELECT broken"), response(error="syntax")]
+    assert answer_sql(history) == "SELECT 1"
+    assert answer_sql(history[:3] + [types.Content(role="model", parts=[
+        types.Part.from_function_call(name="get_schema", args={})])]) == "SELECT 1"
+    assert answer_sql([question]) is None and answer_sql(None) is None
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from settings import Settings
+from targets import DEFAULT_TARGET, TargetRegistry, UnknownTargetError, load_targets
+
+
+class StubManager:
+    def __init__(self, settings):
+        self.settings = settings
+        self.probe_interval = None
+        self.closed = False
+
+    def health(self):
+        return {"up": True}
+
+    def pool_stats(self):
+        return {"in_use": 0}
+
+    def replica_stats(self):
+        return []
+
+    def start_liveness_probe(self, interval):
+        self.probe_interval = interval
+
+    def close_connection(self):
+        self.closed = True
+
+
+def test_without_configuration_there_is_one_default_target():
+    settings = Settings()
+    assert load_targets(settings) == ({DEFAULT_TARGET: settings}, DEFAULT_TARGET)
+
+
+def test_targets_override_the_process_settings():
+    settings = Settings(db_user="reader", targets=json.dumps({
+        "default": "us",
+        "targets": {"eu": {"db_host": "eu.db", "replicas": "host=eu-replica"}, "us": {"db_name": "vulns_us"}},
+    }))
+    targets, default = load_targets(settings)
+    assert default == "us"
+    eu = targets["eu"]
+    assert (eu.db_host, eu.db_user, eu.replicas) == ("eu.db", "reader", ["host=eu-replica"])
+    assert targets["us"].db_name == "vulns_us" and targets["us"].db_host == "localhost"
+
+
+def test_targets_file(tmp_path):
+    path = tmp_path / "targets.json"
+    path.write_text(json.dumps({"targets": {"a": {}, "b": {}}}))
+    targets, default = load_targets(Settings(targets_file=str(path), targets="ignored"))
+    assert list(targets) == ["a", "b"] and default == "a"
+
+
+@pytest.mark.parametrize("raw, message", [
+    ("{not json", "is not valid JSON"),
+    ('{"targets": {}}', 'non-empty "targets" object'),
+    ('{"targets": {"a": "host=x"}}', "target 'a' in QUERY_MCP_TARGETS must be an object"),
+    ('{"targets": {"a": {"http_port": 1}}}', "unknown target settings: http_port"),
+    ('{"default": "b", "targets": {"a": {}}}', "default target 'b'"),
+])
+def test_invalid_configurations_are_rejected(raw, message):
+    with pytest.raises(ValueError, match=message):
+        load_targets(Settings(targets=raw))
+
+
+def test_registry_opens_managers_on_first_use():
+    opened = []
+
+    def open_manager(settings):
+        opened.append(settings.db_name)
+        return StubManager(settings)
+
+    registry = TargetRegistry({"eu": Settings(db_name="eu"), "us": Settings(db_name="us")}, open_manager)
+    assert opened == []
+    assert registry.get().name == "eu" and registry.get("") is registry.get("eu")
+    assert opened == ["eu"]
+    assert [entry["loaded"] for entry in registry.stats()] == [True, False]
+    assert [entry["default"] for entry in registry.stats()] == [True, False]
+
+    registry.start_liveness_probes(5.0)
+    assert registry.get("eu").db_manager.probe_interval == 5.0
+    assert registry.get("us").db_manager.probe_interval == 5.0  # started as it comes into use
+    registry.close()
+    assert all(target.db_manager.closed for target in registry.loaded())
+
+
+def test_unknown_target_lists_the_configured_ones():
+    registry = TargetRegistry({"eu": Settings()}, StubManager)
+    with pytest.raises(UnknownTargetError) as unknown:
+        registry.get("mars")
+    assert unknown.value.known == ["eu"]
+    assert unknown.value.args[0] == "unknown target 'mars'; configured targets: eu"